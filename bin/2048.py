@@ -6,30 +6,72 @@ link : https://github.com/kibihrchak/2048-python-copy
 
 """
 
+import argparse
 import curses
 import os
-from typing import Any
+from typing import Any, Optional
 
-from twentyfortyeight.components import crsin, crsout, gamectrl
+from twentyfortyeight.components import crsin, crsout, gamectrl, savegame
 
+DEFAULT_SAVE_PATH = os.path.join(os.path.expanduser("~"), ".jaunty-jackals-2048.sav")
 
-def main(stdscr: Any):
-    """Runs the 2048 program."""
+
+def main(stdscr: Any, save_path: Optional[str] = None, new_game: bool = False):
+    """
+    Runs the 2048 program.
+
+    The game saved in save_path is resumed, unless a new game is asked
+    for, and the game is saved there after every move.
+    """
     curses.curs_set(0)
 
     gc = gamectrl.GameController()
+
+    if save_path is not None and not new_game:
+        saved_data = savegame.read(save_path)
+        if saved_data is not None:
+            try:
+                gc.load_state(saved_data)
+            except ValueError:
+                # a broken save is replaced by the new game
+                pass
+
     co = crsout.CursesOutput(stdscr, gc)
     ci = crsin.CursesInput(stdscr, gc, co)
 
+    autosaver = None
+    if save_path is not None:
+        autosaver = savegame.Autosaver(save_path)
+        gc.attach_autosaver(autosaver)
+
     gc.resume_game()
 
-    while gc.is_active():
-        ci.get_input()
+    try:
+        while gc.is_active():
+            ci.get_input()
+    finally:
+        if autosaver is not None:
+            autosaver.close()
 
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="2048")
+    parser.add_argument(
+        "--save-file",
+        dest="save_path",
+        metavar="FILE",
+        default=DEFAULT_SAVE_PATH,
+        help="resume the game saved in FILE, and save it there after every move",
+    )
+    parser.add_argument(
+        "--new-game",
+        action="store_true",
+        help="start a new game instead of resuming the saved one",
+    )
+    args = parser.parse_args()
+
     # needed for the faster reaction of <ESC> key
     os.environ["ESCDELAY"] = "10"
 
-    curses.wrapper(main)
+    curses.wrapper(main, **vars(args))
     curses.endwin()
@@ -1,11 +1,15 @@
+import argparse
 import curses
 import random
-from collections import namedtuple
-from enum import Enum
-from math import sqrt
+import time
+from collections import deque, namedtuple
+from enum import IntEnum
+from math import isqrt
 from platform import system
-from typing import Any, Generator, Union
+from typing import Any, Generator, Optional, Tuple, Union
 
+import numpy as np
+from minesweep.minesweep_solver import Deductions, Solver, SolverTimeout
 from minesweep.minesweep_utils import Rect, draw_rect, minmax, open_menu
 from play_sounds import play_file as playsound
 from play_sounds import play_while_running
@@ -18,46 +22,85 @@ sfx_death_path = path + "death.wav"
 sfx_bgm_path = path + "bgm.wav"
 sfx_ingame_path = path + "ingame.wav"
 
-
-class Flags(Enum):
-    """Enum to define all possible state related flags"""
+# boards are square, bigger ones than the terminal scroll with the cursor
+BOARD_SIZES = ("100", "400", "625", "10000", "250000", "1000000")
+MAX_BOARD_SIDE = 1000
+MINE_PERCENTS = (0.1, 0.2, 0.4, 0.6)
+# seconds spent placing mines again, for a board solvable without guessing;
+# only plain placement keeps under 50 ms on boards up to 100x100, dense boards
+# are seldom solvable, so no-guess placement there often spends all of it
+NO_GUESS_TIME_BUDGET = 1.0
+
+# OS-specific mine and flag text
+if system().upper() in ("WINDOWS", "DARWIN"):
+    sym_initial, sym_marked, sym_mine = "?", "M", "*"
+else:
+    sym_initial, sym_marked, sym_mine = "\u25A0", "\u26F3", "\u26ED"
+
+# codes of how a cell looks, a revealed safe cell is coded by its hint
+CODE_MARKED = -3
+CODE_INITIAL = -2
+CODE_MINE = -1
+# code of the cells not drawn yet, in the renderer, no cell looks like that
+CODE_NOT_DRAWN = -4
+
+# cell code -> (text, curses colour pair)
+GLYPHS = {
+    CODE_MARKED: (sym_marked, 9),
+    CODE_INITIAL: (sym_initial, 0),
+    CODE_MINE: (sym_mine, 8),
+    0: (" ", 0),
+    1: ("1", 1),
+    2: ("2", 2),
+    3: ("3", 3),
+}
+GLYPHS.update({hint: (str(hint), 4) for hint in range(4, 9)})
+
+
+class Flags(IntEnum):
+    """Enum to define all possible state related flags, stored as int8 in tables"""
 
     INITIAL = 0
     MARKED = 1
     REVEALED = 2
 
 
+# offsets of the eight neighbours of a cell, as (column, row)
+NEIGHBOUR_OFFSETS = tuple(
+    (dx, dy) for dy in (-1, 0, 1) for dx in (-1, 0, 1) if dx != 0 or dy != 0
+)
+
+
 class Table:
-    """Table class to have rows * cols as a list"""
+    """Table class to have rows * cols as a NumPy array, indexed by (col, row) or linear index"""
 
-    def __init__(self, cols: int, rows: int, default: int = 0):
+    def __init__(self, cols: int, rows: int, default: int = 0, dtype: Any = None):
         if (cols <= 0) or (rows <= 0):
             raise ValueError("Invalid rows/cols provided for table")
-        self.table = [default for c in range(cols * rows)]
+        self.table = np.full((rows, cols), default, dtype=dtype)
         self.num_cols = cols
         self.num_rows = rows
 
     def size(self) -> int:
         """Returns total size of table"""
-        return self.num_cols * self.num_rows
+        return self.table.size
 
-    def __getitem__(self, key: tuple) -> Union[list, int]:
-        try:
+    def __getitem__(self, key: tuple) -> Union[bool, int]:
+        if isinstance(key, tuple):
             x, y = key
             if x >= self.num_cols or y >= self.num_rows:
                 raise IndexError("list index out of range")
-            return self.table[self.subscript_to_linear(x, y)]
-        except TypeError:
-            return self.table[key]
+            return self.table.item(y, x)
+        return self.table.item(key)
 
     def __setitem__(self, key: tuple, value: int):
-        try:
+        if isinstance(key, tuple):
             x, y = key
             if x >= self.num_cols or y >= self.num_rows:
                 raise IndexError("list index out of range")
-            self.table[self.subscript_to_linear(x, y)] = value
-        except TypeError:
-            self.table[key] = value
+            self.table[y, x] = value
+        else:
+            self.table.flat[key] = value
 
     def neighbours(self, x: int, y: int) -> None:
         """Yields all current neighbours of cell"""
@@ -66,6 +109,17 @@ class Table:
                 if c != x or r != y:
                     yield c, r
 
+    def neighbour_sums(self) -> np.ndarray:
+        """Returns, for every cell, the sum of its neighbours' values"""
+        # 3x3 convolution with a hollow kernel, as the sum of eight shifted views
+        padded = np.pad(self.table.astype(np.int8), 1)
+        sums = np.zeros(self.table.shape, dtype=np.int8)
+        for dx, dy in NEIGHBOUR_OFFSETS:
+            sums += padded[
+                1 + dy : 1 + dy + self.num_rows, 1 + dx : 1 + dx + self.num_cols
+            ]
+        return sums
+
     def linear_to_subscript(self, index: int) -> tuple:
         """Convert string to tuple"""
         return index % self.num_cols, index // self.num_cols
@@ -76,17 +130,33 @@ class Table:
 
     def count(self, value: int) -> int:
         """Returns number of values in the table"""
-        return self.table.count(value)
+        return int(np.count_nonzero(self.table == value))
 
     def row(self, r: int) -> list:
         """Returns particular row from the table"""
-        start = self.subscript_to_linear(0, r)
-        return self.table[start : start + self.num_cols]
+        return self.table[r].tolist()
 
     def __iter__(self):
-        for y in range(self.num_rows):
-            for x in range(self.num_cols):
-                yield self[x, y]
+        return iter(self.table.ravel().tolist())
+
+
+def pick_cells(cells: np.ndarray, count: int) -> list:
+    """Picks count of the cells at random, with a partial Fisher-Yates shuffle
+
+    Only the first places of a copy of the cells are shuffled, as many as
+    there are cells to pick, or to leave out if those are fewer. The cells
+    left out are then the shuffled ones, and the picked ones the rest.
+    """
+    cells = cells.tolist()
+    cells_cnt = len(cells)
+    if not 0 <= count <= cells_cnt:
+        raise ValueError("Cannot pick {0} out of {1} cells".format(count, cells_cnt))
+
+    steps = min(count, cells_cnt - count)
+    for i in range(steps):
+        j = i + int(random.random() * (cells_cnt - i))
+        cells[i], cells[j] = cells[j], cells[i]
+    return cells[:count] if steps == count else cells[steps:]
 
 
 class MineSweeper:
@@ -95,7 +165,7 @@ class MineSweeper:
     def __init__(self, mines: Table, flags: Table = None):
         """Default init function"""
         if flags is None:
-            flags = Table(mines.num_cols, mines.num_rows, Flags.INITIAL)
+            flags = Table(mines.num_cols, mines.num_rows, Flags.INITIAL, np.int8)
         if mines.size() != flags.size():
             raise ValueError(
                 "Fields cannot have different sizes ({0} != {1})".format(
@@ -104,10 +174,14 @@ class MineSweeper:
             )
         self.mines = mines
         self.flags = flags
-        self.hints = Table(mines.num_cols, mines.num_rows, 0)
-
-        for i, _ in enumerate(self.hints):
-            self.hints[i] = self.hint(*self.hints.linear_to_subscript(i))
+        self.hints = Table(mines.num_cols, mines.num_rows, 0, np.int8)
+        self.hints.table[...] = np.where(mines.table, -1, mines.neighbour_sums())
+        # mines placed on the first reveal: how many, the solver the board has to
+        # be solvable by, if any, and the seconds to find such a board
+        self._unplaced = None
+        # a board solvable without guessing was asked for, and not found in time
+        self._no_guess_failed = False
+        self._recount()
 
     def rows(self) -> int:
         """Returns num of rows in game"""
@@ -118,52 +192,158 @@ class MineSweeper:
         return self.mines.num_cols
 
     def hint(self, x: int, y: int) -> int:
-        """Returns number of mines around current cell"""
-        if self.mines[x, y]:
-            return -1
-        else:
-            h = 0
-            for a, b in self.mines.neighbours(x, y):
-                if self.mines[a, b]:
-                    h += 1
-            return h
+        """Returns number of mines around current cell, -1 for a mine"""
+        return self.hints[x, y]
 
     def is_solved(self) -> bool:
         """Function to check if it's solved"""
-        for mine, flag in zip(self.mines, self.flags):
-            if mine and flag != Flags.MARKED:
-                return False
-        return True
+        return self._correct_marks_cnt == self._mines_cnt
 
     def is_lost(self) -> bool:
         """Function to check if outcome is lost"""
-        for mine, flag in zip(self.mines, self.flags):
-            if mine and flag == Flags.REVEALED:
-                return True
-        return False
+        return self._lost
+
+    def may_need_guess(self) -> bool:
+        """Returns True if no board solvable without guessing was found in time"""
+        return self._no_guess_failed
+
+    def remaining_mines(self) -> int:
+        """Returns number of mines minus number of marks"""
+        return self._mines_cnt - self._marks_cnt
 
     def auto_mark(self) -> None:
         """Marks cell for flag/mine"""
-        for mine, flag in zip(self.mines, self.flags):
-            if not mine and flag != Flags.REVEALED:
-                return False
+        if self._revealed_safe_cnt < self.mines.size() - self._mines_cnt:
+            return False
 
-        for i, mine in enumerate(self.mines):
-            if mine:
-                self.flags[i] = Flags.MARKED
-            else:
-                self.flags[i] = Flags.REVEALED
+        self.flags.table[...] = np.where(self.mines.table, Flags.MARKED, Flags.REVEALED)
+        self._recount()
 
     def reveal_all(self) -> None:
         """Function to reveal the final board"""
-        for i, flag in enumerate(self.flags):
-            if flag != Flags.MARKED:
-                self.flags[i] = Flags.REVEALED
+        self.flags.table[self.flags.table != Flags.MARKED] = Flags.REVEALED
+        self._recount()
+
+    def deductions(
+        self, solver: Solver, deadline: Optional[float] = None
+    ) -> Deductions:
+        """Returns what the solver deduces from the revealed cells"""
+        revealed = self.flags.table == Flags.REVEALED
+        return solver.solve(revealed, self.hints.table, self._mines_cnt, deadline)
+
+    def solve_step(self, solver: Solver, deadline: Optional[float] = None) -> bool:
+        """Reveals the cells known to be safe, and marks the ones known to be mines
+
+        Wrong marks on safe cells are taken away. Returns False when
+        nothing more is known for sure, or the game is over.
+        """
+        if self.is_lost() or self.is_solved():
+            return False
+
+        deductions = self.deductions(solver, deadline)
+        progress = bool(deductions.safe)
+        for x, y in deductions.mines:
+            if self.flags[x, y] != Flags.MARKED:
+                self._set_mark(x, y, True)
+                progress = True
+        for x, y in deductions.safe:
+            if self.flags[x, y] == Flags.MARKED:
+                self._set_mark(x, y, False)
+
+        if deductions.safe:
+            self.flood_reveal(list(deductions.safe))
+        self.auto_mark()
+        return progress
+
+    def is_solvable_from(
+        self, x: int, y: int, solver: Solver, deadline: Optional[float] = None
+    ) -> bool:
+        """Checks if revealing the cell, then only sure moves, wins the game
+
+        Gives up, returning False, past the deadline of time.perf_counter,
+        even in the middle of a solver step. The cells are covered again
+        afterwards.
+        """
+        flags = self.flags.table.copy()
+        try:
+            if not self.reveal(x, y):
+                return False
+            while self.solve_step(solver, deadline):
+                pass
+            return self.is_solved()
+        except SolverTimeout:
+            return False
+        finally:
+            self.flags.table[...] = flags
+            self._recount()
+
+    def _recount(self) -> None:
+        """Counts mines, marks and revealed cells from the tables, after bulk changes"""
+        mines = self.mines.table.astype(bool)
+        marked = self.flags.table == Flags.MARKED
+        revealed = self.flags.table == Flags.REVEALED
+
+        self._mines_cnt = int(np.count_nonzero(mines))
+        if self._unplaced is not None:
+            self._mines_cnt += self._unplaced[0]
+        self._marks_cnt = int(np.count_nonzero(marked))
+        self._correct_marks_cnt = int(np.count_nonzero(marked & mines))
+        self._revealed_safe_cnt = int(np.count_nonzero(revealed & ~mines))
+        self._lost = bool(np.any(revealed & mines))
+
+    def _place_mines(self, x: int, y: int) -> None:
+        """Places the mines away from the first revealed cell, and its neighbours
+
+        With a solver, the mines are placed again until the board can be
+        won without guessing from that reveal. When the time is up, or
+        would be before another board is placed, the last board is kept
+        as it is, and may_need_guess tells so.
+        """
+        num_mines, solver, time_budget = self._unplaced
+        self._unplaced = None
+        deadline = time.perf_counter() + time_budget
+
+        cols, rows = self.mines.num_cols, self.mines.num_rows
+        cells = np.ones((rows, cols), dtype=bool)
+        cells[max(y - 1, 0) : y + 2, max(x - 1, 0) : x + 2] = False
+        cells = np.flatnonzero(cells)
+        while True:
+            started = time.perf_counter()
+            self.mines.table[...] = False
+            self.mines.table.flat[pick_cells(cells, num_mines)] = True
+            self.hints.table[...] = np.where(
+                self.mines.table, -1, self.mines.neighbour_sums()
+            )
+            self._recount()
+            placing_time = time.perf_counter() - started
+            if solver is None:
+                return
+            if time.perf_counter() < deadline and self.is_solvable_from(
+                x, y, solver, deadline
+            ):
+                return
+            if time.perf_counter() + placing_time > deadline:
+                self._no_guess_failed = True
+                return
+
+    def _set_mark(self, x: int, y: int, marked: bool) -> None:
+        """Marks or unmarks a cell, keeping the counters up to date"""
+        self.flags[x, y] = Flags.MARKED if marked else Flags.INITIAL
+        delta = 1 if marked else -1
+        self._marks_cnt += delta
+        if self.mines[x, y]:
+            self._correct_marks_cnt += delta
 
     def reveal(self, x: int, y: int, reveal_known: bool = True) -> bool:
-        """Function to reveal individual box"""
+        """Function to reveal individual box, returns False if a mine was revealed
+
+        Revealing a revealed cell, whose hint is matched by the marked
+        neighbours, reveals the other neighbours. The cells without mines
+        around are flood filled, and the board is checked once at the end.
+        """
         if self.flags[x, y] == Flags.MARKED:
-            self.flags[x, y] = Flags.INITIAL
+            self._set_mark(x, y, False)
+            return True
         elif self.flags[x, y] == Flags.REVEALED:
             if self.hints[x, y] <= 0 or not reveal_known:
                 return True
@@ -171,73 +351,150 @@ class MineSweeper:
             neighbour_mines = [
                 (nx, ny) for nx, ny in neighbours if self.flags[nx, ny] == Flags.MARKED
             ]
-            if len(neighbour_mines) == self.hints[x, y]:
-                for nx, ny in neighbours:
-                    if (nx, ny) not in neighbour_mines:
-                        self.reveal(nx, ny, reveal_known=False)
+            if len(neighbour_mines) != self.hints[x, y]:
+                return True
+            cells = [
+                (nx, ny) for nx, ny in neighbours if self.flags[nx, ny] == Flags.INITIAL
+            ]
         else:
+            if self._unplaced is not None:
+                self._place_mines(x, y)
+            cells = [(x, y)]
+
+        mine_revealed = self.flood_reveal(cells)
+        if cells and not mine_revealed:
+            self.auto_mark()
+        return not mine_revealed
+
+    def flood_reveal(self, cells: list) -> bool:
+        """Reveals the cells, spreading from the ones without mines around
+
+        Returns True if a mine was revealed.
+        """
+        mine_revealed = False
+        empty_cells = []
+        for x, y in cells:
             self.flags[x, y] = Flags.REVEALED
             if self.mines[x, y]:
-                return False
-            else:
-                if self.hint(x, y) == 0:
-                    for nx, ny in self.mines.neighbours(x, y):
-                        if self.flags[nx, ny] == Flags.INITIAL:
-                            self.reveal(nx, ny, reveal_known=False)
-                self.auto_mark()
-        return True
+                mine_revealed = True
+                self._lost = True
+                continue
+            self._revealed_safe_cnt += 1
+            if self.hints[x, y] == 0:
+                empty_cells.append(self.flags.subscript_to_linear(x, y))
+
+        if empty_cells:
+            self._flood_empty_cells(empty_cells)
+        return mine_revealed
+
+    def _flood_empty_cells(self, empty_cells: list) -> None:
+        """Reveals the area around revealed cells without mines around
+
+        Works with a queue over flat lists, so large empty areas neither
+        hit the recursion limit, nor pay for NumPy scalar access per cell.
+        The lists hold the board with a revealed border, so the 8
+        neighbours of a cell are always at the same offsets from it.
+        The neighbours of cells without mines around are never mines.
+        """
+        cols = self.flags.num_cols
+        width = cols + 2
+        initial = Flags.INITIAL.value
+        revealed = Flags.REVEALED.value
+        hints = np.pad(self.hints.table, 1).ravel().tolist()
+        flags = np.pad(self.flags.table, 1, constant_values=revealed).ravel().tolist()
+        offsets = (-width - 1, -width, -width + 1, -1, 1, width - 1, width, width + 1)
+
+        revealed_cells = []
+        queue = deque(cell + width + 1 + cell // cols * 2 for cell in empty_cells)
+        while queue:
+            cell = queue.popleft()
+            for offset in offsets:
+                i = cell + offset
+                if flags[i] == initial:
+                    flags[i] = revealed
+                    revealed_cells.append(i)
+                    if hints[i] == 0:
+                        queue.append(i)
+
+        ys, xs = np.divmod(np.array(revealed_cells, dtype=np.intp), width)
+        self.flags.table[ys - 1, xs - 1] = Flags.REVEALED
+        self._revealed_safe_cnt += len(revealed_cells)
 
     def toggle_mark(self, x: int, y: int) -> None:
         """Toggle state of non-mine cells"""
         if self.flags[x, y] == Flags.INITIAL:
-            self.flags[x, y] = Flags.MARKED
+            self._set_mark(x, y, True)
         elif self.flags[x, y] == Flags.MARKED:
-            self.flags[x, y] = Flags.INITIAL
+            self._set_mark(x, y, False)
         self.auto_mark()
 
     @classmethod
-    def create_random(cls, cols: int, rows: int, num_mines: int):
-        """Creates random minesweeper for start"""
-        mines = Table(cols, rows, False)
-        flags = Table(cols, rows, Flags.INITIAL)
-
-        fields = [(c, r) for c in range(cols) for r in range(rows)]
-        for x, y in random.sample(fields, num_mines):
-            mines[x, y] = True
+    def create_random(
+        cls, cols: int, rows: int, num_mines: int, clear: Optional[tuple] = None
+    ):
+        """Creates random minesweeper for start
+
+        If clear is given, that cell and its neighbours have no mines.
+        """
+        mines = Table(cols, rows, False, bool)
+        flags = Table(cols, rows, Flags.INITIAL, np.int8)
+
+        cells = np.ones((rows, cols), dtype=bool)
+        if clear is not None:
+            x, y = clear
+            cells[max(y - 1, 0) : y + 2, max(x - 1, 0) : x + 2] = False
+        mines.table.flat[pick_cells(np.flatnonzero(cells), num_mines)] = True
         return MineSweeper(mines, flags)
 
+    @classmethod
+    def create_unplaced(
+        cls,
+        cols: int,
+        rows: int,
+        num_mines: int,
+        solver: Optional[Solver] = None,
+        time_budget: float = NO_GUESS_TIME_BUDGET,
+    ):
+        """Creates minesweeper whose mines are placed on the first reveal
+
+        The first revealed cell, and its neighbours, never have mines. With
+        a solver, the board is also made solvable without guessing, if one
+        such is found within the time budget, in seconds.
+        """
+        if num_mines > cols * rows - 9:
+            raise ValueError(
+                "Too many mines ({0}) to keep the first reveal clear".format(num_mines)
+            )
+        game = cls(Table(cols, rows, False, bool))
+        game._unplaced = (num_mines, solver, time_budget)
+        game._recount()
+        return game
+
 
 def start_new_game(curse_context: Any) -> None:
     """Menu to start a new game"""
-    boxes = int(
-        open_menu(curse_context, items=("100", "400", "625"), header="Number of Boxes")
-    )
-    mine_percents = [0.1, 0.2, 0.4, 0.6]
-    mines = [str(int(boxes * mp)) for mp in mine_percents]
+    boxes = int(open_menu(curse_context, items=BOARD_SIZES, header="Number of Boxes"))
+    side = int(minmax(isqrt(boxes), 1, MAX_BOARD_SIDE))
+    mines = [str(int(side * side * mp)) for mp in MINE_PERCENTS]
     sel_mines = int(
         float(open_menu(curse_context, items=tuple(mines), header="Number of Mines"))
     )
+    board = open_menu(curse_context, items=("Random", "No Guessing"), header="Board")
 
-    final_cols = int(minmax(sqrt(boxes), 0, curses.COLS - 3))
-    final_rows = int(minmax(sqrt(boxes), 0, curses.LINES - 5))
     with play_while_running(sfx_ingame_path):
-        start_game(curse_context, final_cols, final_rows, sel_mines)
-
-
-def cursor_to_index(cursor_pos: Any, game_rect: Rect) -> Any:
-    """Returns window position to table index"""
-    return (cursor_pos.x - game_rect.x) // 2, cursor_pos.y - game_rect.y
+        start_game(curse_context, side, side, sel_mines, board == "No Guessing")
 
 
-def get_header(curse_context: Any, game: Any) -> Rect:
+def get_header(curse_context: Any, game: Any, status: str = "") -> Rect:
     """Returns the header for the game"""
     if game.is_solved():
         text = "VICTORY!"
     elif game.is_lost():
         text = "GAME OVER!"
     else:
-        remaining = game.mines.count(True) - game.flags.count(Flags.MARKED)
-        text = "Remaining Mines: {0}".format(remaining)
+        text = "Remaining Mines: {0}".format(game.remaining_mines())
+    if status:
+        text += "  " + status
     curse_context.addstr(0, 0, text, curses.A_REVERSE)
     return Rect(0, 0, curses.COLS - 1, 1)
 
@@ -252,9 +509,13 @@ def get_footer(curse_context: Any, game: Any) -> Rect:
             ("Reveal:".upper(), "Space \u2423"),
             ("Toggle Mark:".upper(), "Enter \u23CE"),
             ("Menu:".upper(), "Escape Esc"),
+            ("Hint:".upper(), "h"),
+            ("Solve:".upper(), "a"),
         ]
     offset = 0
     for name, control in controls:
+        if offset + len(name) + len(control) + 2 >= curses.COLS:
+            break
         curse_context.addstr(curses.LINES - 1, offset, name, curses.A_REVERSE)
         offset += len(name)
         curse_context.addstr(curses.LINES - 1, offset, " " + control + " ")
@@ -262,117 +523,311 @@ def get_footer(curse_context: Any, game: Any) -> Rect:
     return Rect(0, curses.LINES - 1, curses.COLS - 1, 1)
 
 
-def get_game(curse_context: Any, game: Any, game_rect: Rect) -> Rect:
-    """Returns main body of the game"""
-    rect = Rect(game_rect.x, game_rect.y, game.columns() * 2 + 1, game.rows() + 2)
-    rect = draw_rect(curse_context, rect)
+def cell_codes(game: Any, view: tuple = (slice(None), slice(None))) -> np.ndarray:
+    """Returns the code of how every cell in view looks, as a rows * cols array"""
+    flags = game.flags.table[view]
+    revealed = flags == Flags.REVEALED
+    # INITIAL and MARKED map to CODE_INITIAL and CODE_MARKED
+    return np.where(revealed, game.hints.table[view], CODE_INITIAL - flags)
 
-    for i, (mine, flag, hint) in enumerate(zip(game.mines, game.flags, game.hints)):
-        x, y = game.mines.linear_to_subscript(i)
-        x = x * 2 + rect.x
-        y = y + rect.y
 
-        # OS-specific mine and flag text
-        sym_initial = "\u25A0"
-        sym_marked = "\u26F3"
-        sym_mine = "\u26ED"
+def draw_cell(curse_context: Any, x: int, y: int, code: int) -> None:
+    """Draws one cell of the game body, at a cell position of the window"""
+    text, pair = GLYPHS[code]
+    curse_context.addstr(y, x * 2, text, curses.color_pair(pair))
 
-        if system().upper() in ("WINDOWS", "DARWIN"):
-            sym_initial = "?"
-            sym_marked = "M"
-            sym_mine = "*"
 
-        if flag == Flags.INITIAL:
-            curse_context.addstr(y, x, sym_initial)
-        elif flag == Flags.MARKED:
-            curse_context.addstr(y, x, sym_marked, curses.color_pair(9))
-        else:
-            if mine:
-                curse_context.addstr(y, x, sym_mine, curses.color_pair(8))
-            else:
-                if hint == 0:
-                    curse_context.addstr(y, x, " ")
-                elif hint == 1:
-                    curse_context.addstr(y, x, str(hint), curses.color_pair(1))
-                elif hint == 2:
-                    curse_context.addstr(y, x, str(hint), curses.color_pair(2))
-                elif hint == 3:
-                    curse_context.addstr(y, x, str(hint), curses.color_pair(3))
-                elif hint == 4:
-                    curse_context.addstr(y, x, str(hint), curses.color_pair(4))
-                else:
-                    curse_context.addstr(y, x, str(hint), curses.color_pair(4))
-    return rect
-
-
-def draw_all(curse_context: Any, game: Any) -> Any:
-    """Draws the main game"""
-    game_head = get_header(curse_context, game)
+def draw_all(curse_context: Any, game: Any, status: str = "") -> Rect:
+    """Draws the header and footer, returns the rect left for the game body"""
+    game_head = get_header(curse_context, game, status)
     game_foot = get_footer(curse_context, game)
-    game_body = Rect(
+    return Rect(
         0,
         game_head.height,
         curses.COLS - 1,
         curses.LINES - 1 - game_head.height - game_foot.height,
     )
-    full_game = get_game(curse_context, game, game_body)
-    return full_game
 
 
-def start_game(curse_context: Any, cols: int, rows: int, mines: int) -> None:
-    """Main loop to create and start the game"""
-    game = MineSweeper.create_random(cols, rows, mines)
-
-    Point = namedtuple("Point", ["x", "y"])
-    cursor_pos = Point(0, 0)
+class GameRenderer:
+    """
+    Draws the game through a viewport that follows the cursor
+
+    The cells are drawn on a pad the size of the viewport, so boards of any
+    size fit the terminal. Only the visible cells are drawn, and after the
+    first draw only those changed since. When the viewport scrolls, the
+    cells still visible are copied to a spare pad at their new place, and
+    only the newly exposed ones are drawn.
+    """
+
+    def __init__(self, curse_context: Any, game: MineSweeper):
+        self.curse_context = curse_context
+        self.game = game
+        # screen rect of the visible cells, None when everything has to be drawn
+        self.view_rect = None
+        self.view_cols = 0
+        self.view_rows = 0
+        self.view_x = 0
+        self.view_y = 0
+        self.pad = None
+        # the pad the cells are copied to when scrolling, then swapped with pad
+        self.spare_pad = None
+        # codes of the visible cells as last drawn, None when they all have to be
+        self.shadow = None
+        # shown in the header, after the remaining mines
+        self.status = ""
+
+    def invalidate(self) -> None:
+        """Makes the next draw clear the screen and draw everything"""
+        self.view_rect = None
+
+    def draw(self, cursor_x: int, cursor_y: int) -> None:
+        """Draws the changes, scrolling the viewport to show the cursor cell"""
+        if self.view_rect is None:
+            self._layout()
+        else:
+            self.curse_context.move(0, 0)
+            self.curse_context.clrtoeol()
+            get_header(self.curse_context, self.game, self.status)
+
+        self._scroll_to(cursor_x, cursor_y)
+        self._draw_cells()
+
+        pad_y = cursor_y - self.view_y
+        pad_x = (cursor_x - self.view_x) * 2
+        rect = self.view_rect
+        # both cursors on the same spot, whichever window curses refreshes last
+        self.curse_context.move(rect.y + pad_y, rect.x + pad_x)
+        self.curse_context.noutrefresh()
+        self.pad.move(pad_y, pad_x)
+        self.pad.noutrefresh(
+            0, 0, rect.y, rect.x, rect.y + rect.height - 1, rect.x + rect.width - 1
+        )
+        curses.doupdate()
+
+    def _layout(self) -> None:
+        """Clears the screen, draws everything but the cells and sizes the viewport"""
+        self.curse_context.clear()
+        body = draw_all(self.curse_context, self.game, self.status)
+
+        self.view_cols = int(minmax((body.width - 1) // 2, 1, self.game.columns()))
+        self.view_rows = int(minmax(body.height - 2, 1, self.game.rows()))
+        rect = Rect(body.x, body.y, self.view_cols * 2 + 1, self.view_rows + 2)
+        self.view_rect = draw_rect(self.curse_context, rect)
+
+        # a spare line, so drawing the last cell never moves the cursor off the pad
+        self.pad = curses.newpad(self.view_rows + 1, self.view_cols * 2 + 1)
+        self.spare_pad = curses.newpad(self.view_rows + 1, self.view_cols * 2 + 1)
+        self.shadow = None
+
+    def _scroll_to(self, x: int, y: int) -> None:
+        """Moves the viewport the least needed for the cell to be visible"""
+        view_x = minmax(self.view_x, x - self.view_cols + 1, x)
+        view_y = minmax(self.view_y, y - self.view_rows + 1, y)
+        # the viewport can grow past the board edge when the terminal grows
+        view_x = minmax(view_x, 0, self.game.columns() - self.view_cols)
+        view_y = minmax(view_y, 0, self.game.rows() - self.view_rows)
+
+        if (view_x, view_y) != (self.view_x, self.view_y):
+            self._shift(view_x - self.view_x, view_y - self.view_y)
+            self.view_x = view_x
+            self.view_y = view_y
+
+    def _shift(self, dx: int, dy: int) -> None:
+        """Moves the drawn cells, and their codes, by the scrolling of the viewport"""
+        cols = self.view_cols - abs(dx)
+        rows = self.view_rows - abs(dy)
+        if self.shadow is None or cols <= 0 or rows <= 0:
+            self.shadow = None
+            return
+
+        # the cells still visible, where they were, and where they go
+        from_x, from_y = max(dx, 0), max(dy, 0)
+        to_x, to_y = max(-dx, 0), max(-dy, 0)
+
+        self.spare_pad.erase()
+        self.pad.overwrite(
+            self.spare_pad,
+            from_y,
+            from_x * 2,
+            to_y,
+            to_x * 2,
+            to_y + rows - 1,
+            (to_x + cols) * 2 - 1,
+        )
+        self.pad, self.spare_pad = self.spare_pad, self.pad
 
-    while True:
-        curse_context.clear()
-        game_rect = draw_all(curse_context, game)
+        shadow = np.full_like(self.shadow, CODE_NOT_DRAWN)
+        shadow[to_y : to_y + rows, to_x : to_x + cols] = self.shadow[
+            from_y : from_y + rows, from_x : from_x + cols
+        ]
+        self.shadow = shadow
 
-        cursor_pos = Point(
-            minmax(cursor_pos.x, game_rect.x, game_rect.x + game_rect.width - 1),
-            minmax(cursor_pos.y, game_rect.y, game_rect.y + game_rect.height - 1),
+    def _draw_cells(self) -> None:
+        """Draws the visible cells changed since the last draw"""
+        view = (
+            slice(self.view_y, self.view_y + self.view_rows),
+            slice(self.view_x, self.view_x + self.view_cols),
         )
-        curse_context.move(cursor_pos.y, cursor_pos.x)
-        curse_context.refresh()
-
-        input_ch = curse_context.getch()
-        if input_ch == curses.KEY_LEFT:
-            playsound(sfx_nav_path, block=False)
-            cursor_pos = Point(cursor_pos.x - 2, cursor_pos.y)
-        if input_ch == curses.KEY_RIGHT:
-            playsound(sfx_nav_path, block=False)
-            cursor_pos = Point(cursor_pos.x + 2, cursor_pos.y)
-        if input_ch == curses.KEY_UP:
-            playsound(sfx_nav_path, block=False)
-            cursor_pos = Point(cursor_pos.x, cursor_pos.y - 1)
-        if input_ch == curses.KEY_DOWN:
-            playsound(sfx_nav_path, block=False)
-            cursor_pos = Point(cursor_pos.x, cursor_pos.y + 1)
-        if input_ch == curses.KEY_ENTER or input_ch == 10:  # enter
-            playsound(sfx_enter_path, block=False)
-            game.toggle_mark(*cursor_to_index(cursor_pos, game_rect))
-        if input_ch == " " or input_ch == 32:  # spacebar
-            playsound(sfx_space_path, block=False)
-            game.reveal(*cursor_to_index(cursor_pos, game_rect))
-        if input_ch == 27:
-            selected = open_menu(curse_context, ("Continue", "New Game", "Exit"))
-            if selected == "Exit":
-                return
-            elif selected == "New Game":
-                start_new_game(curse_context)
+        codes = cell_codes(self.game, view)
+
+        if self.shadow is None:
+            for y, row in enumerate(codes.tolist()):
+                for x, code in enumerate(row):
+                    draw_cell(self.pad, x, y, code)
+        else:
+            for y, x in np.argwhere(codes != self.shadow).tolist():
+                draw_cell(self.pad, x, y, codes.item(y, x))
+        self.shadow = codes
+
+
+def get_hint(game: MineSweeper, solver: Solver, x: int, y: int) -> Tuple[Any, str]:
+    """Returns the covered cell best played next, the nearest to x, y, and why
+
+    That is a cell known to be safe, then a known mine not marked yet,
+    then the cell least likely to be a mine. Returns None for the cell if
+    no cell is covered.
+    """
+    deductions = game.deductions(solver)
+
+    def distance(cell: tuple) -> int:
+        return (cell[0] - x) ** 2 + (cell[1] - y) ** 2
+
+    if deductions.safe:
+        return min(deductions.safe, key=distance), "Hint: safe"
+    unmarked_mines = [
+        cell for cell in deductions.mines if game.flags[cell] != Flags.MARKED
+    ]
+    if unmarked_mines:
+        return min(unmarked_mines, key=distance), "Hint: mine"
+
+    probabilities = deductions.probabilities
+    cell = min(
+        probabilities, key=lambda c: (probabilities[c], distance(c)), default=None
+    )
+    if cell is not None and (
+        deductions.other_probability is None
+        or probabilities[cell] <= deductions.other_probability
+    ):
+        return cell, "Hint: {:.0%} mine".format(probabilities[cell])
+
+    # a cell away from the revealed ones is the safest bet
+    others = game.flags.table == Flags.INITIAL
+    for other_x, other_y in probabilities:
+        others[other_y, other_x] = False
+    cells = np.argwhere(others)
+    if len(cells) == 0:
+        return None, ""
+    nearest = int(np.argmin((cells[:, 1] - x) ** 2 + (cells[:, 0] - y) ** 2))
+    other_y, other_x = cells[nearest].tolist()
+    return (other_x, other_y), "Hint: {:.0%} mine".format(deductions.other_probability)
+
+
+def start_game(
+    curse_context: Any, cols: int, rows: int, mines: int, no_guess: bool = False
+) -> None:
+    """Main loop to create and start the game"""
+    solver = Solver()
+    game = MineSweeper.create_unplaced(cols, rows, mines, solver if no_guess else None)
+    renderer = GameRenderer(curse_context, game)
 
-        if game.is_lost() or game.is_solved():
-            playsound(sfx_death_path, block=False)
-            game.reveal_all()
-            curse_context.clear()
-            draw_all(curse_context, game)
+    Point = namedtuple("Point", ["x", "y"])
+    cursor_pos = Point(0, 0)
+    # shown in the header for the whole game, unless something else is
+    board_status = ""
+
+    try:
+        while True:
+            cursor_pos = Point(
+                minmax(cursor_pos.x, 0, game.columns() - 1),
+                minmax(cursor_pos.y, 0, game.rows() - 1),
+            )
+            renderer.draw(*cursor_pos)
 
-            curses.curs_set(False)
             input_ch = curse_context.getch()
-            curses.curs_set(True)
-            break
+            renderer.status = board_status
+            if input_ch == curses.KEY_LEFT:
+                playsound(sfx_nav_path, block=False)
+                cursor_pos = Point(cursor_pos.x - 1, cursor_pos.y)
+            if input_ch == curses.KEY_RIGHT:
+                playsound(sfx_nav_path, block=False)
+                cursor_pos = Point(cursor_pos.x + 1, cursor_pos.y)
+            if input_ch == curses.KEY_UP:
+                playsound(sfx_nav_path, block=False)
+                cursor_pos = Point(cursor_pos.x, cursor_pos.y - 1)
+            if input_ch == curses.KEY_DOWN:
+                playsound(sfx_nav_path, block=False)
+                cursor_pos = Point(cursor_pos.x, cursor_pos.y + 1)
+            if input_ch == curses.KEY_ENTER or input_ch == 10:  # enter
+                playsound(sfx_enter_path, block=False)
+                game.toggle_mark(*cursor_pos)
+            if input_ch == " " or input_ch == 32:  # spacebar
+                playsound(sfx_space_path, block=False)
+                game.reveal(*cursor_pos)
+                if game.may_need_guess():
+                    board_status = "No guess-free board found in time"
+                    renderer.status = board_status
+            if input_ch == ord("h"):
+                cell, renderer.status = get_hint(game, solver, *cursor_pos)
+                if cell is not None:
+                    cursor_pos = Point(*cell)
+            if input_ch == ord("a"):
+                while game.solve_step(solver):
+                    renderer.draw(*cursor_pos)
+                if not game.is_solved():
+                    renderer.status = "Solve: a guess is needed"
+            if input_ch == 27:
+                selected = open_menu(curse_context, ("Continue", "New Game", "Exit"))
+                if selected == "Exit":
+                    return
+                elif selected == "New Game":
+                    start_new_game(curse_context)
+                renderer.invalidate()
+            if input_ch == curses.KEY_RESIZE:
+                curses.update_lines_cols()
+                renderer.invalidate()
+
+            if game.is_lost() or game.is_solved():
+                playsound(sfx_death_path, block=False)
+                game.reveal_all()
+                renderer.invalidate()
+                renderer.draw(*cursor_pos)
+
+                curses.curs_set(False)
+                input_ch = curse_context.getch()
+                curses.curs_set(True)
+                break
+    finally:
+        solver.close()
+
+
+def benchmark(size: int = 16, boards: int = 20, seed: int = 0) -> dict:
+    """
+    Solves random boards with sure moves only, from a reveal in the middle
+
+    Plays the given number of square boards per density of MINE_PERCENTS.
+    Returns per density the boards played per second, and the share of
+    them won without guessing.
+    """
+    random.seed(seed)
+    solver = Solver()
+    results = {}
+    try:
+        for mine_percent in MINE_PERCENTS:
+            mines = int(size * size * mine_percent)
+            won = 0
+            started = time.perf_counter()
+            for _board in range(boards):
+                x = y = size // 2
+                game = MineSweeper.create_random(size, size, mines, clear=(x, y))
+                won += game.is_solvable_from(x, y, solver)
+            elapsed = time.perf_counter() - started
+
+            results["{:.0%} boards_per_second".format(mine_percent)] = boards / elapsed
+            results["{:.0%} won".format(mine_percent)] = won / boards
+    finally:
+        solver.close()
+    return results
 
 
 def main(curse_context: Any) -> None:
@@ -397,5 +852,21 @@ def main(curse_context: Any) -> None:
 
 
 if __name__ == "__main__":
-    curses.wrapper(main)
-    curses.endwin()
+    parser = argparse.ArgumentParser(description="Minesweeper")
+    parser.add_argument(
+        "--benchmark",
+        action="store_true",
+        help="print how fast the solver gets through random boards, instead of playing",
+    )
+    parser.add_argument(
+        "--size", type=int, default=16, help="columns, and rows, of benchmark boards"
+    )
+    parser.add_argument("--boards", type=int, default=20, help="boards per density")
+    args = parser.parse_args()
+
+    if args.benchmark:
+        for (name, value) in benchmark(args.size, args.boards).items():
+            print("{}: {:.2f}".format(name, value))
+    else:
+        curses.wrapper(main)
+        curses.endwin()
@@ -0,0 +1,514 @@
+"""
+Minesweeper solver module
+
+Finds the cells known to be safe, and the ones known to be mines, from
+what the player sees: which cells are revealed, and their hints. Every
+revealed cell with covered neighbours is a constraint, the number of
+mines among those neighbours. The constraints are reduced with single
+cell rules, and by comparing overlapping pairs of them. What is left is
+split into components of cells linked by constraints, and every
+component is enumerated exactly, weighing its solutions by the ways the
+remaining mines fit the rest of the board. That gives the probability of
+every covered cell next to a revealed one to be a mine.
+
+Solving can be given a deadline of time.perf_counter, past which it
+stops with SolverTimeout, wherever it is.
+
+Cells are flat indices, y * cols + x, inside the module, and (x, y)
+pairs outside of it.
+"""
+import concurrent.futures
+import os
+from collections import deque
+from math import comb
+from time import perf_counter
+from typing import Dict, FrozenSet, List, NamedTuple, Optional, Set, Tuple
+
+import numpy as np
+
+# bigger components are not enumerated, their cells count as unconstrained
+MAX_COMPONENT_CELLS = 30
+# components this big are enumerated in the process pool, when there are several
+PARALLEL_COMPONENT_CELLS = 16
+# with more other cells, the global mine count is only taken as a density
+EXACT_OTHER_CELLS = 1000
+# constraints gone through between checks of the deadline
+DEADLINE_CHECK_STEP = 4096
+
+Constraint = Tuple[FrozenSet[int], int]
+
+_NEIGHBOUR_OFFSETS = [(dy, dx) for dy in (-1, 0, 1) for dx in (-1, 0, 1) if dy or dx]
+_NOT_A_CELL = frozenset((-1,))
+
+
+class SolverTimeout(Exception):
+    """Raised when solving runs past its deadline"""
+
+
+def _check_deadline(deadline: Optional[float]) -> None:
+    if deadline is not None and perf_counter() > deadline:
+        raise SolverTimeout
+
+
+class Deductions(NamedTuple):
+    """What is known about the covered cells"""
+
+    safe: Set[Tuple[int, int]]
+    mines: Set[Tuple[int, int]]
+    # mine probability of the covered cells next to revealed ones, not known for sure
+    probabilities: Dict[Tuple[int, int], float]
+    # mine probability of every other covered cell, None if it cannot be told
+    other_probability: Optional[float]
+
+
+def _count_around(cells: np.ndarray) -> np.ndarray:
+    """Returns how many of the 8 neighbours of every cell are set"""
+    rows, cols = cells.shape
+    padded = np.pad(cells.astype(np.int8), 1)
+    around = np.zeros((rows, cols), dtype=np.int8)
+    for dy in range(3):
+        for dx in range(3):
+            if dx != 1 or dy != 1:
+                around += padded[dy : dy + rows, dx : dx + cols]
+    return around
+
+
+def _board_constraints(
+    revealed: np.ndarray, hints: np.ndarray, deadline: Optional[float] = None
+) -> List[Constraint]:
+    """Returns the covered neighbours, and the mines among them, of the revealed cells"""
+    _check_deadline(deadline)
+    cols = revealed.shape[1]
+    covered = ~revealed
+    revealed_mines = revealed & (hints < 0)
+    counts = hints - _count_around(revealed_mines)
+
+    ys, xs = np.nonzero(revealed & ~revealed_mines & (_count_around(covered) > 0))
+    padded_covered = np.pad(covered, 1)
+    # flat index of every neighbour, -1 for the revealed ones, and off the board
+    neighbours = np.stack(
+        [
+            np.where(
+                padded_covered[ys + 1 + dy, xs + 1 + dx], (ys + dy) * cols + xs + dx, -1
+            )
+            for dy, dx in _NEIGHBOUR_OFFSETS
+        ],
+        axis=1,
+    )
+    counts = counts[ys, xs]
+
+    constraints = []
+    for start in range(0, len(ys), DEADLINE_CHECK_STEP):
+        _check_deadline(deadline)
+        stop = start + DEADLINE_CHECK_STEP
+        constraints.extend(
+            (frozenset(cells) - _NOT_A_CELL, count)
+            for cells, count in zip(
+                neighbours[start:stop].tolist(), counts[start:stop].tolist()
+            )
+        )
+    return constraints
+
+
+def _reduce(
+    constraints: List[Constraint],
+    safe: Set[int],
+    mines: Set[int],
+    deadline: Optional[float] = None,
+) -> List[Constraint]:
+    """Deduces safe cells and mines, returns the constraints left unsolved
+
+    Known cells are taken out of the constraints, and a constraint with
+    no mines, or only mines, left gives away all its cells. When nothing
+    more comes out of that, every pair of overlapping constraints is
+    compared: the mines in their overlap are bound by both, which can
+    pin down the overlap, and the cells only one of them has.
+    """
+    pending = set(constraints)
+    while True:
+        reduced = set()
+        progress = False
+        for checked, (cells, count) in enumerate(pending):
+            if checked % DEADLINE_CHECK_STEP == 0:
+                _check_deadline(deadline)
+            count -= len(cells & mines)
+            cells = cells - mines - safe
+            if not cells:
+                continue
+            if count == 0:
+                safe.update(cells)
+                progress = True
+            elif count == len(cells):
+                mines.update(cells)
+                progress = True
+            else:
+                reduced.add((cells, count))
+        pending = reduced
+        if progress:
+            continue
+
+        pending_list = list(pending)
+        cell_constraints = {}
+        for index, (cells, _count) in enumerate(pending_list):
+            for cell in cells:
+                cell_constraints.setdefault(cell, []).append(index)
+
+        derived = set()
+        for a_index, (a_cells, a_count) in enumerate(pending_list):
+            _check_deadline(deadline)
+            others = {
+                i for cell in a_cells for i in cell_constraints[cell] if i > a_index
+            }
+            for b_index in others:
+                b_cells, b_count = pending_list[b_index]
+                overlap = a_cells & b_cells
+                a_only = a_cells - overlap
+                b_only = b_cells - overlap
+                # bounds of the mines in the overlap
+                lowest = max(a_count - len(a_only), b_count - len(b_only), 0)
+                highest = min(a_count, b_count, len(overlap))
+                for only, count in ((a_only, a_count), (b_only, b_count)):
+                    if not only:
+                        continue
+                    if count - highest == len(only):
+                        derived.add((only, len(only)))
+                    elif count - lowest == 0:
+                        derived.add((only, 0))
+                    elif lowest == highest:
+                        derived.add((only, count - lowest))
+                if lowest == highest and (a_only or b_only):
+                    derived.add((overlap, lowest))
+
+        derived -= pending
+        if not derived:
+            return list(pending)
+        pending |= derived
+
+
+def _components(
+    constraints: List[Constraint],
+) -> List[Tuple[List[int], List[Constraint]]]:
+    """Splits the constraints into groups sharing no cells
+
+    The cells of a group come in the order they are reached from the
+    first one, so neighbouring cells stay close in the enumeration.
+    """
+    cell_constraints = {}
+    for constraint in constraints:
+        for cell in constraint[0]:
+            cell_constraints.setdefault(cell, []).append(constraint)
+
+    components = []
+    visited = set()
+    for start in cell_constraints:
+        if start in visited:
+            continue
+        visited.add(start)
+        cells = []
+        component_constraints = set()
+        queue = deque([start])
+        while queue:
+            cell = queue.popleft()
+            cells.append(cell)
+            for constraint in cell_constraints[cell]:
+                if constraint in component_constraints:
+                    continue
+                component_constraints.add(constraint)
+                for other in sorted(constraint[0]):
+                    if other not in visited:
+                        visited.add(other)
+                        queue.append(other)
+        components.append((cells, list(component_constraints)))
+    return components
+
+
+def _enumerate_component(
+    cells_cnt: int, constraints: list, deadline: Optional[float] = None
+) -> Dict[int, list]:
+    """Enumerates every way to place mines in a component
+
+    The constraints hold indices of the cells in the component. Returns,
+    per number of mines, the number of solutions, and how many of them
+    have a mine in every cell. Runs in the worker processes too.
+    """
+    cell_constraints = [[] for _ in range(cells_cnt)]
+    for index, (cells, _count) in enumerate(constraints):
+        for cell in cells:
+            cell_constraints[cell].append(index)
+    # mines still to place, and cells still to decide, of every constraint
+    needed = [count for _cells, count in constraints]
+    undecided = [len(cells) for cells, _count in constraints]
+    assignment = [False] * cells_cnt
+    solutions = {}
+
+    def assign(cell: int, mines_cnt: int) -> None:
+        _check_deadline(deadline)
+        if cell == cells_cnt:
+            if mines_cnt not in solutions:
+                solutions[mines_cnt] = [0, [0] * cells_cnt]
+            solution = solutions[mines_cnt]
+            solution[0] += 1
+            mine_counts = solution[1]
+            for index, is_mine in enumerate(assignment):
+                if is_mine:
+                    mine_counts[index] += 1
+            return
+
+        indices = cell_constraints[cell]
+        for index in indices:
+            undecided[index] -= 1
+        for is_mine in (False, True):
+            if is_mine:
+                for index in indices:
+                    needed[index] -= 1
+            if all(0 <= needed[index] <= undecided[index] for index in indices):
+                assignment[cell] = is_mine
+                assign(cell + 1, mines_cnt + is_mine)
+        for index in indices:
+            needed[index] += 1
+            undecided[index] += 1
+        assignment[cell] = False
+
+    assign(0, 0)
+    return solutions
+
+
+def _convolve(a: Dict[int, int], b: Dict[int, int]) -> Dict[int, int]:
+    """Returns the ways to place mines in two independent groups, per total"""
+    result = {}
+    for a_mines, a_ways in a.items():
+        for b_mines, b_ways in b.items():
+            result[a_mines + b_mines] = (
+                result.get(a_mines + b_mines, 0) + a_ways * b_ways
+            )
+    return result
+
+
+def _weigh_exactly(
+    enumerations: list, cells_cnts: List[int], others_cnt: int, remaining_mines: int
+) -> Optional[tuple]:
+    """Weighs the solutions of the components by the ways to place the other mines
+
+    The remaining mines not in the components are spread over the other
+    covered cells. Returns the weights of every cell of every component,
+    and of the other cells, or None if the mines cannot be placed at all.
+    """
+    ways_cache = {}
+
+    def other_ways(other_mines: int) -> int:
+        if other_mines not in ways_cache:
+            if 0 <= other_mines <= others_cnt:
+                ways_cache[other_mines] = comb(others_cnt, other_mines)
+            else:
+                ways_cache[other_mines] = 0
+        return ways_cache[other_mines]
+
+    ways = [{k: s[0] for k, s in solutions.items()} for solutions in enumerations]
+    prefixes = [{0: 1}]
+    for component_ways in ways:
+        prefixes.append(_convolve(prefixes[-1], component_ways))
+
+    total = 0
+    other_mines_weight = 0
+    for component_mines, component_ways in prefixes[-1].items():
+        other_mines = remaining_mines - component_mines
+        total += component_ways * other_ways(other_mines)
+        other_mines_weight += component_ways * other_ways(other_mines) * other_mines
+    if total == 0:
+        return None
+
+    # the ways of every component but one, per total, from the ones before and after it
+    component_weights = [None] * len(ways)
+    suffix = {0: 1}
+    for index in range(len(ways) - 1, -1, -1):
+        rest = _convolve(prefixes[index], suffix)
+        suffix = _convolve(suffix, ways[index])
+
+        mine_weights = [0] * cells_cnts[index]
+        for component_mines, (_solutions_cnt, mine_counts) in enumerations[
+            index
+        ].items():
+            weight = sum(
+                rest_ways * other_ways(remaining_mines - component_mines - rest_mines)
+                for rest_mines, rest_ways in rest.items()
+            )
+            for cell, mine_count in enumerate(mine_counts):
+                mine_weights[cell] += mine_count * weight
+        component_weights[index] = [(weight, total - weight) for weight in mine_weights]
+
+    other_safe_weight = others_cnt * total - other_mines_weight
+    return (component_weights, (other_mines_weight, other_safe_weight))
+
+
+def _weigh_by_density(
+    enumerations: list, cells_cnts: List[int], density: float
+) -> tuple:
+    """Weighs the solutions of the components as if every other cell was a mine by chance
+
+    Close to the exact weights when there are many other cells, and much
+    cheaper than those. Takes and returns the same as _weigh_exactly.
+    """
+    odds = density / (1 - density)
+    component_weights = []
+    for solutions, cells_cnt in zip(enumerations, cells_cnts):
+        mine_weights = [0.0] * cells_cnt
+        safe_weights = [0.0] * cells_cnt
+        for component_mines, (solutions_cnt, mine_counts) in solutions.items():
+            weight = odds**component_mines
+            for cell, mine_count in enumerate(mine_counts):
+                mine_weights[cell] += mine_count * weight
+                safe_weights[cell] += (solutions_cnt - mine_count) * weight
+        component_weights.append(list(zip(mine_weights, safe_weights)))
+    return (component_weights, (density, 1 - density))
+
+
+class Solver:
+    """
+    Solver class
+
+    Deduces what it can from a board. Large components are enumerated in
+    a process pool, started on first use, shut down with close.
+    """
+
+    def __init__(
+        self,
+        workers: Optional[int] = None,
+        max_component_cells: int = MAX_COMPONENT_CELLS,
+    ):
+        self._workers = workers or os.cpu_count() or 1
+        self._max_component_cells = max_component_cells
+        self._executor = None
+
+    def solve(
+        self,
+        revealed: np.ndarray,
+        hints: np.ndarray,
+        mines_cnt: int,
+        deadline: Optional[float] = None,
+    ) -> Deductions:
+        """Deduces what it can about the covered cells
+
+        Takes which cells are revealed, the hints of the board, as rows *
+        cols arrays, and the number of mines on it. Revealed mines count
+        as known mines. Marks are not taken into account, they may be
+        wrong. Raises SolverTimeout past the deadline.
+        """
+        cols = revealed.shape[1]
+        safe = set()
+        mines = set()
+        constraints = _board_constraints(revealed, hints, deadline)
+        constraints = _reduce(constraints, safe, mines, deadline)
+
+        components = []
+        pooled_cells = []
+        for cells, component_constraints in _components(constraints):
+            if len(cells) > self._max_component_cells:
+                pooled_cells.extend(cells)
+            else:
+                components.append((cells, component_constraints))
+        enumerations = self._enumerate(components, deadline)
+        _check_deadline(deadline)
+
+        covered_cnt = revealed.size - int(np.count_nonzero(revealed))
+        revealed_mines_cnt = int(np.count_nonzero(revealed & (hints < 0)))
+        remaining_mines = mines_cnt - revealed_mines_cnt - len(mines)
+        enumerated_cnt = sum(len(cells) for cells, _constraints in components)
+        # cells of no enumerated component, nor known for sure
+        others_cnt = covered_cnt - len(safe) - len(mines) - enumerated_cnt
+
+        cells_cnts = [len(cells) for cells, _constraints in components]
+        density = remaining_mines / max(others_cnt + sum(cells_cnts), 1)
+        if others_cnt > EXACT_OTHER_CELLS and 0 < density < 1:
+            weighing = _weigh_by_density(enumerations, cells_cnts, density)
+        else:
+            weighing = _weigh_exactly(
+                enumerations, cells_cnts, others_cnt, remaining_mines
+            )
+
+        probabilities = {}
+        other_probability = None
+        # with a mine count not matching the board, only the sure cells are given
+        if weighing is not None:
+            (component_weights, (other_mine_weight, other_safe_weight)) = weighing
+            for (cells, _cell_constraints), weights in zip(
+                components, component_weights
+            ):
+                for cell, (mine_weight, safe_weight) in zip(cells, weights):
+                    if mine_weight == 0:
+                        safe.add(cell)
+                    elif safe_weight == 0:
+                        mines.add(cell)
+                    else:
+                        probabilities[(cell % cols, cell // cols)] = mine_weight / (
+                            mine_weight + safe_weight
+                        )
+
+            if others_cnt and (other_mine_weight == 0 or other_safe_weight == 0):
+                # the cells of big components are among the others, as unconstrained
+                known = safe if other_mine_weight == 0 else mines
+                enumerated = {
+                    cell for cells, _constraints in components for cell in cells
+                }
+                known.update(
+                    cell
+                    for cell in np.flatnonzero(~revealed).tolist()
+                    if cell not in enumerated and cell not in safe and cell not in mines
+                )
+            elif others_cnt:
+                other_probability = other_mine_weight / (
+                    other_mine_weight + other_safe_weight
+                )
+                probabilities.update(
+                    ((cell % cols, cell // cols), other_probability)
+                    for cell in pooled_cells
+                )
+
+        return Deductions(
+            {(i % cols, i // cols) for i in safe},
+            {(i % cols, i // cols) for i in mines},
+            probabilities,
+            other_probability,
+        )
+
+    def _enumerate(
+        self, components: list, deadline: Optional[float] = None
+    ) -> List[Dict[int, list]]:
+        """Enumerates the components, the big ones in the process pool if there are several"""
+        tasks = []
+        for cells, constraints in components:
+            indices = {cell: index for index, cell in enumerate(cells)}
+            local_constraints = [
+                (tuple(indices[cell] for cell in constraint_cells), count)
+                for constraint_cells, count in constraints
+            ]
+            tasks.append((len(cells), local_constraints, deadline))
+
+        big_tasks = [task for task in tasks if task[0] >= PARALLEL_COMPONENT_CELLS]
+        if self._workers > 1 and len(big_tasks) > 1:
+            if self._executor is None:
+                self._executor = concurrent.futures.ProcessPoolExecutor(self._workers)
+            futures = {
+                index: self._executor.submit(_enumerate_component, *task)
+                for index, task in enumerate(tasks)
+                if task[0] >= PARALLEL_COMPONENT_CELLS
+            }
+            try:
+                return [
+                    futures[index].result()
+                    if index in futures
+                    else _enumerate_component(*task)
+                    for index, task in enumerate(tasks)
+                ]
+            except SolverTimeout:
+                # the running ones check the deadline, and stop by themselves
+                for future in futures.values():
+                    future.cancel()
+                raise
+
+        return [_enumerate_component(*task) for task in tasks]
+
+    def close(self):
+        """Shut the process pool down."""
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
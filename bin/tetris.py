@@ -1,99 +1,209 @@
+import argparse
 import curses
 import locale
+import random
 import sys
-from typing import TYPE_CHECKING, Any, Callable, Dict
+import time
+from typing import Any, Dict, Optional
 
 from play_sounds import play_file as playsound
 from play_sounds import play_while_running
-from tetris.core import Game
-from tetris.exceptions import CollisionError, OutOfBoundsError
+from tetris.ai import AutoPlayer
+from tetris.core import GRID_HEIGHT, GRID_WIDTH, MIN_GRID_SIZE, Game
+from tetris.generators import GENERATORS
+from tetris.replay import ReplayRecorder
+from tetris.scheduler import INPUT_POLL_MS, FixedStepScheduler, FrameStats
 from tetris.user_interface import UserInterface, create_screens, make_color_pairs
 from tetris.utils import Window
 
-if TYPE_CHECKING:
-    from tetris.core import Tetromino
-else:
-    Tetromino = Any
-
 sound_path = "bin/utils/sound/sfx_tetris_"
 sfx_ingame_path = sound_path + "theme.wav"
 
-KeyBindings = Dict[int, Callable[[Tetromino], None]]
+KeyBindings = Dict[int, str]
+
+# seconds between two actions of the autoplayer
+AUTOPLAY_STEP: float = 0.05
 
 KEY_BINDINGS: KeyBindings = {
-    curses.KEY_LEFT: lambda tetromino: tetromino.move_sideways("left"),
-    curses.KEY_RIGHT: lambda tetromino: tetromino.move_sideways("right"),
-    curses.KEY_DOWN: lambda tetromino: tetromino.move_down(),
-    ord("s"): lambda tetromino: tetromino.move_all_the_way_down(),
-    ord("a"): lambda tetromino: tetromino.rotate("left"),
-    ord("d"): lambda tetromino: tetromino.rotate("right"),
+    curses.KEY_LEFT: "left",
+    curses.KEY_RIGHT: "right",
+    curses.KEY_DOWN: "down",
+    ord("s"): "drop",
+    ord("a"): "rotate_left",
+    ord("d"): "rotate_right",
 }
 
 
-def start_new_game(curse_context: Window) -> None:
+def start_new_game(curse_context: Window, **options: Any) -> None:
     """Prompt to start a new game"""
     with play_while_running(sfx_ingame_path):
-        main(curse_context)
-
-
-def main(stdscr: Window) -> None:
-    """Main function called from outside with all attributes"""
+        main(curse_context, **options)
+
+
+def main(
+    stdscr: Window,
+    stats_path: Optional[str] = None,
+    show_stats: bool = False,
+    autoplay: bool = False,
+    seed: Optional[int] = None,
+    generator: str = "random",
+    record_path: Optional[str] = None,
+    width: int = GRID_WIDTH,
+    height: int = GRID_HEIGHT,
+) -> None:
+    """Main function called from outside with all attributes
+
+    Game logic runs at a fixed timestep, input is polled every few milliseconds
+    and frames are rendered at a capped rate, or right after a key moved the
+    tetromino. Per-frame timings are shown with 'i' and written to stats_path.
+    With autoplay, or after pressing 't', the tetrominos are placed by the AI.
+    Every applied action is recorded, so the session can be saved as a replay
+    to record_path and re-simulated with ``python -m tetris.replay``. The board
+    is width by height cells and has to fit in the terminal.
+    """
     locale.setlocale(locale.LC_ALL, "")
     stdscr.nodelay(True)
     curses.curs_set(False)
 
-    border_screen, inner_screen = create_screens(stdscr)
+    border_screen, inner_screen = create_screens(stdscr, width, height)
 
     assert border_screen is not None, "minimum screen size required"
     assert inner_screen is not None, "minimum screen size required"
 
     make_color_pairs()
 
-    inner_screen.timeout(100)
+    inner_screen.timeout(INPUT_POLL_MS)
     inner_screen.keypad(True)
 
-    user_interface = UserInterface(stdscr, inner_screen)
-    game = Game(inner_screen, user_interface)
-
-    while True:
-        for screen in (inner_screen, border_screen, stdscr):
-            screen.erase()
-
-        border_screen.box(0, 0)
+    if seed is None:
+        seed = random.randrange(2**63)
 
-        user_interface.render_landed_tetrominos(game.grid)
-        user_interface.render_current_tetromino(game.tetromino)
-        user_interface.render_next_tetromino(game.next_tetromino)
-        user_interface.render_instructions()
-        user_interface.render_score(game.score)
-
-        stdscr.refresh()
-        inner_screen.refresh()
-
-        if not game.paused:
-            game.handle_falling()
-            game.clear_rows()
-
-        try:
-            user_input = inner_screen.getch()
-        except curses.error:
-            continue
-        except KeyboardInterrupt:
-            sys.exit()
-
-        if user_input == ord("p"):
-            game.pause()
-
-        elif user_input == ord("q"):
-            return
-
-        elif not game.paused and user_input in KEY_BINDINGS:
+    user_interface = UserInterface(stdscr, inner_screen)
+    game = Game(
+        inner_screen,
+        user_interface,
+        seed=seed,
+        generator=generator,
+        width=width,
+        height=height,
+    )
+    scheduler = FixedStepScheduler(game)
+    stats = FrameStats(stats_path)
+    recorder = ReplayRecorder(seed, generator, scheduler.step, width, height)
+    autoplayer = AutoPlayer(game) if autoplay else None
+    last_autoplay = 0.0
+    input_time = logic_time = 0.0
+
+    for screen in (inner_screen, border_screen, stdscr):
+        screen.erase()
+
+    border_screen.box(0, 0)
+    border_screen.noutrefresh()
+
+    def apply_action(action: str) -> None:
+        if game.apply_action(action):
+            recorder.record(scheduler.ticks, action)
+            scheduler.force_render()
+
+    try:
+        while True:
             try:
-                KEY_BINDINGS[user_input](game.tetromino)
-            except (CollisionError, OutOfBoundsError):
-                continue
+                user_input = inner_screen.getch()
+            except curses.error:
+                user_input = -1
+            except KeyboardInterrupt:
+                sys.exit()
+            polled = time.perf_counter()
+
+            if user_input == ord("p"):
+                game.pause()
+
+            elif user_input == ord("q"):
+                return
+
+            elif user_input == ord("i"):
+                show_stats = not show_stats
+                user_interface.render_stats("")
+                scheduler.force_render()
+
+            elif user_input == ord("t"):
+                autoplayer = AutoPlayer(game) if autoplayer is None else None
+
+            elif not game.paused and user_input in KEY_BINDINGS:
+                apply_action(KEY_BINDINGS[user_input])
+
+            if (
+                autoplayer is not None
+                and not game.paused
+                and polled - last_autoplay >= AUTOPLAY_STEP
+            ):
+                action = autoplayer.next_action()
+                if action is not None:
+                    apply_action(action)
+                last_autoplay = polled
+            handled = time.perf_counter()
+
+            if scheduler.update():
+                return
+            updated = time.perf_counter()
+            input_time += handled - polled
+            logic_time += updated - handled
+
+            # most polls draw nothing, so a frame's row sums every poll since the last one
+            if scheduler.render_due():
+                if show_stats:
+                    user_interface.render_stats(stats.summary())
+                user_interface.render_frame(game)
+                stats.record(input_time, logic_time, time.perf_counter() - updated)
+                input_time = logic_time = 0.0
+    finally:
+        stats.close()
+        if record_path is not None:
+            recorder.save(record_path, scheduler.ticks)
 
 
 if __name__ == "__main__":
-    curses.wrapper(start_new_game)
+    parser = argparse.ArgumentParser(description="Tetris")
+    parser.add_argument(
+        "--stats",
+        dest="stats_path",
+        metavar="FILE",
+        help="write per-frame timings to FILE as CSV",
+    )
+    parser.add_argument(
+        "--show-stats", action="store_true", help="show per-frame timings on screen"
+    )
+    parser.add_argument(
+        "--autoplay", action="store_true", help="let the AI play, e.g. as a demo"
+    )
+    parser.add_argument("--seed", type=int, help="seed of the tetromino generator")
+    parser.add_argument(
+        "--generator",
+        choices=list(GENERATORS),
+        default="random",
+        help="how tetrominos are dealt",
+    )
+    parser.add_argument(
+        "--record",
+        dest="record_path",
+        metavar="FILE",
+        help="save a replay of the session to FILE",
+    )
+    parser.add_argument(
+        "--width",
+        type=int,
+        default=GRID_WIDTH,
+        help=f"number of columns of the board (default: {GRID_WIDTH})",
+    )
+    parser.add_argument(
+        "--height",
+        type=int,
+        default=GRID_HEIGHT,
+        help=f"number of rows of the board (default: {GRID_HEIGHT})",
+    )
+    args = parser.parse_args()
+    if args.width < MIN_GRID_SIZE or args.height < MIN_GRID_SIZE:
+        parser.error(f"the board has to be at least {MIN_GRID_SIZE}x{MIN_GRID_SIZE}")
+
+    curses.wrapper(start_new_game, **vars(args))
     curses.endwin()
@@ -0,0 +1,303 @@
+import time
+from collections import deque
+from typing import Deque, Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+from tetris.core import Game
+from tetris.shapes import ROW_MASKS, SHAPE_TABLE, SHAPES
+
+Rows = Tuple[int, ...]
+Heights = Tuple[int, ...]
+
+# cached surfaces are dropped all at once when the cache grows past this
+CACHE_SIZE: int = 100_000
+
+
+class Weights(NamedTuple):
+    """Weights of the board features scored by the placement search"""
+
+    height: float = -0.510066
+    lines: float = 0.760666
+    holes: float = -0.35663
+    bumpiness: float = -0.184483
+
+
+class Placement(NamedTuple):
+    """Where a tetromino ends up: its rotation and the top left corner it lands at"""
+
+    shape: int
+    y: int
+    x: int
+
+
+class PlacementSearch:
+    """Searches every rotation and column for the best place to drop a tetromino
+
+    A placement is reachable when the tetromino can be rotated where it
+    spawned, shifted sideways and dropped straight down without hitting
+    anything. Blocks under the surface of the stack cannot be in the way
+    of such a move, so the reachable placements only depend on the
+    column heights. They are cached under those heights, which keeps
+    recurring surfaces from being searched again. Placements are scored
+    by aggregate height, cleared lines, holes and bumpiness, looking one
+    tetromino ahead when the next one is known.
+    """
+
+    def __init__(
+        self, width: int, height: int, weights: Weights = Weights(), beam: int = 8
+    ):
+        self.width = width
+        self.height = height
+        self.weights = weights
+        self.beam = beam
+        self.full_row = (1 << width) - 1
+        self.hits = 0
+        self.misses = 0
+        self._cache: Dict[Tuple[int, int, int, Heights], List[Placement]] = {}
+
+    def best(
+        self, rows: Rows, shape: int, y: int, x: int, next_shape: Optional[int] = None
+    ) -> Optional[Placement]:
+        """Returns the best placement of the tetromino at (y, x), or None if it cannot move.
+
+        With a next tetromino, only the ``beam`` best placements on their own
+        are searched one tetromino deeper.
+        """
+        candidates = []
+        for placement in self.placements(rows, shape, y, x):
+            if placement.y <= 0:
+                continue
+            landed, lines = self.drop(rows, placement)
+            candidates.append((self.evaluate(landed, lines), placement, landed, lines))
+        if not candidates:
+            return None
+
+        candidates.sort(key=lambda candidate: candidate[0], reverse=True)
+        if next_shape is None:
+            return candidates[0][1]
+
+        return max(
+            candidates[: self.beam],
+            key=lambda candidate: self._best_score(
+                candidate[2], candidate[3], next_shape
+            ),
+        )[1]
+
+    def placements(self, rows: Rows, shape: int, y: int, x: int) -> List[Placement]:
+        """Returns every placement reachable from (y, x) by rotating right, shifting and dropping.
+
+        While the stack is too low to be in the way of the tetromino, only the
+        shape of the surface matters, so heights are cached relative to the
+        lowest column and the landing rows are shifted back afterwards.
+        """
+        heights = self.column_heights(rows)
+        floor = min(heights)
+        if max(heights) + 4 + y <= self.height:
+            heights = tuple(height - floor for height in heights)
+        else:
+            floor = 0
+
+        key = (shape, y, x, heights)
+        if key in self._cache:
+            self.hits += 1
+        else:
+            self.misses += 1
+            if len(self._cache) >= CACHE_SIZE:
+                self._cache.clear()
+            self._cache[key] = self._reachable(heights, shape, y, x)
+
+        if not floor:
+            return self._cache[key]
+        return [
+            Placement(placement.shape, placement.y - floor, placement.x)
+            for placement in self._cache[key]
+        ]
+
+    def _reachable(
+        self, heights: Heights, shape: int, y: int, x: int
+    ) -> List[Placement]:
+        """Returns the placements reachable from (y, x) on a surface of column heights."""
+        letter = next(letter for letter, shapes in SHAPES.items() if shape in shapes)
+        rotations = SHAPES[letter]
+        start = rotations.index(shape)
+
+        found = []
+        for turns in range(len(rotations)):
+            rotation = rotations[(start + turns) % len(rotations)]
+            if self._landing_row(heights, rotation, x) < y:
+                # rotating in place is blocked, so are all further rotations
+                break
+            for direction in (-1, 1):
+                column = x if direction == -1 else x + 1
+                while self._landing_row(heights, rotation, column) >= y:
+                    found.append(
+                        Placement(
+                            rotation,
+                            self._landing_row(heights, rotation, column),
+                            column,
+                        )
+                    )
+                    column += direction
+
+        return found
+
+    def drop(self, rows: Rows, placement: Placement) -> Tuple[Rows, int]:
+        """Lands a placement on the rows and returns the new rows and the number of cleared lines."""
+        top, left, _, masks = ROW_MASKS[placement.shape]
+        top += placement.y
+        left += placement.x
+
+        landed = list(rows)
+        for offset, mask in enumerate(masks):
+            landed[top + offset] |= mask << left
+
+        kept = [row for row in landed if row != self.full_row]
+        lines = len(landed) - len(kept)
+        return (0,) * lines + tuple(kept), lines
+
+    def evaluate(self, rows: Rows, lines: int) -> float:
+        """Scores rows by aggregate height, cleared lines, holes and bumpiness."""
+        heights = [0] * self.width
+        covered = 0
+        holes = 0
+        for rowidx, row in enumerate(rows):
+            uncovered = row & ~covered
+            while uncovered:
+                lowest = uncovered & -uncovered
+                heights[lowest.bit_length() - 1] = self.height - rowidx
+                uncovered ^= lowest
+            covered |= row
+            holes += bin(covered & ~row).count("1")
+
+        bumpiness = sum(abs(a - b) for a, b in zip(heights, heights[1:]))
+        return (
+            self.weights.height * sum(heights)
+            + self.weights.lines * lines
+            + self.weights.holes * holes
+            + self.weights.bumpiness * bumpiness
+        )
+
+    def column_heights(self, rows: Rows) -> Heights:
+        """Returns the height of the highest filled cell of every column, 0 when empty."""
+        heights = [0] * self.width
+        covered = 0
+        for rowidx, row in enumerate(rows):
+            uncovered = row & ~covered
+            while uncovered:
+                lowest = uncovered & -uncovered
+                heights[lowest.bit_length() - 1] = self.height - rowidx
+                uncovered ^= lowest
+            covered |= row
+            if covered == self.full_row:
+                break
+        return tuple(heights)
+
+    def _best_score(self, rows: Rows, lines: int, shape: int) -> float:
+        """Returns the score of the best placement of a freshly spawned tetromino."""
+        x = self.width // 2 - 1
+        best_score = float("-inf")
+        for placement in self.placements(rows, shape, 0, x):
+            if placement.y <= 0:
+                continue
+            landed, more_lines = self.drop(rows, placement)
+            best_score = max(best_score, self.evaluate(landed, lines + more_lines))
+        if best_score == float("-inf"):
+            return self.evaluate(rows, lines) - self.height * self.width
+        return best_score
+
+    def _landing_row(self, heights: Heights, shape: int, x: int) -> int:
+        """Returns the row the shape lands on when dropped in column x, -1 if it is out of bounds."""
+        info = SHAPE_TABLE[shape]
+        if info.left + x < 0 or info.right + x >= self.width:
+            return -1
+        return min(
+            self.height - heights[colidx + x] - 1 - rowidx
+            for rowidx, colidx in info.lowest
+        )
+
+
+class AutoPlayer:
+    """Plays a game by turning the best placement of every tetromino into ACTIONS"""
+
+    def __init__(self, game: Game, search: Optional[PlacementSearch] = None):
+        self.game = game
+        self.search = search or PlacementSearch(game.grid.width, game.grid.height)
+        self._planned_for: Optional[object] = None
+        self._actions: Deque[str] = deque()
+
+    def plan(self) -> List[str]:
+        """Returns the actions that bring the current tetromino to its best placement."""
+        tetromino = self.game.tetromino
+        y, x = tetromino.topleft
+        placement = self.search.best(
+            self.game.grid.row_masks(),
+            tetromino.shape,
+            y,
+            x,
+            self.game.next_tetromino.shape,
+        )
+        if placement is None:
+            return ["drop"]
+
+        rotations = SHAPES[tetromino.letter]
+        turns = rotations.index(placement.shape) - rotations.index(tetromino.shape)
+        actions = ["rotate_right"] * (turns % len(rotations))
+        if placement.x < x:
+            actions += ["left"] * (x - placement.x)
+        else:
+            actions += ["right"] * (placement.x - x)
+        return actions + ["drop"]
+
+    def next_action(self) -> Optional[str]:
+        """Returns the next action for the current tetromino, planning when a new one spawned."""
+        if self._planned_for is not self.game.tetromino:
+            self._planned_for = self.game.tetromino
+            self._actions = deque(self.plan())
+        return self._actions.popleft() if self._actions else None
+
+    def play_piece(self) -> bool:
+        """Plays the current tetromino until it lands and returns True once the game is over."""
+        tetromino = self.game.tetromino
+        action = self.next_action()
+        while action is not None:
+            self.game.apply_action(action)
+            action = self.next_action()
+        while self.game.tetromino is tetromino:
+            if self.game.fall():
+                return True
+        return False
+
+
+def benchmark(seeds: Sequence[int], max_pieces: int = 500) -> Dict[str, float]:
+    """Plays one game per seed with the autoplayer and reports its throughput."""
+    pieces = 0
+    lines = 0
+    hits = 0
+    misses = 0
+    started = time.perf_counter()
+    for seed in seeds:
+        game = Game(seed=seed)
+        player = AutoPlayer(game)
+        for _ in range(max_pieces):
+            pieces += 1
+            if player.play_piece():
+                break
+        lines += game.lines
+        hits += player.search.hits
+        misses += player.search.misses
+    elapsed = time.perf_counter() - started
+
+    return {
+        "games": len(seeds),
+        "pieces": pieces,
+        "lines": lines,
+        "seconds": elapsed,
+        "pieces_per_second": pieces / elapsed,
+        "cache_hit_rate": hits / max(1, hits + misses),
+    }
+
+
+if __name__ == "__main__":
+    for name, value in benchmark(range(5)).items():
+        print(
+            f"{name}: {value:.3f}" if isinstance(value, float) else f"{name}: {value}"
+        )
@@ -0,0 +1,182 @@
+import argparse
+import curses
+import random
+import time
+from typing import Callable, List, NamedTuple, Optional, Sequence, Tuple
+
+from tetris.core import COLORS, GRID_BACKENDS, Game
+from tetris.shapes import SHAPE_TABLE, SHAPES
+from tetris.user_interface import UserInterface, make_color_pairs
+from tetris.utils import Window
+
+# board sizes, width by height, the operations are measured on
+SIZES: Tuple[Tuple[int, int], ...] = (
+    (10, 20),
+    (20, 40),
+    (50, 100),
+    (100, 200),
+    (200, 400),
+)
+
+MOVES: Tuple[str, ...] = ("left", "right", "rotate_right", "rotate_left", "down")
+
+Operation = Callable[[Game, random.Random, int], float]
+
+
+class Result(NamedTuple):
+    """Time spent in one operation on one board size"""
+
+    width: int
+    height: int
+    backend: str
+    operation: str
+    calls: int
+    seconds: float
+
+    @property
+    def microseconds(self) -> float:
+        """Average time of one call in microseconds."""
+        return self.seconds / self.calls * 1_000_000
+
+
+def bench_moves(game: Game, rng: random.Random, calls: int) -> float:
+    """Shifts, turns and lowers tetrominos and returns the time spent in apply_action()."""
+    elapsed = 0.0
+    for _ in range(calls):
+        action = rng.choice(MOVES)
+        started = time.perf_counter()
+        moved = game.apply_action(action)
+        elapsed += time.perf_counter() - started
+        if action == "down" and not moved:
+            game.tetromino = game.spawn()
+    return elapsed
+
+
+def bench_landings(game: Game, rng: random.Random, calls: int) -> float:
+    """Drops tetrominos in random columns and returns the time spent dropping and landing them."""
+    elapsed = 0.0
+    for _ in range(calls):
+        _shift_randomly(game, rng)
+        started = time.perf_counter()
+        game.apply_action("drop")
+        game.fall()
+        elapsed += time.perf_counter() - started
+        if game.game_over:
+            game.restart()
+    return elapsed
+
+
+def bench_clears(
+    game: Game, rng: random.Random, calls: int  # pylint: disable=unused-argument
+) -> float:
+    """Fills the four bottom rows and returns the time spent clearing them."""
+    o_shape = SHAPES["O"][0]
+    top, left = SHAPE_TABLE[o_shape].top, SHAPE_TABLE[o_shape].left
+    elapsed = 0.0
+    for _ in range(calls):
+        game.restart()
+        for y in range(game.height - 4, game.height, 2):
+            for x in range(0, game.width, 2):
+                game.grid.place(o_shape, y - top, x - left, COLORS["O"])
+        started = time.perf_counter()
+        game.clear_rows()
+        elapsed += time.perf_counter() - started
+    return elapsed
+
+
+def bench_render(
+    user_interface: UserInterface, game: Game, rng: random.Random, calls: int
+) -> float:
+    """Plays random frames and returns the time spent drawing the changed cells.
+
+    Only the diffing and drawing into the window is measured, as the time
+    the terminal takes to display a frame depends on the terminal.
+    """
+    elapsed = 0.0
+    for _ in range(calls):
+        if rng.random() < 0.2:
+            _shift_randomly(game, rng)
+            game.apply_action("drop")
+        game.fall()
+        if game.game_over:
+            game.restart()
+        started = time.perf_counter()
+        user_interface.render_grid(game)
+        elapsed += time.perf_counter() - started
+    return elapsed
+
+
+def run(
+    sizes: Sequence[Tuple[int, int]] = SIZES,
+    backends: Sequence[str] = tuple(GRID_BACKENDS),
+    calls: int = 1000,
+    stdscr: Optional[Window] = None,
+) -> List[Result]:
+    """Measures every operation on every board size and backend.
+
+    Rendering is only measured when a curses screen is given.
+    """
+    operations: List[Tuple[str, Operation]] = [
+        ("move", bench_moves),
+        ("land", bench_landings),
+        ("clear", bench_clears),
+    ]
+
+    results = []
+    for width, height in sizes:
+        for backend in backends:
+            for name, operation in operations:
+                game = Game(backend=backend, seed=0, width=width, height=height)
+                seconds = operation(game, random.Random(0), calls)
+                results.append(Result(width, height, backend, name, calls, seconds))
+
+            if stdscr is not None:
+                game = Game(backend=backend, seed=0, width=width, height=height)
+                user_interface = UserInterface(stdscr, curses.newpad(height, width * 2))
+                seconds = bench_render(user_interface, game, random.Random(0), calls)
+                results.append(Result(width, height, backend, "render", calls, seconds))
+    return results
+
+
+def _shift_randomly(game: Game, rng: random.Random) -> None:
+    """Turns the current tetromino and shifts it to a random column."""
+    for _ in range(rng.randrange(4)):
+        game.apply_action("rotate_right")
+    direction = rng.choice(("left", "right"))
+    for _ in range(rng.randrange(game.width // 2 + 1)):
+        if not game.apply_action(direction):
+            break
+
+
+def _run_in_curses(stdscr: Window, **options: int) -> List[Result]:
+    """Runs the benchmarks with rendering into off-screen curses pads."""
+    make_color_pairs()
+    return run(stdscr=stdscr, **options)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Measures tetris operations as the board grows"
+    )
+    parser.add_argument(
+        "--calls", type=int, default=1000, help="calls per operation and board size"
+    )
+    parser.add_argument(
+        "--render",
+        action="store_true",
+        help="also measure rendering, which needs a terminal",
+    )
+    args = parser.parse_args()
+
+    if args.render:
+        benchmark_results = curses.wrapper(_run_in_curses, calls=args.calls)
+    else:
+        benchmark_results = run(calls=args.calls)
+
+    print(f"{'board':>9} {'backend':>8} {'operation':>9} {'us/call':>10}")
+    for result in benchmark_results:
+        board = f"{result.width}x{result.height}"
+        print(
+            f"{board:>9} {result.backend:>8} {result.operation:>9} "
+            f"{result.microseconds:>10.2f}"
+        )
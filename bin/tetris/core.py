@@ -1,10 +1,20 @@
 import curses
-import random
-import sys
-from typing import TYPE_CHECKING, Any, Dict, List, Optional, Sequence
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Callable,
+    Dict,
+    NamedTuple,
+    Optional,
+    Tuple,
+    Type,
+    Union,
+)
 
-import more_itertools
 from tetris.exceptions import CollisionError, GameOverError, OutOfBoundsError
+from tetris.generators import GENERATORS, PieceGenerator
+from tetris.grid import BitGrid, ListGrid
+from tetris.shapes import SHAPES, ShapeVec, to_4x4
 from tetris.utils import Window
 
 if TYPE_CHECKING:
@@ -13,16 +23,6 @@ else:
     UserInterface = Any
 
 
-SHAPES: Dict[str, List[int]] = {
-    "O": [51],
-    "I": [8738, 240],
-    "S": [54, 561],
-    "Z": [99, 306],
-    "J": [275, 71, 802, 113],
-    "L": [547, 116, 785, 23],
-    "T": [114, 305, 39, 562],
-}
-
 COLORS: Dict[str, int] = {
     "I": curses.COLOR_YELLOW,
     "O": curses.COLOR_BLUE,
@@ -38,63 +38,179 @@ DIRECTIONS: Dict[str, int] = {"right": 1, "left": -1}
 GRID_WIDTH: int = 20
 GRID_HEIGHT: int = 30
 
-Grid = List[List[List[Optional[int]]]]
-ShapeVec = List[Sequence[int]]
+# smallest board every tetromino can spawn and turn on
+MIN_GRID_SIZE: int = 4
 
+# seconds between two rows of gravity on level 0, and how it speeds up
+GRAVITY_INTERVAL: float = 0.5
+GRAVITY_SPEEDUP: float = 0.85
+MIN_GRAVITY_INTERVAL: float = 0.05
+LINES_PER_LEVEL: int = 10
 
-class Game:
-    """Class to manage the different game state"""
+Grid = Union[ListGrid, BitGrid]
+
+GRID_BACKENDS: Dict[str, Type[Grid]] = {"list": ListGrid, "bitboard": BitGrid}
+
+ACTIONS: Dict[str, Callable[["Tetromino"], None]] = {
+    "left": lambda tetromino: tetromino.move_sideways("left"),
+    "right": lambda tetromino: tetromino.move_sideways("right"),
+    "down": lambda tetromino: tetromino.move_down(),
+    "drop": lambda tetromino: tetromino.move_all_the_way_down(),
+    "rotate_left": lambda tetromino: tetromino.rotate("left"),
+    "rotate_right": lambda tetromino: tetromino.rotate("right"),
+}
+
+
+class Observation(NamedTuple):
+    """Snapshot of a game, as seen by bots and tests
+
+    ``rows`` holds one bitmask per grid row, with bit ``n`` set when
+    column ``n`` is filled.
+    """
+
+    rows: Tuple[int, ...]
+    letter: str
+    shape: int
+    topleft: Tuple[int, int]
+    next_letter: str
+    score: int
+    game_over: bool
 
-    def __init__(self, screen: Window, user_interface: UserInterface):
+
+class Game:
+    """Class to manage the different game state
+
+    Screen and user interface are optional, so the game can be driven
+    headlessly through apply_action(), step() and observe(). Tetrominos are
+    dealt by a generator, either one of GENERATORS created from the seed, or
+    an instance such as a SequenceGenerator. The board is ``width`` columns by
+    ``height`` rows, GRID_WIDTH by GRID_HEIGHT unless given.
+    """
+
+    def __init__(
+        self,
+        screen: Optional[Window] = None,
+        user_interface: Optional[UserInterface] = None,
+        backend: str = "bitboard",
+        seed: Optional[int] = None,
+        generator: Union[str, PieceGenerator] = "random",
+        width: int = GRID_WIDTH,
+        height: int = GRID_HEIGHT,
+    ):
         self.screen = screen
         self.user_interface = user_interface
-        self.grid = [[[0, None] for _ in range(GRID_WIDTH)] for _ in range(GRID_HEIGHT)]
-        self.tetromino: Tetromino = Tetromino(self.grid)
-        self.next_tetromino: Tetromino = Tetromino(self.grid)
+        self.backend = backend
+        self.seed = seed
+        self.width = width
+        self.height = height
+        if isinstance(generator, str):
+            generator = GENERATORS[generator](seed)
+        self.generator: PieceGenerator = generator
+        self.grid: Grid = GRID_BACKENDS[self.backend](self.width, self.height)
+        self.tetromino: Tetromino = self.spawn()
+        self.next_tetromino: Tetromino = self.spawn()
         self.counter: int = 0
         self.score: int = 0
+        self.lines: int = 0
         self.paused: bool = False
+        self.game_over: bool = False
 
     def clear_rows(self) -> None:
-        """Clears all the filled rows and prepends the grid with an empty row."""
-        for row in self.grid.copy():
-            if all(x[0] == 1 for x in row):
-                self.grid.remove(row)
-                self.grid.insert(0, [[0, None] for _ in range(GRID_WIDTH)])
-                self.score += GRID_WIDTH
-
-    def handle_falling(self) -> None:
+        """Clears the rows filled by the last landing and prepends the grid with empty rows."""
+        cleared = self.grid.clear_full_rows()
+        self.lines += cleared
+        self.score += cleared * self.width
+
+    @property
+    def level(self) -> int:
+        """Current level, raised every LINES_PER_LEVEL cleared rows."""
+        return self.lines // LINES_PER_LEVEL
+
+    @property
+    def gravity_interval(self) -> float:
+        """Seconds between two rows of gravity on the current level."""
+        return max(MIN_GRAVITY_INTERVAL, GRAVITY_INTERVAL * GRAVITY_SPEEDUP**self.level)
+
+    def handle_falling(self) -> bool:
         """Function to manage the dominos falling
 
-        Handles automatic tetromino falling (every 0.5 seconds), as well as
+        Handles automatic tetromino falling (every fifth call), as well as
         landing in case the tetromino touches the ground or another tetromino.
+        Frame-driven loops call this once per frame; the fixed-timestep loop in
+        tetris.scheduler calls fall() directly instead.
 
-        Besides that, it displays game over screen in case the GameOverError is raised.
-
-        Score is updated appropriately, too.
+        Returns True once the game is over.
         """
         self.counter += 1
         if self.counter == 5:
+            self.counter = 0
+            self.fall()
+        return self.game_over
+
+    def fall(self) -> bool:
+        """Moves the tetromino one row down, or lands it and spawns the next one
+
+        Score is updated appropriately, too. Returns True once the game is over.
+        """
+        if self.game_over:
+            return True
+
+        try:
+            self.tetromino.move_down()
+        except (CollisionError, OutOfBoundsError):
             try:
-                self.tetromino.move_down()
-            except (CollisionError, OutOfBoundsError):
-                try:
-                    self.tetromino.land()
-                except GameOverError:
-                    sys.exit()
-                else:
-                    self.tetromino = self.next_tetromino
-                    self.next_tetromino = Tetromino(self.grid)
-            finally:
-                self.counter = 0
+                self.tetromino.land()
+            except GameOverError:
+                self.game_over = True
+            else:
+                self.clear_rows()
+                self.tetromino = self.next_tetromino
+                self.next_tetromino = self.spawn()
+        return self.game_over
+
+    def spawn(self) -> "Tetromino":
+        """Creates the next tetromino dealt by the generator."""
+        return Tetromino(self.grid, *self.generator.next_piece())
+
+    def apply_action(self, action: str) -> bool:
+        """Applies one of ACTIONS to the current tetromino and returns whether it moved."""
+        if self.game_over:
+            return False
+
+        try:
+            ACTIONS[action](self.tetromino)
+        except (CollisionError, OutOfBoundsError):
+            return False
+        return True
+
+    def step(self, action: Optional[str] = None) -> bool:
+        """Applies an optional action followed by one row of gravity. Returns True once the game is over."""
+        if action is not None:
+            self.apply_action(action)
+        return self.fall()
+
+    def observe(self) -> Observation:
+        """Returns a snapshot of the game state."""
+        y, x = self.tetromino.topleft
+        return Observation(
+            self.grid.row_masks(),
+            self.tetromino.letter,
+            self.tetromino.shape,
+            (y, x),
+            self.next_tetromino.letter,
+            self.score,
+            self.game_over,
+        )
 
     def restart(self) -> None:
         """Restarts the game by putting all vital game parameters to initial state."""
-        self.grid = [[[0, None] for _ in range(GRID_WIDTH)] for _ in range(GRID_HEIGHT)]
-        self.tetromino = Tetromino(self.grid)
-        self.next_tetromino = Tetromino(self.grid)
+        self.grid = GRID_BACKENDS[self.backend](self.width, self.height)
+        self.tetromino = self.spawn()
+        self.next_tetromino = self.spawn()
         self.counter = 0
         self.score = 0
+        self.lines = 0
+        self.game_over = False
 
     def pause(self) -> None:
         """Pauses or resumes the gameplay."""
@@ -104,24 +220,20 @@ class Game:
 class Tetromino:
     """Class that forms the individual blocks"""
 
-    def __init__(self, grid: Grid):
+    def __init__(self, grid: Grid, letter: str, shape: int):
         self.grid = grid
-        self.letter = random.choice(list(SHAPES.keys()))
-        self.shape = random.choice(SHAPES[self.letter])
-        self.topleft = [0, GRID_WIDTH // 2 - 1]
-        self.color = curses.color_pair(COLORS[self.letter])
+        self.letter = letter
+        self.shape = shape
+        self.topleft = [0, grid.width // 2 - 1]
+        self.color = COLORS[self.letter]
 
     def land(self) -> None:
         """Lands a tetromino. If top left corner of the tetromino is beyond upper boundary, raises GameOverError."""
         if self.topleft[0] <= 0:
             raise GameOverError
 
-        for rowidx, row in enumerate(to_4x4(self.shape)):
-            for colidx, block in enumerate(row):
-                if block != 0:
-                    y, x = self.topleft
-                    self.grid[rowidx + y][colidx + x][0] = block
-                    self.grid[rowidx + y][colidx + x][1] = self.color
+        y, x = self.topleft
+        self.grid.place(self.shape, y, x, self.color)
 
     def move_sideways(self, direction: str) -> None:
         """Main move side function
@@ -129,17 +241,8 @@ class Tetromino:
         Moves a tetromino one step left or right if another tetromino is not in its way,
         whilst making sure it does not go out of bounds at the same time.
         """
-        for rowidx, row in enumerate(to_4x4(self.shape)):
-            for colidx, block in enumerate(row):
-                if block != 0:
-                    y, x = self.topleft
-                    if colidx + x + DIRECTIONS[direction] not in range(GRID_WIDTH):
-                        raise OutOfBoundsError
-                    if (
-                        self.grid[rowidx + y][colidx + x + DIRECTIONS[direction]][0]
-                        != 0
-                    ):
-                        raise CollisionError
+        y, x = self.topleft
+        self.grid.check(self.shape, y, x + DIRECTIONS[direction])
 
         self.topleft[1] += DIRECTIONS[direction]
 
@@ -149,14 +252,8 @@ class Tetromino:
         Moves a tetromino one step down if another tetromino is not in its way,
         whilst making sure it does not go out of bounds at the same time.
         """
-        for rowidx, row in enumerate(to_4x4(self.shape)):
-            for colidx, block in enumerate(row):
-                if block != 0:
-                    y, x = self.topleft
-                    if rowidx + y + 1 >= GRID_HEIGHT:
-                        raise OutOfBoundsError
-                    elif self.grid[rowidx + y + 1][colidx + x][0] != 0:
-                        raise CollisionError
+        y, x = self.topleft
+        self.grid.check(self.shape, y + 1, x)
 
         self.topleft[0] += 1
 
@@ -166,11 +263,8 @@ class Tetromino:
         Moves a tetromino all the way down until it either goes out of bounds,
         or until another tetromino is encountered.
         """
-        while True:
-            try:
-                self.move_down()
-            except (OutOfBoundsError, CollisionError):
-                break
+        y, x = self.topleft
+        self.topleft[0] += self.grid.drop_distance(self.shape, y, x)
 
     def rotate(self, direction: str) -> None:
         """Main function to rotate tetromino
@@ -183,21 +277,7 @@ class Tetromino:
 
         potential_shape = SHAPES[self.letter][next_rotation % len(SHAPES[self.letter])]
 
-        for rowidx, row in enumerate(to_4x4(potential_shape)):
-            for colidx, block in enumerate(row):
-                if block != 0:
-                    y, x = self.topleft
-                    if colidx + x not in range(GRID_WIDTH):
-                        raise OutOfBoundsError
-                    if rowidx + y >= GRID_HEIGHT:
-                        raise OutOfBoundsError
-                    if self.grid[rowidx + y][colidx + x][0] != 0:
-                        raise CollisionError
+        y, x = self.topleft
+        self.grid.check(potential_shape, y, x)
 
         self.shape = potential_shape
-
-
-def to_4x4(rotation: int) -> ShapeVec:
-    """Converts any tetromino into list of 2d vector"""
-    tmp = [(rotation >> 15 - i) & 1 for i in range(16)]
-    return list(more_itertools.sliced(tmp, 4))
@@ -0,0 +1,77 @@
+import random
+from typing import Dict, List, Optional, Sequence, Tuple, Type, Union
+
+from tetris.shapes import SHAPES
+
+LETTERS: Tuple[str, ...] = tuple(SHAPES)
+
+Piece = Tuple[str, int]
+
+
+class RandomGenerator:
+    """Picks every tetromino and its rotation uniformly at random"""
+
+    name = "random"
+
+    def __init__(self, seed: Optional[int] = None):
+        self.seed = seed
+        self.random = random.Random(seed)
+
+    def next_piece(self) -> Piece:
+        """Returns the letter and rotation of the next tetromino."""
+        letter = self.random.choice(LETTERS)
+        return letter, self.random.choice(SHAPES[letter])
+
+
+class BagGenerator(RandomGenerator):
+    """Deals the seven tetrominos in shuffled bags, so no letter is ever far away"""
+
+    name = "bag"
+
+    def __init__(self, seed: Optional[int] = None):
+        super().__init__(seed)
+        self._bag: List[str] = []
+
+    def next_piece(self) -> Piece:
+        """Returns the letter and rotation of the next tetromino."""
+        if not self._bag:
+            self._bag = list(LETTERS)
+            self.random.shuffle(self._bag)
+        letter = self._bag.pop()
+        return letter, self.random.choice(SHAPES[letter])
+
+
+class SequenceGenerator:
+    """Repeats a fixed sequence of tetrominos, e.g. for tests and benchmarks
+
+    Letters are spawned in their first rotation unless a rotation is given.
+    """
+
+    name = "sequence"
+
+    def __init__(self, pieces: Sequence[Tuple[str, Optional[int]]]):
+        self.pieces = [
+            (letter, SHAPES[letter][0] if shape is None else shape)
+            for letter, shape in pieces
+        ]
+        self._index = 0
+
+    @classmethod
+    def from_letters(cls, letters: str) -> "SequenceGenerator":
+        """Creates a generator from a string of letters, e.g. ``"IOTSZJL"``."""
+        return cls([(letter, None) for letter in letters])
+
+    def next_piece(self) -> Piece:
+        """Returns the letter and rotation of the next tetromino."""
+        piece = self.pieces[self._index]
+        self._index = (self._index + 1) % len(self.pieces)
+        return piece
+
+
+PieceGenerator = Union[RandomGenerator, SequenceGenerator]
+
+# generators that are fully described by their seed, in the order replays refer to them
+GENERATORS: Dict[str, Type[RandomGenerator]] = {
+    RandomGenerator.name: RandomGenerator,
+    BagGenerator.name: BagGenerator,
+}
@@ -0,0 +1,222 @@
+from typing import Any, Callable, Iterator, List, Optional, Set, Tuple
+
+from tetris.exceptions import CollisionError, OutOfBoundsError
+from tetris.shapes import ROW_MASKS, SHAPE_TABLE
+
+Cells = List[List[List[Optional[int]]]]
+OccupiedCell = Tuple[int, int, int]
+
+
+class ListGrid:
+    """Grid backend storing every cell as a ``[filled, color]`` pair
+
+    ``row_fill`` counts the filled cells of every row as tetrominos are
+    placed, so rows that became full are known right after landing and
+    clearing never has to scan the grid.
+    """
+
+    def __init__(self, width: int, height: int):
+        self.width = width
+        self.height = height
+        self.cells: Cells = [[[0, None] for _ in range(width)] for _ in range(height)]
+        self.row_fill: List[int] = [0] * height
+        self.full_rows: Set[int] = set()
+
+    def check(self, shape: int, y: int, x: int) -> None:
+        """Raises OutOfBoundsError or CollisionError if the shape does not fit at (y, x)."""
+        info = SHAPE_TABLE[shape]
+        if info.left + x < 0 or info.right + x >= self.width:
+            raise OutOfBoundsError
+        if info.bottom + y >= self.height:
+            raise OutOfBoundsError
+
+        for rowidx, colidx in info.cells:
+            if self.cells[rowidx + y][colidx + x][0] != 0:
+                raise CollisionError
+
+    def place(self, shape: int, y: int, x: int, color: int) -> None:
+        """Writes the shape into the grid with its top left corner at (y, x)."""
+        for rowidx, colidx in SHAPE_TABLE[shape].cells:
+            self.cells[rowidx + y][colidx + x][0] = 1
+            self.cells[rowidx + y][colidx + x][1] = color
+            self.row_fill[rowidx + y] += 1
+            if self.row_fill[rowidx + y] == self.width:
+                self.full_rows.add(rowidx + y)
+
+    def drop_distance(self, shape: int, y: int, x: int) -> int:
+        """Returns how many rows the shape at (y, x) can fall before it lands."""
+        distance = self.height
+        for rowidx, colidx in SHAPE_TABLE[shape].lowest:
+            below = rowidx + y + 1
+            while below < self.height and self.cells[below][colidx + x][0] == 0:
+                below += 1
+            distance = min(distance, below - rowidx - y - 1)
+        return distance
+
+    def clear_full_rows(self) -> int:
+        """Clears all the filled rows, prepends empty ones and returns how many were cleared."""
+        if not self.full_rows:
+            return 0
+
+        cleared = len(self.full_rows)
+        _compact(self.cells, self.full_rows, _empty_cells)
+        _compact(self.row_fill, self.full_rows, lambda _: 0)
+        self.full_rows = set()
+        return cleared
+
+    def row_masks(self) -> Tuple[int, ...]:
+        """Returns every row as a bitmask with bit ``n`` set when column ``n`` is filled."""
+        return tuple(
+            sum(1 << colidx for colidx, block in enumerate(row) if block[0] != 0)
+            for row in self.cells
+        )
+
+    def occupied(self) -> Iterator[OccupiedCell]:
+        """Yields row, column and color of every filled cell."""
+        for rowidx, row in enumerate(self.cells):
+            for colidx, block in enumerate(row):
+                if block[0] != 0:
+                    assert block[1] is not None
+                    yield rowidx, colidx, block[1]
+
+
+class BitGrid:
+    """Grid backend storing every row as an integer bitmask
+
+    Bit ``n`` of a row is set when column ``n`` is filled, so a tetromino
+    collides with the landed blocks if any of its shifted row masks
+    shares a bit with the row underneath it, and a row is full once it
+    equals ``full_row``. Colors are only kept for rendering. Rows that
+    become full while placing a tetromino are collected in ``full_rows``.
+    The highest filled row of every column is kept in ``tops``, so a
+    tetromino above the blocks lands without looking down the columns.
+    """
+
+    def __init__(self, width: int, height: int):
+        self.width = width
+        self.height = height
+        self.full_row = (1 << width) - 1
+        self.rows: List[int] = [0] * height
+        self.full_rows: Set[int] = set()
+        self.colors: List[List[Optional[int]]] = [[None] * width for _ in range(height)]
+        # highest filled row of every column, the height for empty columns
+        self.tops: List[int] = [height] * width
+
+    def check(self, shape: int, y: int, x: int) -> None:
+        """Raises OutOfBoundsError or CollisionError if the shape does not fit at (y, x)."""
+        top, left, right, masks = ROW_MASKS[shape]
+        top += y
+        left += x
+        if left < 0 or right + x >= self.width or top + len(masks) > self.height:
+            raise OutOfBoundsError
+
+        rows = self.rows
+        for offset, mask in enumerate(masks):
+            if rows[top + offset] & (mask << left):
+                raise CollisionError
+
+    def drop_distance(self, shape: int, y: int, x: int) -> int:
+        """Returns how many rows the shape at (y, x) can fall before it lands."""
+        rows = self.rows
+        tops = self.tops
+        distance = self.height
+        for rowidx, colidx in SHAPE_TABLE[shape].lowest:
+            below = rowidx + y + 1
+            landing = tops[colidx + x]
+            if landing < below:
+                # the cell is under an overhang, look down the column for the blocks
+                bit = 1 << (colidx + x)
+                landing = below
+                stop = min(self.height, below + distance)
+                while landing < stop and not rows[landing] & bit:
+                    landing += 1
+            distance = min(distance, landing - below)
+        return distance
+
+    def place(self, shape: int, y: int, x: int, color: int) -> None:
+        """Writes the shape into the grid with its top left corner at (y, x)."""
+        top, left, _, masks = ROW_MASKS[shape]
+        top += y
+        left += x
+        for offset, mask in enumerate(masks):
+            self.rows[top + offset] |= mask << left
+            if self.rows[top + offset] == self.full_row:
+                self.full_rows.add(top + offset)
+            colors = self.colors[top + offset]
+            for colidx in _bits(mask):
+                colors[colidx + left] = color
+                self.tops[colidx + left] = min(self.tops[colidx + left], top + offset)
+
+    def clear_full_rows(self) -> int:
+        """Clears all the filled rows, prepends empty ones and returns how many were cleared."""
+        if not self.full_rows:
+            return 0
+
+        cleared = len(self.full_rows)
+        _compact(self.rows, self.full_rows, lambda _: 0)
+        _compact(self.colors, self.full_rows, _empty_colors)
+        self.full_rows = set()
+        self._find_tops()
+        return cleared
+
+    def _find_tops(self) -> None:
+        """Finds the highest filled row of every column, going down until all are found."""
+        self.tops = [self.height] * self.width
+        unseen = self.full_row
+        for rowidx, row in enumerate(self.rows):
+            for colidx in _bits(row & unseen):
+                self.tops[colidx] = rowidx
+            unseen &= ~row
+            if not unseen:
+                break
+
+    def row_masks(self) -> Tuple[int, ...]:
+        """Returns every row as a bitmask with bit ``n`` set when column ``n`` is filled."""
+        return tuple(self.rows)
+
+    def occupied(self) -> Iterator[OccupiedCell]:
+        """Yields row, column and color of every filled cell."""
+        for rowidx, row in enumerate(self.rows):
+            colors = self.colors[rowidx]
+            for colidx in _bits(row):
+                color = colors[colidx]
+                assert color is not None
+                yield rowidx, colidx, color
+
+
+def _bits(mask: int) -> Iterator[int]:
+    """Yields the indices of the set bits of a mask, lowest first."""
+    while mask:
+        lowest = mask & -mask
+        yield lowest.bit_length() - 1
+        mask ^= lowest
+
+
+def _compact(rows: List[Any], full_rows: Set[int], empty: Callable[[Any], Any]) -> None:
+    """Drops the full rows in a single bottom-up pass and refills the top.
+
+    Rows below the lowest full row are left untouched, and the buffers
+    of the dropped rows are emptied and reused as the new top rows.
+    """
+    recycled = [rows[rowidx] for rowidx in full_rows]
+    write = max(full_rows)
+    for read in range(write, -1, -1):
+        if read not in full_rows:
+            rows[write] = rows[read]
+            write -= 1
+    for rowidx, row in enumerate(recycled):
+        rows[rowidx] = empty(row)
+
+
+def _empty_cells(row: List[List[Optional[int]]]) -> List[List[Optional[int]]]:
+    """Empties a row of ``[filled, color]`` cells in place."""
+    for block in row:
+        block[0] = 0
+        block[1] = None
+    return row
+
+
+def _empty_colors(row: List[Optional[int]]) -> List[Optional[int]]:
+    """Empties a row of colors in place."""
+    row[:] = [None] * len(row)
+    return row
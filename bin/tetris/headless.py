@@ -0,0 +1,68 @@
+import random
+from typing import Callable, List, Optional, Sequence
+
+from tetris.core import ACTIONS, GRID_HEIGHT, GRID_WIDTH, Game, Observation
+
+Policy = Callable[[Observation], Optional[str]]
+
+
+class GameBatch:
+    """Many headless games advanced in lockstep
+
+    Every game gets its own seed, so a batch created from the same seeds
+    and driven by the same actions always plays out identically.
+    Finished games stay in the batch and simply ignore further actions.
+    """
+
+    def __init__(
+        self,
+        seeds: Sequence[int],
+        backend: str = "bitboard",
+        width: int = GRID_WIDTH,
+        height: int = GRID_HEIGHT,
+    ):
+        self.seeds = list(seeds)
+        self.games = [
+            Game(backend=backend, seed=seed, width=width, height=height)
+            for seed in self.seeds
+        ]
+
+    def step(self, actions: Sequence[Optional[str]]) -> List[bool]:
+        """Steps every game with its own action and returns which games are over."""
+        return [game.step(action) for game, action in zip(self.games, actions)]
+
+    def observe(self) -> List[Observation]:
+        """Returns a snapshot of every game."""
+        return [game.observe() for game in self.games]
+
+    def scores(self) -> List[int]:
+        """Returns the score of every game."""
+        return [game.score for game in self.games]
+
+    def play(self, policies: Sequence[Policy], max_steps: int = 10_000) -> List[int]:
+        """Plays every game with its policy until all are over or max_steps is reached."""
+        running = list(zip(self.games, policies))
+        for _ in range(max_steps):
+            running = [
+                (game, policy)
+                for game, policy in running
+                if not game.step(policy(game.observe()))
+            ]
+            if not running:
+                break
+        return self.scores()
+
+
+def random_policy(seed: int) -> Policy:
+    """Returns a policy picking uniformly random actions, seeded for reproducibility."""
+    rng = random.Random(seed)
+    actions: List[Optional[str]] = [None, *ACTIONS]
+    return lambda observation: rng.choice(actions)
+
+
+def play_random_games(
+    seeds: Sequence[int], max_steps: int = 10_000, backend: str = "bitboard"
+) -> List[int]:
+    """Plays one game per seed with random_policy and returns the final scores."""
+    batch = GameBatch(seeds, backend)
+    return batch.play([random_policy(seed) for seed in seeds], max_steps)
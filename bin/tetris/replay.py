@@ -0,0 +1,170 @@
+import struct
+import sys
+import time
+from typing import List, NamedTuple, Tuple
+
+from tetris.core import ACTIONS, GRID_HEIGHT, GRID_WIDTH, Game
+from tetris.generators import GENERATORS
+from tetris.scheduler import FixedStepScheduler
+
+MAGIC = b"TTRP"
+VERSION = 1
+
+# magic, version, generator, seed, grid width, grid height, logic step
+HEADER = struct.Struct("<4sBBqHHd")
+
+ACTION_NAMES: List[str] = list(ACTIONS)
+GENERATOR_NAMES: List[str] = list(GENERATORS)
+
+# action byte closing the event list, preceded by the ticks to the end of the session
+END_OF_REPLAY = 0xFF
+
+Event = Tuple[int, str]
+
+
+class Replay(NamedTuple):
+    """Everything needed to re-simulate a session
+
+    ``events`` holds the logic tick and the name of every action that was
+    applied, ``ticks`` the number of logic steps the session lasted.
+    """
+
+    seed: int
+    generator: str
+    width: int
+    height: int
+    step: float
+    events: List[Event]
+    ticks: int
+
+
+class ReplayRecorder:
+    """Collects the actions applied during a session and saves them as a replay
+
+    The file starts with a fixed header, followed by one record per action:
+    the number of ticks since the previous action as a varint and the
+    action as one byte. Most records therefore take two bytes.
+    """
+
+    def __init__(
+        self,
+        seed: int,
+        generator: str,
+        step: float,
+        width: int = GRID_WIDTH,
+        height: int = GRID_HEIGHT,
+    ):
+        self.seed = seed
+        self.generator = generator
+        self.step = step
+        self.width = width
+        self.height = height
+        self.events: List[Event] = []
+
+    def record(self, tick: int, action: str) -> None:
+        """Records an action applied right before the given logic tick."""
+        self.events.append((tick, action))
+
+    def save(self, path: str, ticks: int) -> None:
+        """Writes the replay of a session that lasted the given number of ticks."""
+        data = bytearray(
+            HEADER.pack(
+                MAGIC,
+                VERSION,
+                GENERATOR_NAMES.index(self.generator),
+                self.seed,
+                self.width,
+                self.height,
+                self.step,
+            )
+        )
+        last_tick = 0
+        for tick, action in self.events:
+            data += _encode_varint(tick - last_tick)
+            data.append(ACTION_NAMES.index(action))
+            last_tick = tick
+        data += _encode_varint(ticks - last_tick)
+        data.append(END_OF_REPLAY)
+
+        with open(path, "wb") as replay_file:
+            replay_file.write(data)
+
+
+def load(path: str) -> Replay:
+    """Reads a replay written by ReplayRecorder."""
+    with open(path, "rb") as replay_file:
+        data = replay_file.read()
+
+    magic, version, generator, seed, width, height, step = HEADER.unpack_from(data)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError(f"{path} is not a version {VERSION} tetris replay")
+
+    events = []
+    tick = 0
+    offset = HEADER.size
+    while True:
+        delta, offset = _decode_varint(data, offset)
+        tick += delta
+        action = data[offset]
+        offset += 1
+        if action == END_OF_REPLAY:
+            break
+        events.append((tick, ACTION_NAMES[action]))
+
+    return Replay(seed, GENERATOR_NAMES[generator], width, height, step, events, tick)
+
+
+def simulate(replay: Replay, backend: str = "bitboard") -> Game:
+    """Re-plays a session headlessly, as fast as possible, and returns the final game."""
+    game = Game(
+        backend=backend,
+        seed=replay.seed,
+        generator=replay.generator,
+        width=replay.width,
+        height=replay.height,
+    )
+    scheduler = FixedStepScheduler(game, replay.step, clock=lambda: 0.0)
+
+    events = iter(replay.events)
+    pending = next(events, None)
+    while True:
+        while pending is not None and pending[0] == scheduler.ticks:
+            game.apply_action(pending[1])
+            pending = next(events, None)
+        if scheduler.ticks >= replay.ticks or scheduler.tick():
+            return game
+
+
+def _encode_varint(value: int) -> bytes:
+    """Encodes a non-negative integer in 7-bit groups, lowest first."""
+    encoded = bytearray()
+    while value >= 0x80:
+        encoded.append(value & 0x7F | 0x80)
+        value >>= 7
+    encoded.append(value)
+    return bytes(encoded)
+
+
+def _decode_varint(data: bytes, offset: int) -> Tuple[int, int]:
+    """Decodes a varint at offset and returns it with the offset right after it."""
+    value = 0
+    shift = 0
+    while True:
+        byte = data[offset]
+        offset += 1
+        value |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return value, offset
+        shift += 7
+
+
+if __name__ == "__main__":
+    for replay_path in sys.argv[1:]:
+        started = time.perf_counter()
+        replay = load(replay_path)
+        result = simulate(replay)
+        elapsed = time.perf_counter() - started
+        print(
+            f"{replay_path}: score {result.score}, lines {result.lines}, "
+            f"{replay.ticks} ticks in {elapsed * 1000:.1f}ms"
+        )
@@ -0,0 +1,122 @@
+import time
+from collections import deque
+from typing import Callable, Deque, Optional, TextIO, Tuple
+
+from tetris.core import Game
+
+# seconds of game logic advanced per fixed step
+LOGIC_STEP: float = 0.01
+# seconds between two rendered frames
+RENDER_STEP: float = 1 / 30
+# milliseconds getch() waits for a key, i.e. the input polling period
+INPUT_POLL_MS: int = 5
+# elapsed time is clamped to this, so a stall does not trigger a burst of steps
+MAX_FRAME_TIME: float = 0.25
+
+Clock = Callable[[], float]
+FrameTiming = Tuple[float, float, float]
+
+
+class FixedStepScheduler:
+    """Runs the game logic at a fixed timestep, independently of rendering
+
+    Real time is accumulated between calls to update() and consumed in
+    steps of ``step`` seconds, so gravity advances at the same pace no
+    matter how long rendering or input handling took. Gravity follows
+    ``Game.gravity_interval``, which shortens as the level goes up.
+    ``ticks`` counts the logic steps run while the game was not paused.
+    """
+
+    def __init__(
+        self, game: Game, step: float = LOGIC_STEP, clock: Clock = time.perf_counter
+    ):
+        self.game = game
+        self.step = step
+        self.clock = clock
+        self._last_update = clock()
+        self._last_render: Optional[float] = None
+        self._lag = 0.0
+        self._gravity = 0.0
+        self.ticks = 0
+
+    def update(self) -> bool:
+        """Runs every logic step that is due and returns True once the game is over."""
+        now = self.clock()
+        self._lag += min(now - self._last_update, MAX_FRAME_TIME)
+        self._last_update = now
+
+        while self._lag >= self.step:
+            self._lag -= self.step
+            if not self.game.paused and self.tick():
+                return True
+        return self.game.game_over
+
+    def tick(self) -> bool:
+        """Runs a single logic step and returns True once the game is over.
+
+        Ticks only depend on the game state, so replays call this directly to
+        re-simulate a session without waiting for real time to pass.
+        """
+        self.ticks += 1
+        self._gravity += self.step
+        if self._gravity >= self.game.gravity_interval:
+            self._gravity = 0.0
+            return self.game.fall()
+        return self.game.game_over
+
+    def render_due(self, render_step: float = RENDER_STEP) -> bool:
+        """Returns whether a frame should be rendered now, and if so starts the next render period."""
+        now = self.clock()
+        if self._last_render is not None and now - self._last_render < render_step:
+            return False
+        self._last_render = now
+        return True
+
+    def force_render(self) -> None:
+        """Makes the next call to render_due() return True, e.g. right after handling input."""
+        self._last_render = None
+
+
+class FrameStats:
+    """Timings of the input, logic and render phases of every frame
+
+    The most recent ``window`` frames are kept for the on-screen overlay.
+    If a path is given, every frame is also appended to it as a CSV row.
+    """
+
+    def __init__(self, path: Optional[str] = None, window: int = 60):
+        self.frames = 0
+        self._recent: Deque[FrameTiming] = deque(maxlen=window)
+        self._file: Optional[TextIO] = None
+        if path is not None:
+            self._file = open(path, "w")
+            self._file.write("frame,input_ms,logic_ms,render_ms\n")
+
+    def record(self, input_time: float, logic_time: float, render_time: float) -> None:
+        """Records the timings of one frame, in seconds."""
+        self.frames += 1
+        self._recent.append((input_time, logic_time, render_time))
+        if self._file is not None:
+            self._file.write(
+                f"{self.frames},{input_time * 1000:.3f},"
+                f"{logic_time * 1000:.3f},{render_time * 1000:.3f}\n"
+            )
+
+    def summary(self) -> str:
+        """Returns a one line summary of the recent frames, in milliseconds."""
+        if not self._recent:
+            return ""
+        count = len(self._recent)
+        averages = [
+            sum(timing[i] for timing in self._recent) / count * 1000 for i in range(3)
+        ]
+        slowest = max(sum(timing) for timing in self._recent) * 1000
+        return "input {:.2f}ms  logic {:.2f}ms  render {:.2f}ms  worst {:.2f}ms".format(
+            *averages, slowest
+        )
+
+    def close(self) -> None:
+        """Closes the stats file, if any."""
+        if self._file is not None:
+            self._file.close()
+            self._file = None
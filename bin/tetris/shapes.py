@@ -0,0 +1,99 @@
+from typing import Dict, List, NamedTuple, Sequence, Tuple
+
+import more_itertools
+
+SHAPES: Dict[str, List[int]] = {
+    "O": [51],
+    "I": [8738, 240],
+    "S": [54, 561],
+    "Z": [99, 306],
+    "J": [275, 71, 802, 113],
+    "L": [547, 116, 785, 23],
+    "T": [114, 305, 39, 562],
+}
+
+ShapeVec = List[Sequence[int]]
+
+
+Offset = Tuple[int, int]
+
+
+class ShapeInfo(NamedTuple):
+    """Decoded rotation of a tetromino
+
+    ``cells`` holds the (row, column) offsets of the occupied cells from
+    the top left corner of the 4x4 box, the four bounds describe the
+    bounding box of those cells and ``lowest`` maps every occupied
+    column to its lowest occupied row, which is all that matters when
+    dropping the tetromino.
+    """
+
+    cells: Tuple[Offset, ...]
+    top: int
+    left: int
+    bottom: int
+    right: int
+    lowest: Tuple[Offset, ...]
+
+
+class RowMasks(NamedTuple):
+    """Rotation of a tetromino packed as one bitmask per occupied row
+
+    Bit 0 of every mask is the leftmost occupied column of the rotation,
+    so placing it at column ``x`` of the grid is ``mask << (x + left)``.
+    """
+
+    top: int
+    left: int
+    right: int
+    masks: Tuple[int, ...]
+
+
+def to_4x4(rotation: int) -> ShapeVec:
+    """Converts any tetromino into list of 2d vector"""
+    tmp = [(rotation >> 15 - i) & 1 for i in range(16)]
+    return list(more_itertools.sliced(tmp, 4))
+
+
+def _to_shape_info(rotation: int) -> ShapeInfo:
+    """Decodes a rotation into its cell offsets and bounds."""
+    cells = tuple(
+        (rowidx, colidx)
+        for rowidx, row in enumerate(to_4x4(rotation))
+        for colidx, block in enumerate(row)
+        if block != 0
+    )
+    rows = [rowidx for rowidx, _ in cells]
+    cols = [colidx for _, colidx in cells]
+
+    lowest: Dict[int, int] = {}
+    for rowidx, colidx in cells:
+        lowest[colidx] = max(rowidx, lowest.get(colidx, rowidx))
+
+    return ShapeInfo(
+        cells,
+        min(rows),
+        min(cols),
+        max(rows),
+        max(cols),
+        tuple((rowidx, colidx) for colidx, rowidx in sorted(lowest.items())),
+    )
+
+
+def _to_row_masks(info: ShapeInfo) -> RowMasks:
+    """Packs a rotation into per-row bitmasks, trimmed to its bounding box."""
+    masks = [0] * (info.bottom - info.top + 1)
+    for rowidx, colidx in info.cells:
+        masks[rowidx - info.top] |= 1 << (colidx - info.left)
+    return RowMasks(info.top, info.left, info.right, tuple(masks))
+
+
+SHAPE_TABLE: Dict[int, ShapeInfo] = {
+    rotation: _to_shape_info(rotation)
+    for rotations in SHAPES.values()
+    for rotation in rotations
+}
+
+ROW_MASKS: Dict[int, RowMasks] = {
+    rotation: _to_row_masks(info) for rotation, info in SHAPE_TABLE.items()
+}
@@ -1,16 +1,26 @@
 import curses
-from typing import List, Optional, Tuple
+from typing import Dict, Optional, Tuple
 
-from tetris.core import COLORS, GRID_HEIGHT, GRID_WIDTH, Tetromino, to_4x4
+from tetris.core import COLORS, GRID_HEIGHT, GRID_WIDTH, Game, Grid, Tetromino
+from tetris.shapes import SHAPE_TABLE
 from tetris.utils import Window
 
 SCREEN_WIDTH: int = GRID_WIDTH * 2
 SCREEN_HEIGHT: int = GRID_HEIGHT
 
+# columns needed on either side of the centered play field for the legend
+SIDE_PANEL_WIDTH: int = 38
 
-def ensure_terminal_size() -> bool:
+Frame = Dict[Tuple[int, int], int]
+
+
+def ensure_terminal_size(
+    screen_width: int = SCREEN_WIDTH, screen_height: int = SCREEN_HEIGHT
+) -> bool:
     """Helper method to ensure correct terminal size"""
-    if curses.LINES >= 24 and curses.COLS >= 80:
+    if curses.LINES >= max(24, screen_height + 3) and curses.COLS >= max(
+        80, screen_width + 2 * SIDE_PANEL_WIDTH
+    ):
         return True
     return False
 
@@ -22,20 +32,24 @@ def make_color_pairs() -> None:
         curses.init_pair(color, color, color)
 
 
-def create_screens(outer_screen: Window) -> Tuple[Optional[Window], Optional[Window]]:
-    """Create starting screens for the game"""
-    if ensure_terminal_size():
+def create_screens(
+    outer_screen: Window, grid_width: int = GRID_WIDTH, grid_height: int = GRID_HEIGHT
+) -> Tuple[Optional[Window], Optional[Window]]:
+    """Create starting screens for a play field of grid_width by grid_height cells"""
+    screen_width = grid_width * 2
+    screen_height = grid_height
+    if ensure_terminal_size(screen_width, screen_height):
         border_screen = outer_screen.subwin(
-            1 + SCREEN_HEIGHT + 1,
-            1 + SCREEN_WIDTH + 1,
-            (curses.LINES - SCREEN_HEIGHT) // 2 - 1,
-            (curses.COLS - SCREEN_WIDTH) // 2 - 1,
+            1 + screen_height + 1,
+            1 + screen_width + 1,
+            (curses.LINES - screen_height) // 2 - 1,
+            (curses.COLS - screen_width) // 2 - 1,
         )
         inner_screen = border_screen.subwin(
-            SCREEN_HEIGHT,
-            SCREEN_WIDTH,
-            (curses.LINES - SCREEN_HEIGHT) // 2,
-            (curses.COLS - SCREEN_WIDTH) // 2,
+            screen_height,
+            screen_width,
+            (curses.LINES - screen_height) // 2,
+            (curses.COLS - screen_width) // 2,
         )
     else:
         return None, None
@@ -43,36 +57,100 @@ def create_screens(outer_screen: Window) -> Tuple[Optional[Window], Optional[Win
 
 
 class UserInterface:
-    """Main user interface to paint the game on the screen"""
+    """Main user interface to paint the game on the screen
+
+    The play field is laid out after the size of inner_screen, so any
+    board that fits in the terminal is drawn centered.
+    """
 
     def __init__(self, stdscr: Window, inner_screen: Window):
         self.stdscr = stdscr
         self.inner_screen = inner_screen
+        self.screen_height, self.screen_width = inner_screen.getmaxyx()
+        self.invalidate()
+
+    def invalidate(self) -> None:
+        """Forgets the last drawn frame, so the next call to render_frame draws everything."""
+        self._drawn_cells: Frame = {}
+        self._drawn_next: Optional[Tuple[int, int]] = None
+        self._drawn_score: Optional[int] = None
+        self._drawn_instructions = False
+
+    def render_frame(self, game: Game) -> None:
+        """Renders the game by drawing only what changed since the previous frame
+
+        The landed tetrominos and the current one are merged into a frame of
+        cell colors, which is diffed against the last drawn frame. Cells that
+        appeared or changed color are painted, cells that disappeared are
+        blanked, and everything is sent to the terminal with one doupdate().
+        """
+        self.render_grid(game)
+
+        next_tetromino = (game.next_tetromino.shape, game.next_tetromino.color)
+        if next_tetromino != self._drawn_next:
+            self.clear_next_tetromino()
+            self.render_next_tetromino(game.next_tetromino)
+            self._drawn_next = next_tetromino
+
+        if game.score != self._drawn_score:
+            self.render_score(game.score)
+            self._drawn_score = game.score
+
+        if not self._drawn_instructions:
+            self.render_instructions()
+            self._drawn_instructions = True
+
+        self.stdscr.noutrefresh()
+        self.inner_screen.noutrefresh()
+        curses.doupdate()
+
+    def render_grid(self, game: Game) -> None:
+        """Draws the cells of the play field that changed since the last frame, without refreshing."""
+        frame: Frame = {
+            (rowidx, colidx): color for rowidx, colidx, color in game.grid.occupied()
+        }
+        y, x = game.tetromino.topleft
+        for rowidx, colidx in SHAPE_TABLE[game.tetromino.shape].cells:
+            frame[rowidx + y, colidx + x] = game.tetromino.color
+
+        drawn = self._drawn_cells
+        for (rowidx, colidx), color in frame.items():
+            if drawn.get((rowidx, colidx)) != color:
+                self._addstr(rowidx, colidx * 2, "██", curses.color_pair(color))
+        for rowidx, colidx in drawn.keys() - frame.keys():
+            self._addstr(rowidx, colidx * 2, "  ", curses.A_NORMAL)
+        self._drawn_cells = frame
 
     def render_score(self, score: int) -> None:  # pylint: disable=no-self-use
         """Renders current score at the lower left-hand side of the screen."""
-        y = (curses.LINES - SCREEN_HEIGHT) // 2 + SCREEN_HEIGHT + 1
-        x = (curses.COLS - SCREEN_WIDTH) // 2 - 1
+        y = (curses.LINES - self.screen_height) // 2 + self.screen_height + 1
+        x = (curses.COLS - self.screen_width) // 2 - 1
         self.stdscr.addstr(y, x, f" SCORE: {score} ", curses.A_BOLD)
 
     def render_next_tetromino(
         self, tetromino: Tetromino
     ) -> None:  # pylint: disable=no-self-use
         """Renders incoming tetromino at the right-hand side of the play field."""
-        y = (curses.LINES - SCREEN_HEIGHT) // 2
-        x = (curses.COLS - SCREEN_WIDTH) // 2
+        y = (curses.LINES - self.screen_height) // 2
+        x = (curses.COLS - self.screen_width) // 2
 
-        self.stdscr.addstr(y, x + SCREEN_WIDTH + 6, "NEXT", curses.A_BOLD)
+        self.stdscr.addstr(y, x + self.screen_width + 6, "NEXT", curses.A_BOLD)
 
-        for rowidx, row in enumerate(to_4x4(tetromino.shape)):
-            for colidx, block in enumerate(row):
-                if block != 0:
-                    self.stdscr.addstr(
-                        rowidx + y + 2,
-                        (colidx * 2) + x + SCREEN_WIDTH + 2,
-                        "██",
-                        tetromino.color,
-                    )
+        for rowidx, colidx in SHAPE_TABLE[tetromino.shape].cells:
+            self.stdscr.addstr(
+                rowidx + y + 2,
+                (colidx * 2) + x + self.screen_width + 2,
+                "██",
+                curses.color_pair(tetromino.color),
+            )
+
+    def clear_next_tetromino(self) -> None:
+        """Blanks the area the incoming tetromino is drawn in."""
+        y = (curses.LINES - self.screen_height) // 2
+        x = (curses.COLS - self.screen_width) // 2
+
+        for rowidx in range(4):
+            self.stdscr.addstr(rowidx + y + 2, x + self.screen_width + 2, " " * 8)
 
     def render_instructions(self) -> None:  # pylint: disable=no-self-use
         """Renders instructions on right of screen"""
@@ -82,35 +160,38 @@ class UserInterface:
             ("Turn Right:", "d"),
             ("Move to down:", "s"),
             ("Menu:", "Quit: q  Pause/Resume: p"),
+            ("Stats:", "i"),
+            ("Autoplay:", "t"),
         ]
-        y = (curses.LINES - SCREEN_HEIGHT) // 2 + SCREEN_HEIGHT // 2
-        x = (curses.COLS - SCREEN_WIDTH) // 2
+        y = (curses.LINES - self.screen_height) // 2 + self.screen_height // 2
+        x = (curses.COLS - self.screen_width) // 2
 
-        self.stdscr.addstr(y, x + SCREEN_WIDTH + 6, "LEGEND", curses.A_BOLD)
+        self.stdscr.addstr(y, x + self.screen_width + 6, "LEGEND", curses.A_BOLD)
 
         idx = 2
         for name, control in controls:
-            self.stdscr.addstr(y + idx, x + SCREEN_WIDTH + 6, name, curses.A_DIM)
+            self.stdscr.addstr(y + idx, x + self.screen_width + 6, name, curses.A_DIM)
             self.stdscr.addstr(
-                y + idx, x + SCREEN_WIDTH + 8 + len(name), control, curses.A_DIM
+                y + idx, x + self.screen_width + 8 + len(name), control, curses.A_DIM
             )
             idx += 2
 
-    def render_landed_tetrominos(self, grid: List[List[List[Optional[int]]]]) -> None:
+    def render_stats(self, text: str) -> None:
+        """Renders frame timings on the top line of the screen, blanking it when text is empty."""
+        self.stdscr.addstr(0, 0, text.ljust(curses.COLS - 1), curses.A_DIM)
+
+    def render_landed_tetrominos(self, grid: Grid) -> None:
         """Renders all the landed tetrominos."""
-        for rowidx, row in enumerate(grid):
-            for colidx, block in enumerate(row):
-                if block[0] != 0:
-                    assert block[1] is not None
-                    self._addstr(rowidx, colidx * 2, "██", block[1])
+        for rowidx, colidx, color in grid.occupied():
+            self._addstr(rowidx, colidx * 2, "██", curses.color_pair(color))
 
     def render_current_tetromino(self, tetromino: Tetromino) -> None:
         """Renders a current tetromino."""
-        for rowidx, row in enumerate(to_4x4(tetromino.shape)):
-            for colidx, block in enumerate(row):
-                if block != 0:
-                    y, x = tetromino.topleft
-                    self._addstr(rowidx + y, (colidx + x) * 2, "██", tetromino.color)
+        y, x = tetromino.topleft
+        for rowidx, colidx in SHAPE_TABLE[tetromino.shape].cells:
+            self._addstr(
+                rowidx + y, (colidx + x) * 2, "██", curses.color_pair(tetromino.color)
+            )
 
     def _addstr(self, y: int, x: int, text: str, color_info_stuff: int) -> None:
         """Works around curses' limitation of drawing at bottom right corner of the screen"""
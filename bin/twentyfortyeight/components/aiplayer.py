@@ -0,0 +1,486 @@
+"""2048 AI player module"""
+import argparse
+import collections
+import concurrent.futures
+import os
+import random
+import time
+from typing import Any, List, Optional, Tuple
+
+from . import gamectrl, movetbl
+
+# heuristic weights of a row, or a column, of the board
+_LOST_PENALTY = 200000.0
+_MONOTONICITY_POWER = 4.0
+_MONOTONICITY_WEIGHT = 47.0
+_SUM_POWER = 3.5
+_SUM_WEIGHT = 11.0
+_MERGES_WEIGHT = 700.0
+_EMPTY_WEIGHT = 270.0
+
+# probability of a spawned piece being 2, or 4, as dealt by generate_piece
+_SPAWN_EXPONENTS = ((1, 0.5), (2, 0.5))
+
+
+def _row_heuristic(exponents: List[int]) -> float:
+    """
+    Heuristic value of one row of exponents
+
+    Rewards free tiles, and pieces that can be merged, and penalizes
+    rows that are not monotonic, and big pieces.
+    """
+    piece_sum = 0.0
+    empty = 0
+    merges = 0
+
+    previous = 0
+    counter = 0
+    for exponent in exponents:
+        piece_sum += exponent**_SUM_POWER
+        if exponent == 0:
+            empty += 1
+        else:
+            if previous == exponent:
+                counter += 1
+            elif counter > 0:
+                merges += 1 + counter
+                counter = 0
+            previous = exponent
+    if counter > 0:
+        merges += 1 + counter
+
+    monotonicity_left = 0.0
+    monotonicity_right = 0.0
+    for (first, second) in zip(exponents, exponents[1:]):
+        if first > second:
+            monotonicity_left += (
+                first**_MONOTONICITY_POWER - second**_MONOTONICITY_POWER
+            )
+        else:
+            monotonicity_right += (
+                second**_MONOTONICITY_POWER - first**_MONOTONICITY_POWER
+            )
+
+    return (
+        _LOST_PENALTY
+        + _EMPTY_WEIGHT * empty
+        + _MERGES_WEIGHT * merges
+        - _MONOTONICITY_WEIGHT * min(monotonicity_left, monotonicity_right)
+        - _SUM_WEIGHT * piece_sum
+    )
+
+
+_ROW_HEURISTICS = [
+    _row_heuristic(
+        [
+            (row >> (col * movetbl.TILE_BITS)) & movetbl.TILE_MASK
+            for col in range(movetbl.BOARD_SIZE)
+        ]
+    )
+    for row in range(movetbl.ROW_MASK + 1)
+]
+
+
+def evaluate(packed_board: int) -> float:
+    """Heuristic value of a packed board, summed over its rows, and columns."""
+    heuristics = _ROW_HEURISTICS
+    transposed = movetbl.transpose(packed_board)
+    return (
+        heuristics[packed_board & 0xFFFF]
+        + heuristics[(packed_board >> 16) & 0xFFFF]
+        + heuristics[(packed_board >> 32) & 0xFFFF]
+        + heuristics[packed_board >> 48]
+        + heuristics[transposed & 0xFFFF]
+        + heuristics[(transposed >> 16) & 0xFFFF]
+        + heuristics[(transposed >> 32) & 0xFFFF]
+        + heuristics[transposed >> 48]
+    )
+
+
+def legal_packed_moves(packed_board: int) -> List[Tuple[Any, int, int]]:
+    """Return direction, new board, and score, of every move that changes the board."""
+    moves = []
+    for (direction, move) in gamectrl.PACKED_MOVES.items():
+        (moved_board, score) = move(packed_board)
+        if moved_board != packed_board:
+            moves.append((direction, moved_board, score))
+    return moves
+
+
+def _free_tile_shifts(packed_board: int) -> List[int]:
+    """Return the bit offsets of the free tiles of a packed board."""
+    return [
+        shift
+        for shift in range(0, 64, movetbl.TILE_BITS)
+        if not (packed_board >> shift) & movetbl.TILE_MASK
+    ]
+
+
+class _TranspositionTable:
+    """
+    Transposition table class
+
+    Maps packed boards to the depth they were searched to, and their
+    value. When full, the least recently used board is evicted.
+    """
+
+    def __init__(self, capacity: int):
+        self._capacity = capacity
+        self._entries = collections.OrderedDict()
+
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, packed_board: int, depth: int) -> Optional[float]:
+        """Return the value of a board searched at least to the given depth."""
+        entry = self._entries.get(packed_board)
+
+        if entry is None or entry[0] < depth:
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(packed_board)
+        self.hits += 1
+        return entry[1]
+
+    def put(self, packed_board: int, depth: int, value: float) -> None:
+        """Store the value of a board, evicting the least recently used one if full."""
+        self._entries[packed_board] = (depth, value)
+        self._entries.move_to_end(packed_board)
+
+        if len(self._entries) > self._capacity:
+            self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        """Remove all the entries."""
+        self._entries.clear()
+
+
+class ExpectimaxSearch:
+    """
+    Expectimax search class
+
+    Searches the moves of a packed board the given number of moves
+    deep, averaging over every piece that can spawn in between. Branches
+    less likely than min_probability are cut off, and evaluated by the
+    board heuristic.
+    """
+
+    def __init__(
+        self,
+        depth: int = 2,
+        table_size: int = 200_000,
+        min_probability: float = 0.0001,
+    ):
+        self._depth = depth
+        self._min_probability = min_probability
+        self._table = _TranspositionTable(table_size)
+
+    def best_move(self, packed_board: int) -> Optional[Any]:
+        """Return the best direction to move in, or None if no move is available."""
+        best_direction = None
+        best_value = float("-inf")
+
+        for (direction, moved_board, _score) in legal_packed_moves(packed_board):
+            value = self._expect(moved_board, self._depth - 1, 1.0)
+            if value > best_value:
+                best_direction = direction
+                best_value = value
+
+        return best_direction
+
+    def get_table_stats(self):
+        """Return the hits, and misses, of the transposition table."""
+        return (self._table.hits, self._table.misses)
+
+    def close(self):
+        """Release the resources of the search."""
+        self._table.clear()
+
+    def _expect(self, packed_board: int, depth: int, probability: float) -> float:
+        """Average value over every piece that can spawn on the board."""
+        if depth == 0 or probability < self._min_probability:
+            return evaluate(packed_board)
+
+        cached_value = self._table.get(packed_board, depth)
+        if cached_value is not None:
+            return cached_value
+
+        free_tile_shifts = _free_tile_shifts(packed_board)
+        tile_probability = probability / len(free_tile_shifts)
+
+        value = 0.0
+        for shift in free_tile_shifts:
+            for (exponent, spawn_probability) in _SPAWN_EXPONENTS:
+                value += spawn_probability * self._maximize(
+                    packed_board | (exponent << shift),
+                    depth,
+                    tile_probability * spawn_probability,
+                )
+        value /= len(free_tile_shifts)
+
+        self._table.put(packed_board, depth, value)
+        return value
+
+    def _maximize(self, packed_board: int, depth: int, probability: float) -> float:
+        """Value of the best move on the board, 0 if the game is lost."""
+        best_value = 0.0
+
+        for move in gamectrl.PACKED_MOVES.values():
+            (moved_board, _score) = move(packed_board)
+            if moved_board != packed_board:
+                best_value = max(
+                    best_value, self._expect(moved_board, depth - 1, probability)
+                )
+
+        return best_value
+
+
+def _random_rollouts(packed_board: int, runs: int, max_moves: int, seed: int) -> int:
+    """
+    Play random games from a board
+
+    Returns the total score of the given number of games, each one
+    lasting at most max_moves moves. Runs in the worker processes.
+    """
+    rng = random.Random(seed)
+    moves = list(gamectrl.PACKED_MOVES.values())
+    total_score = 0
+
+    for _run in range(runs):
+        board = packed_board
+        for _move in range(max_moves):
+            free_tile_shifts = _free_tile_shifts(board)
+            board |= rng.choice((1, 2)) << rng.choice(free_tile_shifts)
+
+            legal_boards = []
+            for move in moves:
+                (moved_board, score) = move(board)
+                if moved_board != board:
+                    legal_boards.append((moved_board, score))
+            if not legal_boards:
+                break
+
+            (board, score) = rng.choice(legal_boards)
+            total_score += score
+
+    return total_score
+
+
+class MonteCarloSearch:
+    """
+    Monte Carlo search class
+
+    Plays random games after every available move, and picks the move
+    with the best average score. The games are split into batches run
+    in a process pool.
+    """
+
+    def __init__(
+        self,
+        rollouts: int = 200,
+        max_moves: int = 30,
+        workers: Optional[int] = None,
+        seed: Optional[int] = None,
+    ):
+        self._rollouts = rollouts
+        self._max_moves = max_moves
+        self._workers = workers or os.cpu_count() or 1
+        self._random = random.Random(seed)
+        self._executor = None
+
+    def best_move(self, packed_board: int) -> Optional[Any]:
+        """Return the best direction to move in, or None if no move is available."""
+        if self._executor is None:
+            self._executor = concurrent.futures.ProcessPoolExecutor(self._workers)
+
+        batches = self._workers
+        batch_runs = -(-self._rollouts // batches)
+
+        futures = []
+        for (direction, moved_board, score) in legal_packed_moves(packed_board):
+            batch_futures = [
+                self._executor.submit(
+                    _random_rollouts,
+                    moved_board,
+                    batch_runs,
+                    self._max_moves,
+                    self._random.getrandbits(64),
+                )
+                for _batch in range(batches)
+            ]
+            futures.append((direction, score, batch_futures))
+
+        best_direction = None
+        best_value = float("-inf")
+
+        for (direction, score, batch_futures) in futures:
+            total_score = sum(future.result() for future in batch_futures)
+            value = score + total_score / (batch_runs * batches)
+            if value > best_value:
+                best_direction = direction
+                best_value = value
+
+        return best_direction
+
+    def close(self):
+        """Shut the process pool down."""
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+
+class AIInput:
+    """
+    AI input class
+
+    Plays the game in place of the keyboard input: every call to
+    get_input makes the move chosen by the search. Only 4x4 boards can
+    be played, on any other board, or once no move is left, the game is
+    closed.
+    """
+
+    def __init__(self, game_ctrl: Any, search: Any):
+        """
+        Initialization method
+
+        Inputs are: game controller, and the search used to pick the moves.
+        """
+        self._game_ctrl = game_ctrl
+        self._search = search
+
+        self.moves_cnt = 0
+
+        # needs to register to the game controller
+        self._game_ctrl.attach_input(self)
+
+    def get_input(self):
+        """Makes one move, or closes the game if no move is available."""
+        packed_board = self._game_ctrl.get_packed_board()
+        direction = None
+
+        if packed_board is not None:
+            direction = self._search.best_move(packed_board)
+
+        if direction is None:
+            self._game_ctrl.close_game()
+        else:
+            self._game_ctrl.move_pieces(direction)
+            self.moves_cnt += 1
+
+    def is_operational(self):
+        """
+        Get the operational state of the component
+
+        Returns the information if this component is able to function
+        properly.
+        """
+        return True
+
+
+class HeadlessOutput:
+    """
+    Headless output class
+
+    Output for games played without a terminal, it only remembers
+    whether the game ended.
+    """
+
+    def __init__(self, game_ctrl: Any):
+        self.game_ended = False
+
+        self._game_ctrl = game_ctrl
+        self._game_ctrl.attach_output(self)
+
+    def update_game_state(self):
+        """Does nothing, there is nothing to draw"""
+
+    def open_endgame_message(self):
+        """Remembers the end of the game"""
+        self.game_ended = True
+
+    def close_endgame_message(self):
+        """Forgets the end of the game"""
+        self.game_ended = False
+
+    def is_operational(self):
+        """
+        Get the operational state of the component
+
+        Returns the information if this component is able to function
+        properly.
+        """
+        return True
+
+
+def solve_games(games_cnt: int, search: Any, seed: int = 0) -> dict:
+    """
+    Play games headlessly with the AI
+
+    Every game is seeded on its own. Returns the number of moves made
+    per second, and the scores, and the biggest pieces, of the games.
+    """
+    moves_cnt = 0
+    scores = []
+    max_pieces = []
+
+    started = time.perf_counter()
+
+    for game_index in range(games_cnt):
+        game_ctrl = gamectrl.GameController(
+            rng=gamectrl.SplitMixRandom(seed + game_index)
+        )
+        HeadlessOutput(game_ctrl)
+        ai_input = AIInput(game_ctrl, search)
+        game_ctrl.resume_game()
+
+        while game_ctrl.is_active():
+            ai_input.get_input()
+
+        moves_cnt += ai_input.moves_cnt
+        scores.append(game_ctrl.get_current_score())
+        max_pieces.append(max(max(row) for row in game_ctrl.get_board_state()))
+
+    elapsed = time.perf_counter() - started
+
+    return {
+        "games": games_cnt,
+        "moves": moves_cnt,
+        "moves_per_second": moves_cnt / elapsed,
+        "average_score": sum(scores) / games_cnt,
+        "max_piece": max(max_pieces),
+        "max_pieces": collections.Counter(max_pieces),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Solves 2048 games with the AI")
+    parser.add_argument("--games", type=int, default=5, help="number of games")
+    parser.add_argument(
+        "--search",
+        choices=["expectimax", "montecarlo"],
+        default="expectimax",
+        help="how the moves are picked",
+    )
+    parser.add_argument("--depth", type=int, default=2, help="expectimax depth")
+    parser.add_argument(
+        "--rollouts", type=int, default=200, help="Monte Carlo games per move"
+    )
+    parser.add_argument("--seed", type=int, default=0, help="seed of the first game")
+    args = parser.parse_args()
+
+    if args.search == "expectimax":
+        game_search = ExpectimaxSearch(args.depth)
+    else:
+        game_search = MonteCarloSearch(args.rollouts, seed=args.seed)
+
+    try:
+        results = solve_games(args.games, game_search, args.seed)
+    finally:
+        game_search.close()
+
+    for (name, value) in results.items():
+        if isinstance(value, float):
+            print("{}: {:.2f}".format(name, value))
+        else:
+            print("{}: {}".format(name, value))
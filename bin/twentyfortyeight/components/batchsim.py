@@ -0,0 +1,206 @@
+"""
+Batched 2048 simulation module
+
+Advances many packed 4x4 boards at once with NumPy. Every board has its
+own random number generator, seeded on its own, so a board plays out the
+same no matter which other boards share the batch.
+"""
+from typing import Sequence, Tuple
+
+import numpy as np
+
+from . import gamectrl, movetbl
+
+# direction codes of BoardBatch.step, as indices into this list
+DIRECTIONS = list(gamectrl.MovementDirections)
+
+_LEFT_ROWS = np.array(movetbl.LEFT_ROWS, dtype=np.uint64)
+_LEFT_SCORES = np.array(movetbl.LEFT_SCORES, dtype=np.int64)
+_RIGHT_ROWS = np.array(movetbl.RIGHT_ROWS, dtype=np.uint64)
+_RIGHT_SCORES = np.array(movetbl.RIGHT_SCORES, dtype=np.int64)
+
+_ROW_MASK = np.uint64(movetbl.ROW_MASK)
+_TILE_MASK = np.uint64(movetbl.TILE_MASK)
+_ROW_SHIFTS = [np.uint64(shift) for shift in (0, 16, 32, 48)]
+_TILE_SHIFTS = np.arange(0, 64, movetbl.TILE_BITS, dtype=np.uint64)
+
+# splitmix64 constants
+_GOLDEN_GAMMA = np.uint64(0x9E3779B97F4A7C15)
+_MIX_MULTIPLIERS = (np.uint64(0xBF58476D1CE4E5B9), np.uint64(0x94D049BB133111EB))
+
+
+def transpose(packed_boards: np.ndarray) -> np.ndarray:
+    """Swap rows, and columns, of every packed board."""
+    a1 = packed_boards & np.uint64(0xF0F00F0FF0F00F0F)
+    a2 = packed_boards & np.uint64(0x0000F0F00000F0F0)
+    a3 = packed_boards & np.uint64(0x0F0F00000F0F0000)
+    a = a1 | (a2 << np.uint64(12)) | (a3 >> np.uint64(12))
+
+    b1 = a & np.uint64(0xFF00FF0000FF00FF)
+    b2 = a & np.uint64(0x00FF00FF00000000)
+    b3 = a & np.uint64(0x00000000FF00FF00)
+    return b1 | (b2 >> np.uint64(24)) | (b3 << np.uint64(24))
+
+
+def _move_rows(
+    packed_boards: np.ndarray, rows: np.ndarray, scores: np.ndarray
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Look up every row of every packed board in the given tables."""
+    moved_boards = np.zeros_like(packed_boards)
+    merging_scores = np.zeros(len(packed_boards), dtype=np.int64)
+
+    for shift in _ROW_SHIFTS:
+        row_indices = ((packed_boards >> shift) & _ROW_MASK).astype(np.intp)
+        moved_boards |= rows[row_indices] << shift
+        merging_scores += scores[row_indices]
+
+    return (moved_boards, merging_scores)
+
+
+def move(
+    packed_boards: np.ndarray, movement_direction: gamectrl.MovementDirections
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Move every packed board in the same direction, returns the boards, and the scores."""
+    mds = gamectrl.MovementDirections
+
+    if movement_direction == mds.left:
+        return _move_rows(packed_boards, _LEFT_ROWS, _LEFT_SCORES)
+    elif movement_direction == mds.right:
+        return _move_rows(packed_boards, _RIGHT_ROWS, _RIGHT_SCORES)
+
+    if movement_direction == mds.up:
+        (rows, scores) = (_LEFT_ROWS, _LEFT_SCORES)
+    else:
+        (rows, scores) = (_RIGHT_ROWS, _RIGHT_SCORES)
+
+    (moved_boards, merging_scores) = _move_rows(transpose(packed_boards), rows, scores)
+    return (transpose(moved_boards), merging_scores)
+
+
+def _next_random(states: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Advance splitmix64 generators, returns the new states, and their outputs."""
+    states = states + _GOLDEN_GAMMA
+    z = states
+    z = (z ^ (z >> np.uint64(30))) * _MIX_MULTIPLIERS[0]
+    z = (z ^ (z >> np.uint64(27))) * _MIX_MULTIPLIERS[1]
+    return (states, z ^ (z >> np.uint64(31)))
+
+
+class BoardBatch:
+    """
+    Board batch class
+
+    Holds one packed 4x4 board, score, and random number generator per
+    seed. Boards with no legal moves left stay in the batch, moves simply
+    do not change them.
+    """
+
+    def __init__(self, seeds: Sequence[int]):
+        self.seeds = np.array(seeds, dtype=np.uint64)
+        self.boards = np.zeros(len(self.seeds), dtype=np.uint64)
+        self.scores = np.zeros(len(self.seeds), dtype=np.int64)
+
+        self._rng_states = self.seeds.copy()
+
+        everyone = np.ones(len(self.seeds), dtype=bool)
+        for _ in range(2):
+            self._spawn_pieces(everyone)
+
+    def step(self, directions: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Move every board in its own direction
+
+        Directions are indices into DIRECTIONS. A new piece is spawned on
+        every board that changed. Returns the scores of the mergings, and
+        which boards changed.
+        """
+        directions = np.asarray(directions)
+        moved_boards = self.boards.copy()
+        merging_scores = np.zeros(len(self.boards), dtype=np.int64)
+
+        for (direction_index, movement_direction) in enumerate(DIRECTIONS):
+            selected = directions == direction_index
+            if selected.any():
+                (moved_boards[selected], merging_scores[selected]) = move(
+                    self.boards[selected], movement_direction
+                )
+
+        movement_done = moved_boards != self.boards
+        merging_scores[~movement_done] = 0
+
+        self.boards = moved_boards
+        self.scores += merging_scores
+        self._spawn_pieces(movement_done)
+
+        return (merging_scores, movement_done)
+
+    def legal_moves(self) -> np.ndarray:
+        """Return, for every board, which of DIRECTIONS would change it."""
+        return np.stack(
+            [
+                move(self.boards, movement_direction)[0] != self.boards
+                for movement_direction in DIRECTIONS
+            ],
+            axis=1,
+        )
+
+    def next_random(self) -> np.ndarray:
+        """Advance the generator of every board, returns a 64-bit random value per board."""
+        (self._rng_states, random_values) = _next_random(self._rng_states)
+        return random_values
+
+    def max_pieces(self) -> np.ndarray:
+        """Return the value of the biggest piece of every board."""
+        exponents = (self.boards[:, None] >> _TILE_SHIFTS) & _TILE_MASK
+        return 2 ** exponents.max(axis=1).astype(np.int64)
+
+    def _spawn_pieces(self, selected: np.ndarray) -> None:
+        """Generate new piece on a randomly selected free tile of the selected boards."""
+        if not selected.any():
+            return
+
+        (self._rng_states[selected], random_values) = _next_random(
+            self._rng_states[selected]
+        )
+
+        boards = self.boards[selected]
+        free_tiles = ((boards[:, None] >> _TILE_SHIFTS) & _TILE_MASK) == 0
+        free_tiles_cnts = free_tiles.sum(axis=1).astype(np.uint64)
+
+        new_free_tile_indices = random_values % free_tiles_cnts
+        tile_indices = np.argmax(
+            np.cumsum(free_tiles, axis=1) > new_free_tile_indices[:, None], axis=1
+        )
+        exponents = np.uint64(1) + ((random_values >> np.uint64(32)) & np.uint64(1))
+
+        self.boards[selected] = boards | (exponents << _TILE_SHIFTS[tile_indices])
+
+
+def play_random_games(
+    seeds: Sequence[int], max_moves: int = 10_000
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Play one game per seed with random legal moves
+
+    The moves of a board are drawn from its own generator, so a game
+    plays out the same in any batch. Returns the scores, and the biggest
+    pieces, of the games.
+    """
+    batch = BoardBatch(seeds)
+
+    for _ in range(max_moves):
+        legal_moves = batch.legal_moves()
+        legal_moves_cnts = legal_moves.sum(axis=1).astype(np.uint64)
+        if not legal_moves_cnts.any():
+            break
+
+        # the index of the move among the legal moves of its board
+        move_indices = batch.next_random() % np.maximum(legal_moves_cnts, 1)
+        batch.step(
+            np.argmax(
+                np.cumsum(legal_moves, axis=1) > move_indices[:, None].astype(np.int64),
+                axis=1,
+            )
+        )
+
+    return (batch.scores, batch.max_pieces())
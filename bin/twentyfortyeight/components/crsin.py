@@ -2,7 +2,7 @@ import curses
 import enum
 from typing import Any
 
-from . import gamectrl
+from . import aiplayer, gamectrl
 
 
 class _CursesInputStates(enum.Enum):
@@ -46,14 +46,33 @@ class CursesInput:
 
         self._state = _CursesInputStates.cis_init
 
+        # created on the first hint
+        self._hint_search = None
+        self._hint_shown = False
+
     def get_input(self):
         """
         Reads, and interprets a keyboard input
 
         One keystroke can produce at most one action. Also,
         interpretation is state-dependant.
+
+        While a move is animated, waiting for a key is cut short by the
+        next animation frame. A key pressed during the animation ends it
+        right away, so the key is never held back by the drawing.
         """
-        pressed_key = self._window.getch()
+        if self._output.is_animating():
+            self._window.timeout(self._output.get_frame_timeout())
+            pressed_key = self._window.getch()
+            self._window.timeout(-1)
+
+            if pressed_key == -1:
+                self._output.animate()
+                return
+
+            self._output.finish_animation()
+        else:
+            pressed_key = self._window.getch()
 
         # always checked keypresses
         #
@@ -87,9 +106,22 @@ class CursesInput:
             return
         elif self._state == _CursesInputStates.cis_normal:
             if pressed_key == ord("r"):
+                self._clear_hint()
                 self._game_ctrl.reset_game()
                 return
+            elif pressed_key == ord("h"):
+                self._show_hint()
+                return
+            elif pressed_key == ord("u"):
+                self._clear_hint()
+                self._game_ctrl.undo()
+                return
+            elif pressed_key == ord("y"):
+                self._clear_hint()
+                self._game_ctrl.redo()
+                return
             elif pressed_key in CursesInput._MOVEMENT_KEYS_TRANSL:
+                self._clear_hint()
                 self._game_ctrl.move_pieces(
                     CursesInput._MOVEMENT_KEYS_TRANSL[pressed_key]
                 )
@@ -102,6 +134,31 @@ class CursesInput:
                 self._output.current_win_previous_page()
                 return
 
+    def _show_hint(self) -> None:
+        """Shows the move picked by the AI on the status line."""
+        packed_board = self._game_ctrl.get_packed_board()
+
+        if packed_board is None:
+            hint_text = "Hint: only available on 4x4 boards"
+        else:
+            if self._hint_search is None:
+                self._hint_search = aiplayer.ExpectimaxSearch()
+
+            direction = self._hint_search.best_move(packed_board)
+            if direction is None:
+                hint_text = "Hint: no moves left"
+            else:
+                hint_text = "Hint: move {}".format(direction.name)
+
+        self._output.set_status_line(hint_text)
+        self._hint_shown = True
+
+    def _clear_hint(self) -> None:
+        """Restores the status line if a hint is shown, as it is outdated by a move."""
+        if self._hint_shown:
+            self._output.set_status_line()
+            self._hint_shown = False
+
     def is_operational(self):
         """
         Get the operational state of the component
@@ -1,7 +1,9 @@
 """Curses output module"""
 import curses
 import enum
+import math
 import textwrap
+import time
 from typing import Any
 
 from . import helpdocs
@@ -19,6 +21,47 @@ class _DrawCharacters:
     piece_inner_char = " "
 
 
+class _FrameScheduler:
+    """
+    Animation frame scheduler
+
+    Spreads an animation of a fixed duration over frames with a fixed
+    time budget each. Frames are due on the budget boundaries counted
+    from the start of the animation, so if drawing falls behind the
+    frames it missed are dropped, and the animation still ends on time.
+    """
+
+    def __init__(self, duration: float, frame_budget: float):
+        self._duration = duration
+        self._frame_budget = frame_budget
+
+        self._start_time = None
+        self._frame_index = 0
+        self.dropped_frames_cnt = 0
+
+    def start(self):
+        self._start_time = time.monotonic()
+        self._frame_index = 0
+
+    def stop(self):
+        self._start_time = None
+
+    def next_frame(self) -> float:
+        """Advances to the frame due now, and returns its progress from 0 to 1."""
+        elapsed = time.monotonic() - self._start_time
+        frame_index = max(int(elapsed // self._frame_budget), self._frame_index + 1)
+
+        self.dropped_frames_cnt += frame_index - self._frame_index - 1
+        self._frame_index = frame_index
+
+        return min(1.0, frame_index * self._frame_budget / self._duration)
+
+    def get_time_to_next_frame(self) -> float:
+        """Returns the seconds until the next frame is due."""
+        elapsed = time.monotonic() - self._start_time
+        return max(0.0, (self._frame_index + 1) * self._frame_budget - elapsed)
+
+
 class _SubWindow:
     """
     Game sub-window
@@ -69,10 +112,16 @@ class _SubWindow:
         self._window.mvwin(new_y, new_x)
 
     def redraw(self):
+        # the screen is updated by the caller, with curses.doupdate()
         self._window.erase()
         self._window.border()
         self._actual_draw()
-        self._window.refresh()
+        self._window.noutrefresh()
+
+    def touch(self):
+        """Marks the whole window to be copied on the next update."""
+        self._window.touchwin()
+        self._window.noutrefresh()
 
 
 class _MessageWindow(_SubWindow):
@@ -166,7 +215,9 @@ class _BoardWindow(_SubWindow):
     """
     Board sub-window
 
-    This window is used to represent the game board.
+    This window is used to represent the game board. The rendered lines
+    of tiles, and pieces, are cached by value, and tile size, and after
+    the first full redraw only the pieces that changed are drawn again.
     """
 
     def __init__(
@@ -183,6 +234,13 @@ class _BoardWindow(_SubWindow):
         self._board_wh_tiles = board_wh_tiles
         self._free_tile_value = free_tile_value
 
+        # (value, inside tile size) -> (lines, attributes)
+        self._cell_art_cache = {}
+        # pieces as currently drawn, None when a full redraw is needed
+        self._drawn_pieces = None
+        # tiles drawn by the frames of a move animation
+        self._move_cells = {}
+
         self._fit_window_to_board()
 
     def _calc_tile_board_size(self) -> tuple:
@@ -192,6 +250,7 @@ class _BoardWindow(_SubWindow):
             for (win_dim, cnt) in zip(self._draw_area_wh, self._board_wh_tiles)
         )
         self._inside_tile_wh = tuple(tile_dim - 2 for tile_dim in self._tile_wh)
+        self._drawn_pieces = None
         return tuple(
             tile_dim * board_dim
             for (tile_dim, board_dim) in zip(self._tile_wh, self._board_wh_tiles)
@@ -214,48 +273,136 @@ class _BoardWindow(_SubWindow):
     def set_board_pieces(self, pieces: Any):
         self._pieces = pieces
 
+    def needs_redraw(self):
+        """Returns true value if the next draw has to redraw everything."""
+        return self._drawn_pieces is None
+
+    def draw_changes(self):
+        """Draws the pieces that changed since the last draw, or everything if needed."""
+        if self._drawn_pieces is None:
+            self.redraw()
+            return
+
+        for row in range(self._board_wh_tiles[1]):
+            drawn_row = self._drawn_pieces[row]
+            for col in range(self._board_wh_tiles[0]):
+                piece_value = self._pieces[row][col]
+                if piece_value != drawn_row[col]:
+                    self._draw_cell(col, row, piece_value)
+                    drawn_row[col] = piece_value
+
+        self._window.noutrefresh()
+
+    def start_move_animation(self, move_events: Any):
+        """
+        Prepares the board for the frames of a move animation
+
+        Only the tiles the moving pieces pass over are drawn by the
+        frames, so these are remembered, with what to draw under the
+        moving pieces, and are drawn again when the animation stops.
+        """
+        moving_sources = {event.source for event in move_events}
+        # (row, col) -> value drawn under the moving pieces
+        self._move_cells = {}
+
+        for event in move_events:
+            (source_row, source_col) = event.source
+            (dest_row, dest_col) = event.destination
+            for row in range(min(source_row, dest_row), max(source_row, dest_row) + 1):
+                for col in range(
+                    min(source_col, dest_col), max(source_col, dest_col) + 1
+                ):
+                    if (row, col) in moving_sources:
+                        self._move_cells[(row, col)] = self._free_tile_value
+                    elif (row, col) not in self._move_cells:
+                        self._move_cells[(row, col)] = self._drawn_pieces[row][col]
+                    self._drawn_pieces[row][col] = None
+
+    def stop_move_animation(self):
+        """Draws the pieces over the tiles a stopped move animation drew on"""
+        if self._drawn_pieces is not None:
+            for (row, col) in self._move_cells:
+                piece_value = self._pieces[row][col]
+                self._draw_cell(col, row, piece_value)
+                self._drawn_pieces[row][col] = piece_value
+        self._move_cells = {}
+
+    def draw_move_frame(self, move_events: Any, progress: float):
+        """
+        Draws one frame of a move animation
+
+        The tiles the moving pieces pass over are drawn as last drawn,
+        and the moving pieces part of the way, given by the progress
+        from 0 to 1, from their source to their destination tile. The
+        final pieces are only shown by the next draw of changes.
+        """
+        for ((row, col), value) in self._move_cells.items():
+            self._draw_cell(col, row, value)
+
+        for event in move_events:
+            (source_row, source_col) = event.source
+            (dest_row, dest_col) = event.destination
+            tile_x = source_col + (dest_col - source_col) * progress
+            tile_y = source_row + (dest_row - source_row) * progress
+
+            self._draw_art(
+                round(tile_x * self._tile_wh[0]) + self._draw_area_xy[0],
+                round(tile_y * self._tile_wh[1]) + self._draw_area_xy[1],
+                event.value,
+            )
+
+        self._window.noutrefresh()
+
     def _actual_draw(self) -> None:
-        self._draw_tiles()
-        self._draw_pieces()
+        for row in range(self._board_wh_tiles[1]):
+            for col in range(self._board_wh_tiles[0]):
+                self._draw_cell(col, row, self._pieces[row][col])
+
+        self._drawn_pieces = [list(board_row) for board_row in self._pieces]
+
+    def _draw_cell(self, tile_x: Any, tile_y: Any, value: Any) -> None:
+        self._draw_art(
+            tile_x * self._tile_wh[0] + self._draw_area_xy[0],
+            tile_y * self._tile_wh[1] + self._draw_area_xy[1],
+            value,
+        )
+
+    def _draw_art(self, draw_x: int, draw_y: int, value: Any) -> None:
+        (cell_lines, attributes) = self._get_cell_art(value)
+
+        for (line_index, line_text) in enumerate(cell_lines):
+            self._window.addstr(draw_y + line_index, draw_x, line_text, attributes)
+
+    def _get_cell_art(self, value: Any) -> tuple:
+        cache_key = (value, self._inside_tile_wh)
+
+        if cache_key not in self._cell_art_cache:
+            if value == self._free_tile_value:
+                cell_art = self._render_tile()
+            else:
+                cell_art = self._render_piece(value)
+            self._cell_art_cache[cache_key] = cell_art
+
+        return self._cell_art_cache[cache_key]
 
-    def _draw_tiles(self) -> None:
+    def _render_tile(self) -> tuple:
         dc = _DrawCharacters
-        border_line = dc.tile_border_char * self._draw_area_wh[0]
-        inner_line_tile = "".join(
+        border_line = dc.tile_border_char * self._tile_wh[0]
+        inner_line = "".join(
             (
                 dc.tile_border_char,
                 dc.tile_inner_char * self._inside_tile_wh[0],
                 dc.tile_border_char,
             )
         )
-        inner_line = inner_line_tile * self._board_wh_tiles[0]
 
-        draw_y = self._draw_area_xy[1]
+        cell_lines = [border_line]
+        cell_lines.extend(inner_line for _row in range(self._inside_tile_wh[1]))
+        cell_lines.append(border_line)
 
-        def draw_tile_line(line_text: Any):
-            nonlocal draw_y
-            self._window.addstr(
-                draw_y,
-                self._draw_area_xy[0],
-                line_text,
-                curses.A_REVERSE + curses.A_BOLD,
-            )
-            draw_y += 1
+        return (cell_lines, curses.A_REVERSE + curses.A_BOLD)
 
-        for _tile_row in range(self._board_wh_tiles[1]):
-            draw_tile_line(border_line)
-            for _inside_tile_row in range(self._inside_tile_wh[1]):
-                draw_tile_line(inner_line)
-            draw_tile_line(border_line)
-
-    def _draw_pieces(self) -> None:
-        for row in range(self._board_wh_tiles[1]):
-            for col in range(self._board_wh_tiles[0]):
-                piece_value = self._pieces[row][col]
-                if piece_value != self._free_tile_value:
-                    self._draw_piece(col, row, piece_value)
-
-    def _draw_piece(self, tile_x: Any, tile_y: Any, value: Any) -> None:
+    def _render_piece(self, value: Any) -> tuple:
         dc = _DrawCharacters
         border_line = "".join(
             (
@@ -281,23 +428,17 @@ class _BoardWindow(_SubWindow):
             )
         )
 
-        draw_x = tile_x * self._tile_wh[0] + self._draw_area_xy[0]
-        draw_y = tile_y * self._tile_wh[1] + self._draw_area_xy[1]
-
-        def draw_piece_line(line_text: Any):
-            nonlocal draw_y
-            self._window.addstr(draw_y, draw_x, line_text)
-            draw_y += 1
-
-        draw_piece_line(border_line)
+        cell_lines = [border_line]
 
         for inner_row in range(self._inside_tile_wh[1]):
             if inner_row == self._inside_tile_wh[1] // 2:
-                draw_piece_line(middle_value_line)
+                cell_lines.append(middle_value_line)
             else:
-                draw_piece_line(middle_empty_line)
+                cell_lines.append(middle_empty_line)
 
-        draw_piece_line(border_line)
+        cell_lines.append(border_line)
+
+        return (cell_lines, curses.A_NORMAL)
 
 
 class CursesOutput:
@@ -312,6 +453,11 @@ class CursesOutput:
     _MAIN_WINDOW_LINES = 3
     # number of message windows
     _MESSAGE_WINDOWS_CNT = 3
+    # status line text shown unless something else is set
+    _DEFAULT_STATUS_LINE_TEXT = "by Jaunty Jackals"
+    # length of the move animation, and time budget of its frames, in seconds
+    _ANIMATION_DURATION = 0.1
+    _FRAME_BUDGET = 1 / 40
 
     class _MessageWindowIndices(enum.IntEnum):
         """Maps the indices in the window list to specific windows"""
@@ -320,14 +466,21 @@ class CursesOutput:
         mwi_endgame = 1
         mwi_help = 2
 
-    def __init__(self, window: Any, game_ctrl: Any):
+    def __init__(self, window: Any, game_ctrl: Any, animate: bool = True):
         self._window = window
         self._message_windows = [None] * CursesOutput._MESSAGE_WINDOWS_CNT
 
         self._game_ctrl = game_ctrl
         self._game_ctrl.attach_output(self)
 
-        self._status_line_text = "by Jaunty Jackals"
+        self._status_line_text = CursesOutput._DEFAULT_STATUS_LINE_TEXT
+
+        self._animate = animate
+        # events of the move being animated, None when not animating
+        self._move_events = None
+        self._frame_scheduler = _FrameScheduler(
+            CursesOutput._ANIMATION_DURATION, CursesOutput._FRAME_BUDGET
+        )
 
         self._board = _BoardWindow(
             0,
@@ -367,9 +520,12 @@ class CursesOutput:
 
     def redraw(self):
         """Redraws"""
+        # a redraw shows the final pieces, which ends any animation
+        self._stop_animation()
+
         self._window.erase()
         self._draw_outer_elements()
-        self._window.refresh()
+        self._window.noutrefresh()
 
         self._board.redraw()
 
@@ -377,6 +533,8 @@ class CursesOutput:
             if msg_window is not None:
                 msg_window.redraw()
 
+        curses.doupdate()
+
     def _draw_outer_elements(self) -> None:
         dc = _DrawCharacters
         dc
@@ -426,15 +584,100 @@ class CursesOutput:
         #         self.positions[i][j].set_color(py_cui.BLACK_ON_BLUE)
         # top info
         draw_line("2048")
-        draw_line("Score: {}".format(self._score))
+        draw_line(self._score_line_text())
         # status line
         draw_y = self._win_wh[1] - 1
         draw_line(self._status_line_text)
 
+    def _score_line_text(self) -> str:
+        return "Score: {}".format(self._score)
+
     def update_game_state(self):
-        """Updates game state"""
+        """
+        Updates game state, drawing only the score, and the changed pieces
+
+        If the pieces moved, their movement is animated instead, starting
+        from the pieces as last drawn.
+        """
+        # the pieces of an unfinished animation are drawn anyway
+        self._stop_animation()
+
         self._board.set_board_pieces(self._game_ctrl.get_board_state())
         self._score = self._game_ctrl.get_current_score()
+
+        if self._board.needs_redraw():
+            self.redraw()
+            return
+
+        self._window.move(1, 0)
+        self._window.clrtoeol()
+        self._window.insstr(1, 0, self._score_line_text(), curses.A_BOLD)
+        self._window.noutrefresh()
+
+        move_events = self._game_ctrl.get_last_move_events() if self._animate else []
+
+        if move_events:
+            self._move_events = move_events
+            self._board.start_move_animation(move_events)
+            self._frame_scheduler.start()
+            self.animate()
+            return
+
+        self._board.draw_changes()
+        self._touch_message_windows()
+        curses.doupdate()
+
+    def is_animating(self):
+        """Returns true value if a move animation is being played."""
+        return self._move_events is not None
+
+    def get_frame_timeout(self):
+        """Returns the milliseconds until the next animation frame is due."""
+        return math.ceil(self._frame_scheduler.get_time_to_next_frame() * 1000)
+
+    def animate(self):
+        """Draws the animation frame that is due, the last one ends the animation"""
+        if not self.is_animating():
+            return
+
+        progress = self._frame_scheduler.next_frame()
+
+        if progress >= 1.0:
+            self.finish_animation()
+            return
+
+        self._board.draw_move_frame(self._move_events, progress)
+        self._touch_message_windows()
+        curses.doupdate()
+
+    def finish_animation(self):
+        """Ends the move animation right away, drawing the final pieces"""
+        if not self.is_animating():
+            return
+
+        self._stop_animation()
+        self._board.draw_changes()
+        self._touch_message_windows()
+        curses.doupdate()
+
+    def _stop_animation(self) -> None:
+        if self._move_events is not None:
+            self._board.stop_move_animation()
+        self._move_events = None
+        self._frame_scheduler.stop()
+
+    def _touch_message_windows(self) -> None:
+        # changed pieces are drawn over the open message windows
+        for msg_window in self._message_windows:
+            if msg_window is not None:
+                msg_window.touch()
+
+    def set_status_line(self, text: Any = None):
+        """Sets the status line text, or restores the default one"""
+        if text is None:
+            text = CursesOutput._DEFAULT_STATUS_LINE_TEXT
+
+        self._status_line_text = text
         self.redraw()
 
     def _create_message_window(self, index: Any, title: Any, message: Any) -> None:
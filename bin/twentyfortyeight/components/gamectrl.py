@@ -1,6 +1,11 @@
+import collections
 import enum
+import os
 import random
-from typing import Any
+import sys
+from typing import Any, List, NamedTuple, Optional, Sequence, Tuple
+
+from . import movetbl, savegame
 
 
 class MovementDirections(enum.Enum):
@@ -16,6 +21,177 @@ class MovementDirections(enum.Enum):
     right = 4
 
 
+PACKED_MOVES = {
+    MovementDirections.up: movetbl.move_up,
+    MovementDirections.down: movetbl.move_down,
+    MovementDirections.left: movetbl.move_left,
+    MovementDirections.right: movetbl.move_right,
+}
+
+
+class SplitMixRandom(random.Random):
+    """
+    Random number generator with a 64-bit state
+
+    A splitmix64 generator, as the batch simulator runs for every board,
+    behind the interface of random.Random. Its whole state is one
+    integer, so a saved game keeps it in 8 bytes, and it is not shared
+    with anything else in the process.
+    """
+
+    _MASK = (1 << 64) - 1
+
+    def seed(self, a: Any = None, version: int = 2) -> None:
+        """Seed the generator from an integer, or from the OS if none is given."""
+        if a is None:
+            a = int.from_bytes(os.urandom(8), "little")
+        elif not isinstance(a, int):
+            a = hash(a)
+
+        self._state = a & self._MASK
+        self.gauss_next = None
+
+    def getstate(self) -> int:
+        """Return the state of the generator."""
+        return self._state
+
+    def setstate(self, state: int) -> None:
+        """Restore a state returned by getstate."""
+        self._state = state & self._MASK
+        self.gauss_next = None
+
+    def random(self) -> float:
+        """Return the next random float in [0.0, 1.0)."""
+        return (self._next() >> 11) * (1.0 / (1 << 53))
+
+    def getrandbits(self, k: int) -> int:
+        """Return an integer with k random bits."""
+        bits = 0
+        for shift in range(0, k, 64):
+            bits |= self._next() << shift
+        return bits >> (-k % 64)
+
+    def _next(self) -> int:
+        mask = self._MASK
+        self._state = (self._state + 0x9E3779B97F4A7C15) & mask
+        z = self._state
+        z = ((z ^ (z >> 30)) * 0xBF58476D1CE4E5B9) & mask
+        z = ((z ^ (z >> 27)) * 0x94D049BB133111EB) & mask
+        return z ^ (z >> 31)
+
+
+def pick_new_piece(free_tiles: Sequence[Any], rng: random.Random) -> Tuple[Any, int]:
+    """
+    Pick the tile, out of the free tiles, and the value of a new piece
+
+    The game board, and the headless engine, both spawn their pieces with
+    it, so the same free tiles, and generator state, give the same piece.
+    """
+    new_free_tile_index = rng.randint(0, len(free_tiles) - 1)
+    new_piece_value = 2 ** rng.randint(1, 2)
+    # new_piece_value = 2 ** rng.randint(1, 12)
+
+    return (free_tiles[new_free_tile_index], new_piece_value)
+
+
+class MoveEvent(NamedTuple):
+    """
+    Piece movement event
+
+    Describes one piece sliding from its source tile to its destination
+    tile during a move. The merged value is set if the piece merges into
+    the piece on the destination tile, and is the value of the new piece.
+    """
+
+    source: Tuple[int, int]
+    destination: Tuple[int, int]
+    value: Any
+    merged_value: Optional[Any]
+
+
+class GameSnapshot(NamedTuple):
+    """
+    Game snapshot
+
+    Holds the pieces, and the score, of a game. The pieces of a board the
+    packed move engine handles are a packed 64-bit integer, the pieces of
+    any other board are bytes with the exponent of every piece value, row
+    after row, 0 for a free tile.
+    """
+
+    board: Any
+    score: int
+
+
+class _History:
+    """
+    Move history class
+
+    Keeps the snapshots to undo, and redo, the moves. Undo snapshots are
+    kept in a ring buffer, once the snapshots take more memory than the
+    cap allows, the oldest ones are dropped.
+    """
+
+    def __init__(self, max_bytes: int):
+        self._max_bytes = max_bytes
+        self._undo_snapshots = collections.deque()
+        self._redo_snapshots = []
+        self._used_bytes = 0
+
+    def clear(self):
+        """Forget all the snapshots."""
+        self._undo_snapshots.clear()
+        self._redo_snapshots.clear()
+        self._used_bytes = 0
+
+    def can_undo(self):
+        return len(self._undo_snapshots) > 0
+
+    def can_redo(self):
+        return len(self._redo_snapshots) > 0
+
+    def record(self, snapshot: GameSnapshot):
+        """Record the snapshot before a move, the moves undone can not be redone."""
+        for redo_snapshot in self._redo_snapshots:
+            self._used_bytes -= self._snapshot_bytes(redo_snapshot)
+        self._redo_snapshots.clear()
+
+        self._push(self._undo_snapshots, snapshot)
+
+    def undo(self, current_snapshot: GameSnapshot) -> Optional[GameSnapshot]:
+        """Return the snapshot before the last move, keeping the current one to redo."""
+        if not self._undo_snapshots:
+            return None
+
+        snapshot = self._undo_snapshots.pop()
+        self._used_bytes -= self._snapshot_bytes(snapshot)
+        self._push(self._redo_snapshots, current_snapshot)
+        return snapshot
+
+    def redo(self, current_snapshot: GameSnapshot) -> Optional[GameSnapshot]:
+        """Return the snapshot after the last undone move, keeping the current one to undo."""
+        if not self._redo_snapshots:
+            return None
+
+        snapshot = self._redo_snapshots.pop()
+        self._used_bytes -= self._snapshot_bytes(snapshot)
+        self._push(self._undo_snapshots, current_snapshot)
+        return snapshot
+
+    def _push(self, snapshots: Any, snapshot: GameSnapshot) -> None:
+        snapshots.append(snapshot)
+        self._used_bytes += self._snapshot_bytes(snapshot)
+
+        # the redo snapshots are never dropped, they are at most as many
+        # as the undo snapshots they came from
+        while self._used_bytes > self._max_bytes and self._undo_snapshots:
+            self._used_bytes -= self._snapshot_bytes(self._undo_snapshots.popleft())
+
+    @staticmethod
+    def _snapshot_bytes(snapshot: GameSnapshot) -> int:
+        return sys.getsizeof(snapshot.board) + sys.getsizeof(snapshot.score)
+
+
 class _GameStates(enum.Enum):
     """
     Game controller states
@@ -52,7 +228,16 @@ class _Board:
 
         self._board = [[ftw for col in bwr] for row in bhr]
 
-        self._free_tiles_cnt = self._board_width * self._board_height
+        # free tiles, as row * board width + col indices, in no particular
+        # order, and the position of every tile in that list (-1 if not free)
+        tiles_cnt = self._board_width * self._board_height
+        self._free_tiles = list(range(tiles_cnt))
+        self._free_tile_positions = list(range(tiles_cnt))
+
+        # neighbouring tile pairs that let the pieces move in a direction:
+        # a piece next to a free tile on that side, or two equal pieces
+        self._movable_pairs_cnts = {direction: 0 for direction in MovementDirections}
+        self._equal_pairs_cnt = 0
 
     def get_tile(self, row: Any, col: Any):
         """Return the value of a tile on the given position."""
@@ -60,15 +245,20 @@ class _Board:
 
     def set_tile(self, row: Any, col: Any, value: Any):
         """Set the value of a tile on the given position."""
+        if self._board[row][col] == value:
+            return
+
         new_tile_empty = value == self._free_tile_value
         old_tile_empty = self._board[row][col] == self._free_tile_value
 
         if new_tile_empty and not old_tile_empty:
-            self._free_tiles_cnt += 1
+            self._add_free_tile(row * self._board_width + col)
         elif not new_tile_empty and old_tile_empty:
-            self._free_tiles_cnt -= 1
+            self._remove_free_tile(row * self._board_width + col)
 
+        self._count_neighbour_pairs(row, col, -1)
         self._board[row][col] = value
+        self._count_neighbour_pairs(row, col, 1)
 
     def get_board_dimensions(self):
         """Return the board width, and height, in tiles."""
@@ -80,30 +270,416 @@ class _Board:
 
     def get_free_tiles_cnt(self):
         """Return the number of free tiles on the board."""
-        return self._free_tiles_cnt
-
-    def generate_piece(self):
-        """Generate new piece on the randomly selected free tile"""
-        new_free_tile_index = random.randint(0, self._free_tiles_cnt - 1)
-        new_piece_value = 2 ** random.randint(1, 2)
-        # new_piece_value = 2 ** random.randint(1, 12)
-
-        current_free_tile_index = 0
-
-        for row in range(0, self._board_width):
-            for col in range(0, self._board_height):
-                if self._board[row][col] == self._free_tile_value:
-                    if current_free_tile_index == new_free_tile_index:
-                        self._board[row][col] = new_piece_value
-                        self._free_tiles_cnt -= 1
-                        return
-                    else:
-                        current_free_tile_index += 1
+        return len(self._free_tiles)
+
+    def get_free_tiles(self):
+        """Return the free tiles, as row * board width + col, in the board's order."""
+        return tuple(self._free_tiles)
+
+    def set_free_tiles_order(self, free_tiles: Any):
+        """
+        Put the free tiles in the given order
+
+        The order decides where the next piece spawns. The tiles have to
+        be exactly the free ones, otherwise ValueError is raised.
+        """
+        if sorted(free_tiles) != sorted(self._free_tiles):
+            raise ValueError("the tiles are not the free tiles of the board")
+
+        self._free_tiles = list(free_tiles)
+        for (position, tile) in enumerate(self._free_tiles):
+            self._free_tile_positions[tile] = position
+
+    def get_equal_pairs_cnt(self):
+        """Return the number of neighbouring pieces with the same value."""
+        return self._equal_pairs_cnt
+
+    def get_movable_directions(self):
+        """Return the directions moving in would change the board."""
+        return [
+            direction
+            for (direction, pairs_cnt) in self._movable_pairs_cnts.items()
+            if pairs_cnt > 0
+        ]
+
+    def can_move(self, direction: Any) -> bool:
+        """Return true value if moving in the direction would change the board."""
+        return self._movable_pairs_cnts[direction] > 0
+
+    def generate_piece(self, rng: random.Random):
+        """Generate new piece on the free tile the given generator selects"""
+        (tile, new_piece_value) = pick_new_piece(self._free_tiles, rng)
+
+        (row, col) = divmod(tile, self._board_width)
+        self.set_tile(row, col, new_piece_value)
+
+    def start_game(self, rng: random.Random):
+        """Empty the board, and generate the two starting pieces."""
+        self.reset_board()
+
+        for _ in range(2):
+            # for i in range(15):
+            self.generate_piece(rng)
+
+    def move_pieces(self, movement_direction: Any) -> tuple:
+        """
+        Piece movement, and merge, for the whole board
+
+        Boards the packed move engine handles are moved with its lookup
+        tables, any other board line by line. Only the tiles that changed
+        are written back.
+
+        Function returns the cumulative score of the mergings, as well
+        as the information if any piece was moved.
+        """
+        packed_board = movetbl.pack_board(self._board, self._free_tile_value)
+
+        if packed_board is None:
+            return move_pieces_by_lines(
+                (self._board_width, self._board_height),
+                movement_direction,
+                self.get_tile,
+                self.set_tile,
+                self._free_tile_value,
+            )
+
+        (moved_board, merging_score) = PACKED_MOVES[movement_direction](packed_board)
+
+        if moved_board == packed_board:
+            return (0, False)
+
+        ftv = self._free_tile_value
+        for row, board_row in enumerate(movetbl.unpack_board(moved_board, ftv)):
+            for col, value in enumerate(board_row):
+                if self._board[row][col] != value:
+                    self.set_tile(row, col, value)
+
+        return (merging_score, True)
 
     def get_whole_board(self):
         """Return the whole board."""
         return self._board
 
+    def _add_free_tile(self, tile: int) -> None:
+        """Append a tile to the free tiles."""
+        self._free_tile_positions[tile] = len(self._free_tiles)
+        self._free_tiles.append(tile)
+
+    def _remove_free_tile(self, tile: int) -> None:
+        """Remove a tile from the free tiles by moving the last one in its place."""
+        position = self._free_tile_positions[tile]
+        last_tile = self._free_tiles.pop()
+
+        if last_tile != tile:
+            self._free_tiles[position] = last_tile
+            self._free_tile_positions[last_tile] = position
+
+        self._free_tile_positions[tile] = -1
+
+    def _count_neighbour_pairs(self, row: int, col: int, delta: int) -> None:
+        """Add delta to the counters of the pairs the tile forms with its neighbours."""
+        mds = MovementDirections
+        value = self._board[row][col]
+
+        if col > 0:
+            self._count_pair(
+                self._board[row][col - 1], value, mds.left, mds.right, delta
+            )
+        if col < self._board_width - 1:
+            self._count_pair(
+                value, self._board[row][col + 1], mds.left, mds.right, delta
+            )
+        if row > 0:
+            self._count_pair(self._board[row - 1][col], value, mds.up, mds.down, delta)
+        if row < self._board_height - 1:
+            self._count_pair(value, self._board[row + 1][col], mds.up, mds.down, delta)
+
+    def _count_pair(
+        self, first: Any, second: Any, backward: Any, forward: Any, delta: int
+    ) -> None:
+        """
+        Add delta to the counters a pair of neighbouring tiles contributes to.
+
+        The first tile is the one to the left of, or above, the second
+        one, so the pair lets the pieces move backward if only the first
+        one is free, forward if only the second one is free, and both ways
+        if the pieces are equal.
+        """
+        first_empty = first == self._free_tile_value
+        second_empty = second == self._free_tile_value
+
+        if first_empty and not second_empty:
+            self._movable_pairs_cnts[backward] += delta
+        elif second_empty and not first_empty:
+            self._movable_pairs_cnts[forward] += delta
+        elif first == second and not first_empty:
+            self._movable_pairs_cnts[backward] += delta
+            self._movable_pairs_cnts[forward] += delta
+            self._equal_pairs_cnt += delta
+
+
+def move_pieces_by_lines(
+    board_wh: Any,
+    movement_direction: Any,
+    get_tile: Any,
+    set_tile: Any,
+    free_tile_value: Any,
+    on_move: Any = None,
+) -> tuple:
+    """
+    Move and merge the pieces of a board line by line.
+
+    Works on boards of any size. Manipulation with the board is
+    performed through the getter and setter functions, taking the row,
+    and the column, of a tile. If given, the on_move function is called
+    with a MoveEvent for every piece that moves.
+
+    Function returns the cumulative score of the mergings, as well
+    as the information if any piece was moved.
+    """
+    md = movement_direction
+    mds = MovementDirections
+    (bw, bh) = board_wh
+
+    merging_score = 0
+    movement_done = False
+
+    transl_map = {
+        mds.up: lambda pr_ind, sc_ind: (pr_ind, sc_ind),
+        mds.down: lambda pr_ind, sc_ind: (bh - pr_ind - 1, sc_ind),
+        mds.left: lambda pr_ind, sc_ind: (sc_ind, pr_ind),
+        mds.right: lambda pr_ind, sc_ind: (sc_ind, bw - pr_ind - 1),
+    }
+
+    iter_limit_map = {
+        mds.up: (bw, bh),
+        mds.down: (bw, bh),
+        mds.left: (bh, bw),
+        mds.right: (bh, bw),
+    }
+
+    (outer_iter_limit, dir_line_length) = iter_limit_map[md]
+    coord_transl_f = transl_map[md]
+
+    for sc_ind in range(outer_iter_limit):
+
+        def getter(index: Any):
+            return get_tile(*coord_transl_f(index, sc_ind))
+
+        def setter(index: Any, value: Any):
+            (row, col) = coord_transl_f(index, sc_ind)
+            set_tile(row, col, value)
+
+        if on_move is None:
+            line_on_move = None
+        else:
+
+            def line_on_move(
+                source_index: Any, destination_index: Any, value: Any, merged_value: Any
+            ):
+                on_move(
+                    MoveEvent(
+                        coord_transl_f(source_index, sc_ind),
+                        coord_transl_f(destination_index, sc_ind),
+                        value,
+                        merged_value,
+                    )
+                )
+
+        (ret_score, ret_movement_done) = _move_merge_pieces_dl(
+            dir_line_length, getter, setter, free_tile_value, line_on_move
+        )
+
+        merging_score += ret_score
+        movement_done = movement_done or ret_movement_done
+
+    return (merging_score, movement_done)
+
+
+def move_events(board: Any, movement_direction: Any, free_tile_value: Any) -> list:
+    """
+    Movement events of a move
+
+    Returns the MoveEvents of moving the pieces of the board in the given
+    direction. The board itself is left untouched.
+    """
+    moved_board = [list(board_row) for board_row in board]
+    events = []
+
+    def set_tile(row: Any, col: Any, value: Any):
+        moved_board[row][col] = value
+
+    move_pieces_by_lines(
+        (len(board[0]), len(board)),
+        movement_direction,
+        lambda row, col: moved_board[row][col],
+        set_tile,
+        free_tile_value,
+        events.append,
+    )
+
+    return events
+
+
+def _move_merge_pieces_dl(
+    dl_length: Any,
+    get_piece: Any,
+    set_piece: Any,
+    free_tile_value: Any,
+    on_move: Any = None,
+) -> tuple:
+    """
+    Move and merge the pieces on the direction line.
+
+    Helper function for moving and merging the pieces on the given
+    direction line, as specified by the required game logic.
+
+    Manipulation with the direction line is performed through the
+    getter and setter functions provided as the funcion parameters. The
+    optional on_move function gets the source index, the destination
+    index, the value, and the merged value (or None) of every moved piece.
+
+    Function returns the cumulative score of the mergings, as well
+    as the information if any piece was moved.
+    """
+    cursor_index = 0
+    free_tile_index = -1
+    merging_piece_index = -1
+
+    merging_score = 0
+    movement_done = False
+
+    ftw = free_tile_value
+    while cursor_index < dl_length:
+        piece_val = get_piece(cursor_index)
+
+        if piece_val == ftw:
+            # the tile is free
+
+            if free_tile_index == -1:
+                # free tile cursor is unset
+
+                free_tile_index = cursor_index
+
+            cursor_index += 1
+        else:
+            # piece is found
+
+            if merging_piece_index != -1:
+                # merging available
+
+                if get_piece(merging_piece_index) == piece_val:
+                    # the pieces are the same
+
+                    # merge pieces
+                    set_piece(cursor_index, ftw)
+                    set_piece(merging_piece_index, piece_val * 2)
+
+                    if on_move is not None:
+                        on_move(
+                            cursor_index, merging_piece_index, piece_val, piece_val * 2
+                        )
+
+                    merging_score += piece_val
+                    movement_done = True
+
+                    merging_piece_index = -1
+                elif free_tile_index != -1:
+                    # no merging, but there is a free tile
+
+                    # move the piece to the free tile
+                    set_piece(free_tile_index, piece_val)
+                    set_piece(cursor_index, ftw)
+
+                    if on_move is not None:
+                        on_move(cursor_index, free_tile_index, piece_val, None)
+
+                    merging_piece_index = free_tile_index
+
+                    movement_done = True
+
+                    free_tile_index += 1
+                    cursor_index += 1
+                else:
+                    # no merging, and no free tiles
+
+                    merging_piece_index = cursor_index
+                    cursor_index += 1
+            else:
+                # merging unavailable
+
+                if free_tile_index != -1:
+                    # there is a free tile
+
+                    # move the piece to the free tile
+                    set_piece(free_tile_index, piece_val)
+                    set_piece(cursor_index, ftw)
+
+                    if on_move is not None:
+                        on_move(cursor_index, free_tile_index, piece_val, None)
+
+                    merging_piece_index = free_tile_index
+
+                    movement_done = True
+
+                    free_tile_index += 1
+                    cursor_index += 1
+                else:
+                    # no free tiles
+
+                    merging_piece_index = cursor_index
+                    cursor_index += 1
+
+    return (merging_score, movement_done)
+
+
+def _pack_board_bytes(board: Any, free_tile_value: Any) -> bytes:
+    """Pack a board of any size into bytes, one piece value exponent per tile."""
+    return bytes(
+        0 if value == free_tile_value else value.bit_length() - 1
+        for board_row in board
+        for value in board_row
+    )
+
+
+def _unpack_board_bytes(packed: bytes, board_width: int, free_tile_value: Any) -> list:
+    """Unpack bytes made by _pack_board_bytes into a board of piece values."""
+    values = [2**exponent if exponent else free_tile_value for exponent in packed]
+    return [
+        values[row_start : row_start + board_width]
+        for row_start in range(0, len(values), board_width)
+    ]
+
+
+def play_moves(
+    moves: Sequence[Any],
+    rng: random.Random,
+    board_width: int = 4,
+    board_height: int = 4,
+    free_tile_value: Any = 0,
+) -> Tuple[List[List[Any]], int]:
+    """
+    Play a game on the board of the game controller, without the controller
+
+    The starting pieces, the moves, and the new pieces after them, are
+    done the way the game controller does them, moves that change
+    nothing included, so a game played by the controller from a
+    generator in the same state ends the same. Returns the final board,
+    and the score.
+    """
+    board = _Board(board_width, board_height, free_tile_value)
+    board.start_game(rng)
+    score = 0
+
+    for movement_direction in moves:
+        if board.can_move(movement_direction):
+            (merging_score, movement_done) = board.move_pieces(movement_direction)
+            score += merging_score
+            if movement_done:
+                board.generate_piece(rng)
+
+    return ([list(board_row) for board_row in board.get_whole_board()], score)
+
 
 class GameController:
     """
@@ -114,14 +690,31 @@ class GameController:
     """
 
     def __init__(
-        self, board_width: int = 4, board_height: int = 4, free_tile_value: int = 0
+        self,
+        board_width: int = 4,
+        board_height: int = 4,
+        free_tile_value: int = 0,
+        history_max_bytes: int = 1 << 20,
+        rng: Optional[SplitMixRandom] = None,
     ):
-        """Create the board in the initial state, ready to play."""
+        """
+        Create the board in the initial state, ready to play.
+
+        The history of the moves, for undo, and redo, takes at most
+        history_max_bytes of memory, older moves can not be undone. The
+        pieces are spawned with the given generator, or with one seeded
+        from the OS, so a game played from a seeded generator can be
+        replayed with headless.play.
+        """
         self._board = _Board(board_width, board_height, free_tile_value)
+        # the generator spawning the pieces, saved with the game
+        self._rng = rng if rng is not None else SplitMixRandom()
+        self._history = _History(history_max_bytes)
         self._state = _GameStates.gs_suspended
 
         self._output_ctrl = None
         self._input_ctrl = None
+        self._autosaver = None
 
         self._reset_game_state()
 
@@ -144,10 +737,82 @@ class GameController:
         """Get free title value"""
         return self._board.get_free_tile_value()
 
+    def get_packed_board(self):
+        """Return the board packed into a 64-bit integer, or None if it does not pack."""
+        return movetbl.pack_board(
+            self._board.get_whole_board(), self._board.get_free_tile_value()
+        )
+
     def get_current_score(self):
         """Return the current score."""
         return self._current_score
 
+    def legal_moves(self):
+        """Return the directions that would move, or merge, any piece."""
+        return self._board.get_movable_directions()
+
+    def can_undo(self):
+        """Returns true value if there is a move to undo."""
+        return self._history.can_undo()
+
+    def can_redo(self):
+        """Returns true value if there is an undone move to redo."""
+        return self._history.can_redo()
+
+    def take_snapshot(self):
+        """
+        Return a snapshot of the pieces, and the score
+
+        Snapshots are small, and immutable, so analysis tools can keep
+        many of them, and branch off any of them with restore_snapshot.
+        """
+        board = self._board.get_whole_board()
+        ftv = self._board.get_free_tile_value()
+        packed_board = movetbl.pack_board(board, ftv)
+
+        if packed_board is None:
+            return GameSnapshot(_pack_board_bytes(board, ftv), self._current_score)
+        return GameSnapshot(packed_board, self._current_score)
+
+    def save_state(self):
+        """
+        Return the game in the compact binary save format
+
+        Board dimensions, pieces, score, and the state of the random
+        number generator spawning the pieces are saved, so the game
+        resumes exactly where it was left.
+        """
+        (board_width, board_height) = self._board.get_board_dimensions()
+
+        return savegame.encode(
+            savegame.SavedGame(
+                board_width,
+                board_height,
+                _pack_board_bytes(
+                    self._board.get_whole_board(), self._board.get_free_tile_value()
+                ),
+                self._board.get_free_tiles(),
+                self._current_score,
+                self._rng.getstate(),
+            )
+        )
+
+    def get_last_move_events(self):
+        """
+        Return the movement events of the last move
+
+        The events are worked out from the board as it was before the
+        move only when asked for, so moves nobody animates cost nothing
+        extra. There are no events after a reset.
+        """
+        if self._last_move is None:
+            return []
+
+        (board_before_move, movement_direction) = self._last_move
+        return move_events(
+            board_before_move, movement_direction, self._board.get_free_tile_value()
+        )
+
     # controller actions
 
     def attach_output(self, output_ctrl: Any):
@@ -158,6 +823,34 @@ class GameController:
         """Attach the input controller."""
         self._input_ctrl = input_ctrl
 
+    def attach_autosaver(self, autosaver: Any):
+        """Attach the autosaver, which gets the saved game after every change."""
+        self._autosaver = autosaver
+
+    def load_state(self, data: bytes):
+        """
+        Resume a game saved by save_state
+
+        The board takes the dimensions of the saved game. Raises
+        ValueError if the data is not a valid save, leaving the game as it
+        was.
+        """
+        saved_game = savegame.decode(data)
+        ftv = self._board.get_free_tile_value()
+        board = _unpack_board_bytes(saved_game.tiles, saved_game.board_width, ftv)
+
+        new_board = _Board(saved_game.board_width, saved_game.board_height, ftv)
+        for (row, board_row) in enumerate(board):
+            for (col, value) in enumerate(board_row):
+                new_board.set_tile(row, col, value)
+        new_board.set_free_tiles_order(saved_game.free_tiles)
+        self._rng.setstate(saved_game.rng_state)
+
+        self._board = new_board
+        self._current_score = saved_game.score
+        self._last_move = None
+        self._history.clear()
+
     def reset_game(self):
         """
         Reset the game
@@ -184,6 +877,7 @@ class GameController:
             self._reset_game_state()
             self._output_ctrl.update_game_state()
             self._output_ctrl.close_endgame_message()
+            self._autosave()
 
         # method state-changing operation:
         #
@@ -194,6 +888,32 @@ class GameController:
         if self._state == _GameStates.gs_endgame:
             self._state = _GameStates.gs_active
 
+    def undo(self):
+        """Undo the last move, the game ended by it goes on."""
+        self._restore_from_history(self._history.undo)
+
+    def redo(self):
+        """Redo the last undone move."""
+        self._restore_from_history(self._history.redo)
+
+    def restore_snapshot(self, snapshot: GameSnapshot):
+        """Put the pieces, and the score, of a snapshot back on the board."""
+        ftv = self._board.get_free_tile_value()
+
+        if isinstance(snapshot.board, int):
+            board = movetbl.unpack_board(snapshot.board, ftv)
+        else:
+            board = _unpack_board_bytes(
+                snapshot.board, self._board.get_board_dimensions()[0], ftv
+            )
+
+        for (row, board_row) in enumerate(board):
+            for (col, value) in enumerate(board_row):
+                self._board.set_tile(row, col, value)
+
+        self._current_score = snapshot.score
+        self._last_move = None
+
     def close_game(self):
         """Terminate the execution of the game."""
         # method state-changing operation:
@@ -221,49 +941,32 @@ class GameController:
         # gs_endgame    does nothing
         # gs_suspended  does nothing
 
-        if self._state == _GameStates.gs_active:
-            md = movement_direction
-            mds = MovementDirections
-            (bw, bh) = self._board.get_board_dimensions()
-
-            movement_done = False
-
-            transl_map = {
-                mds.up: lambda pr_ind, sc_ind: (pr_ind, sc_ind),
-                mds.down: lambda pr_ind, sc_ind: (bh - pr_ind - 1, sc_ind),
-                mds.left: lambda pr_ind, sc_ind: (sc_ind, pr_ind),
-                mds.right: lambda pr_ind, sc_ind: (sc_ind, bw - pr_ind - 1),
-            }
-
-            iter_limit_map = {
-                mds.up: (bw, bh),
-                mds.down: (bw, bh),
-                mds.left: (bh, bw),
-                mds.right: (bh, bw),
-            }
-
-            (outer_iter_limit, dir_line_length) = iter_limit_map[md]
-            coord_transl_f = transl_map[md]
-
-            for sc_ind in range(outer_iter_limit):
+        # a move that changes nothing costs only a counter lookup
+        if self._state == _GameStates.gs_active and self._board.can_move(
+            movement_direction
+        ):
+            ftv = self._board.get_free_tile_value()
+            board_before_move = [
+                list(board_row) for board_row in self._board.get_whole_board()
+            ]
+            packed_board = self.get_packed_board()
 
-                def getter(index: Any):
-                    return self._board.get_tile(*coord_transl_f(index, sc_ind))
+            (ret_score, movement_done) = self._board.move_pieces(movement_direction)
 
-                def setter(index: Any, value: Any):
-                    (row, col) = coord_transl_f(index, sc_ind)
-                    self._board.set_tile(row, col, value)
-
-                (ret_score, ret_movement_done) = self._move_merge_pieces_dl(
-                    dir_line_length, getter, setter
-                )
-
-                self._current_score += ret_score
-                movement_done = movement_done or ret_movement_done
+            score_before_move = self._current_score
+            self._current_score += ret_score
 
             if movement_done:
-                self._board.generate_piece()
+                if packed_board is not None:
+                    board_snapshot = packed_board
+                else:
+                    board_snapshot = _pack_board_bytes(board_before_move, ftv)
+
+                self._history.record(GameSnapshot(board_snapshot, score_before_move))
+                self._last_move = (board_before_move, movement_direction)
+                self._board.generate_piece(self._rng)
                 self._output_ctrl.update_game_state()
+                self._autosave()
 
         # method state-changing operation:
         #
@@ -309,137 +1012,68 @@ class GameController:
 
     # auxiliary operations
 
-    def _move_merge_pieces_dl(
-        self, dl_length: Any, get_piece: Any, set_piece: Any
-    ) -> tuple():
-        """
-        Move and merge the pieces on the direction line.
-
-        Helper function for moving and merging the pieces on the given
-        direction line, as specified by the required game logic.
-
-        Manipulation with the direction line is performed through the
-        getter and setter functions provided as the funcion parameters.
-
-        Function returns the cumulative score of the mergings, as well
-        as the information if any piece was moved.
-        """
-        cursor_index = 0
-        free_tile_index = -1
-        merging_piece_index = -1
-
-        merging_score = 0
-        movement_done = False
-
-        ftw = self._board.get_free_tile_value()
-        while cursor_index < dl_length:
-            piece_val = get_piece(cursor_index)
-
-            if piece_val == ftw:
-                # the tile is free
-
-                if free_tile_index == -1:
-                    # free tile cursor is unset
-
-                    free_tile_index = cursor_index
-
-                cursor_index += 1
-            else:
-                # piece is found
-
-                if merging_piece_index != -1:
-                    # merging available
-
-                    if get_piece(merging_piece_index) == piece_val:
-                        # the pieces are the same
-
-                        # merge pieces
-                        set_piece(cursor_index, ftw)
-                        set_piece(merging_piece_index, piece_val * 2)
-
-                        merging_score += piece_val
-                        movement_done = True
-
-                        merging_piece_index = -1
-                    elif free_tile_index != -1:
-                        # no merging, but there is a free tile
-
-                        # move the piece to the free tile
-                        set_piece(free_tile_index, piece_val)
-                        set_piece(cursor_index, ftw)
-
-                        merging_piece_index = free_tile_index
-
-                        movement_done = True
-
-                        free_tile_index += 1
-                        cursor_index += 1
-                    else:
-                        # no merging, and no free tiles
-
-                        merging_piece_index = cursor_index
-                        cursor_index += 1
-                else:
-                    # merging unavailable
+    def _restore_from_history(self, take_history_snapshot: Any) -> None:
+        """Restore the snapshot the history hands over for the current one."""
+        # method state-dependent operation:
+        #
+        # state         operation
+        # ------------- ------------------------------------------------
+        # gs_active     restores the snapshot
+        # gs_terminated does nothing
+        # gs_endgame    restores the snapshot
+        # gs_suspended  does nothing
 
-                    if free_tile_index != -1:
-                        # there is a free tile
+        perform_restore = (
+            self._state == _GameStates.gs_active
+            or self._state == _GameStates.gs_endgame
+        )
 
-                        # move the piece to the free tile
-                        set_piece(free_tile_index, piece_val)
-                        set_piece(cursor_index, ftw)
+        if not perform_restore:
+            return
 
-                        merging_piece_index = free_tile_index
+        snapshot = take_history_snapshot(self.take_snapshot())
+        if snapshot is None:
+            return
 
-                        movement_done = True
+        self.restore_snapshot(snapshot)
+        self._output_ctrl.update_game_state()
+        self._autosave()
 
-                        free_tile_index += 1
-                        cursor_index += 1
-                    else:
-                        # no free tiles
+        # method state-changing operation:
+        #
+        # from state    to state        condition
+        # ------------- --------------- --------------------------------
+        # gs_active     gs_endgame      no moves available
+        # gs_endgame    gs_active       moves available
 
-                        merging_piece_index = cursor_index
-                        cursor_index += 1
+        if self._state == _GameStates.gs_endgame and self._moves_available():
+            self._state = _GameStates.gs_active
+            self._output_ctrl.close_endgame_message()
+        elif self._state == _GameStates.gs_active and not self._moves_available():
+            self._state = _GameStates.gs_endgame
+            self._output_ctrl.open_endgame_message()
 
-        return (merging_score, movement_done)
+    def _autosave(self) -> None:
+        """Hand the saved game over to the autosaver, if one is attached."""
+        if self._autosaver is not None:
+            self._autosaver.save(self.save_state())
 
     def _moves_available(self) -> bool:
         """Check if there are any valid moves available"""
+        # both checks are counter lookups, the board keeps them up to date
+        #
         # first check - are there free tiles?
-
-        if self._board.get_free_tiles_cnt() > 0:
-            return True
-
         # second check - are there mergings available?
 
-        (bw, bh) = self._board.get_board_dimensions()
-
-        # first pass - check by rows
-        for row in range(bh):
-            for col in range(bw - 1):
-                curr_piece_val = self._board.get_tile(row, col)
-                next_piece_val = self._board.get_tile(row, col + 1)
-
-                if curr_piece_val == next_piece_val:
-                    return True
-
-        # second pass - check by columns
-        for col in range(bw):
-            for row in range(bh - 1):
-                curr_piece_val = self._board.get_tile(row, col)
-                next_piece_val = self._board.get_tile(row + 1, col)
-
-                if curr_piece_val == next_piece_val:
-                    return True
-
-        return False
+        return (
+            self._board.get_free_tiles_cnt() > 0
+            or self._board.get_equal_pairs_cnt() > 0
+        )
 
     def _reset_game_state(self) -> None:
         """Resets the game state"""
-        self._board.reset_board()
-
-        for _ in range(2):
-            # for i in range(15):
-            self._board.generate_piece()
+        self._board.start_game(self._rng)
 
         self._current_score = 0
+        self._last_move = None
+        self._history.clear()
@@ -0,0 +1,121 @@
+"""
+Headless 2048 module
+
+Pure functions over boards, lists of rows of piece values, so games can
+be simulated, and replayed, without curses, or the game controller.
+Pieces are spawned with the same routine the game controller uses, and
+whole games are replayed on the board of the game controller, so a game
+played in the UI replays exactly from its seed, and its moves.
+"""
+import random
+from typing import Any, List, Optional, Tuple
+
+from . import gamectrl, movetbl
+
+Board = List[List[Any]]
+
+
+def new_board(
+    board_width: int = 4,
+    board_height: int = 4,
+    rng: Optional[random.Random] = None,
+    free_tile_value: Any = 0,
+) -> Board:
+    """Create a board with the two starting pieces, as the game controller does."""
+    rng = rng or gamectrl.SplitMixRandom()
+    return gamectrl.play_moves([], rng, board_width, board_height, free_tile_value)[0]
+
+
+def spawn_piece(board: Board, rng: random.Random, free_tile_value: Any = 0) -> bool:
+    """
+    Generate new piece on the randomly selected free tile
+
+    The board is changed in place. Returns false if no tile is free. A
+    board of lists keeps no order of its free tiles, so they are taken
+    row after row, the game controller keeps its own order, see play.
+    """
+    free_tiles = [
+        (row, col)
+        for (row, board_row) in enumerate(board)
+        for (col, value) in enumerate(board_row)
+        if value == free_tile_value
+    ]
+
+    if not free_tiles:
+        return False
+
+    (tile, new_piece_value) = gamectrl.pick_new_piece(free_tiles, rng)
+
+    (row, col) = tile
+    board[row][col] = new_piece_value
+    return True
+
+
+def step(
+    board: Board,
+    movement_direction: Any,
+    rng: Optional[random.Random] = None,
+    free_tile_value: Any = 0,
+) -> Tuple[Board, int, bool]:
+    """
+    Move, and merge, the pieces of a board in the given direction
+
+    The board is left untouched. Returns the new board, the score of the
+    mergings, and whether any piece moved. If an RNG is given, and a piece
+    moved, a new piece is spawned with it, just like after a move in the
+    game.
+    """
+    packed_board = movetbl.pack_board(board, free_tile_value)
+
+    if packed_board is not None:
+        (moved_board, merging_score) = gamectrl.PACKED_MOVES[movement_direction](
+            packed_board
+        )
+        new_board = movetbl.unpack_board(moved_board, free_tile_value)
+        movement_done = moved_board != packed_board
+    else:
+        new_board = [list(board_row) for board_row in board]
+
+        def set_tile(row: int, col: int, value: Any):
+            new_board[row][col] = value
+
+        (merging_score, movement_done) = gamectrl.move_pieces_by_lines(
+            (len(board[0]), len(board)),
+            movement_direction,
+            lambda row, col: new_board[row][col],
+            set_tile,
+            free_tile_value,
+        )
+
+    if movement_done and rng is not None:
+        spawn_piece(new_board, rng, free_tile_value)
+
+    return (new_board, merging_score, movement_done)
+
+
+def legal_moves(board: Board, free_tile_value: Any = 0) -> List[Any]:
+    """Return the directions that would move, or merge, any piece."""
+    return [
+        direction
+        for direction in gamectrl.MovementDirections
+        if step(board, direction, None, free_tile_value)[2]
+    ]
+
+
+def play(
+    moves: List[Any],
+    seed: int,
+    board_width: int = 4,
+    board_height: int = 4,
+) -> Tuple[Board, int]:
+    """
+    Replay a game from its seed, and its moves
+
+    The game is played as the game controller does, from a SplitMixRandom
+    with the given seed, so a game the controller played with such a
+    generator, without undoing, or resetting, ends on the same board.
+    Returns the final board, and the score. Moves that do not change the
+    board are skipped, as the game controller does.
+    """
+    rng = gamectrl.SplitMixRandom(seed)
+    return gamectrl.play_moves(moves, rng, board_width, board_height)
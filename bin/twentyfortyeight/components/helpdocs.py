@@ -19,6 +19,10 @@ Movement of pieces is done in one of the four directions with the cursor keys.
 
 Game ends when there are no available moves (no free tiles, and no available merges).
 
+Press 'h' to get a hint, the move the AI would make, on the status line.
+
+Press 'u' to undo the last move, and 'y' to redo the last undone move.
+
 Press '?' to close this help, 'r' to restart the game, and <ESC> to exit.
 """
 
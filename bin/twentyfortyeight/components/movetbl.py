@@ -0,0 +1,168 @@
+"""Packed 4x4 board move engine"""
+from typing import Any, List, Optional, Tuple
+
+# bits per tile, a tile holds the exponent of its piece value, 0 when free
+TILE_BITS = 4
+TILE_MASK = 0xF
+ROW_BITS = 16
+ROW_MASK = 0xFFFF
+
+# side length of the boards the engine handles
+BOARD_SIZE = 4
+
+# pieces up to 2 ** 14 are packed, so every merge of a real move fits a
+# tile; only the search can make a 2 ** 15 piece, which the tables never merge
+MAX_PACKED_EXPONENT = 14
+
+
+def _move_row_left(exponents: List[int]) -> Tuple[List[int], int]:
+    """
+    Move and merge one row of exponents towards its start
+
+    Every piece merges at most once per move, and the score of a merge
+    is the value of one of the merged pieces. Pieces with the largest
+    exponent a tile holds do not merge, so the moved row always fits.
+    """
+    pieces = [exponent for exponent in exponents if exponent != 0]
+    moved = []
+    score = 0
+
+    index = 0
+    while index < len(pieces):
+        if (
+            index + 1 < len(pieces)
+            and pieces[index] == pieces[index + 1]
+            and pieces[index] < TILE_MASK
+        ):
+            moved.append(pieces[index] + 1)
+            score += 2 ** pieces[index]
+            index += 2
+        else:
+            moved.append(pieces[index])
+            index += 1
+
+    return moved + [0] * (len(exponents) - len(moved)), score
+
+
+def _reverse_row(row: int) -> int:
+    """Reverse the order of the tiles in a packed row."""
+    return (
+        (row >> 12)
+        | ((row >> 4) & 0x00F0)
+        | ((row << 4) & 0x0F00)
+        | ((row << 12) & 0xF000)
+    )
+
+
+def _build_tables() -> Tuple[List[int], List[int], List[int], List[int]]:
+    """Build the moved rows, and scores, of every packed row."""
+    left_rows = [0] * (ROW_MASK + 1)
+    left_scores = [0] * (ROW_MASK + 1)
+
+    for row in range(ROW_MASK + 1):
+        exponents = [(row >> (col * TILE_BITS)) & TILE_MASK for col in range(4)]
+        (moved, score) = _move_row_left(exponents)
+        left_rows[row] = sum(
+            exponent << (col * TILE_BITS) for col, exponent in enumerate(moved)
+        )
+        left_scores[row] = score
+
+    right_rows = [0] * (ROW_MASK + 1)
+    right_scores = [0] * (ROW_MASK + 1)
+
+    for row in range(ROW_MASK + 1):
+        reversed_row = _reverse_row(row)
+        right_rows[row] = _reverse_row(left_rows[reversed_row])
+        right_scores[row] = left_scores[reversed_row]
+
+    return (left_rows, left_scores, right_rows, right_scores)
+
+
+# moved row, and merge score, of every packed row, indexed by the row
+(LEFT_ROWS, LEFT_SCORES, RIGHT_ROWS, RIGHT_SCORES) = _build_tables()
+
+
+def pack_board(board: List[List[Any]], free_tile_value: Any) -> Optional[int]:
+    """
+    Pack a board into a 64-bit integer
+
+    The tile in the given row, and column, takes the 4 bits at
+    16 * row + 4 * col. Returns None if the board is not 4x4, or if a
+    piece is too big to be packed.
+    """
+    if len(board) != BOARD_SIZE:
+        return None
+
+    packed = 0
+    shift = 0
+    for row in board:
+        if len(row) != BOARD_SIZE:
+            return None
+
+        for value in row:
+            if value != free_tile_value:
+                exponent = value.bit_length() - 1
+                if exponent > MAX_PACKED_EXPONENT:
+                    return None
+                packed |= exponent << shift
+            shift += TILE_BITS
+
+    return packed
+
+
+def unpack_board(packed: int, free_tile_value: Any) -> List[List[Any]]:
+    """Unpack a 64-bit integer into a board of piece values."""
+    board = []
+    for row in range(BOARD_SIZE):
+        board_row = []
+        for col in range(BOARD_SIZE):
+            exponent = (packed >> (row * ROW_BITS + col * TILE_BITS)) & TILE_MASK
+            board_row.append(2**exponent if exponent else free_tile_value)
+        board.append(board_row)
+    return board
+
+
+def transpose(packed: int) -> int:
+    """Swap rows, and columns, of a packed board."""
+    a1 = packed & 0xF0F00F0FF0F00F0F
+    a2 = packed & 0x0000F0F00000F0F0
+    a3 = packed & 0x0F0F00000F0F0000
+    a = a1 | (a2 << 12) | (a3 >> 12)
+
+    b1 = a & 0xFF00FF0000FF00FF
+    b2 = a & 0x00FF00FF00000000
+    b3 = a & 0x00000000FF00FF00
+    return b1 | (b2 >> 24) | (b3 << 24)
+
+
+def _move_rows(packed: int, rows: List[int], scores: List[int]) -> Tuple[int, int]:
+    """Look up every row of a packed board in the given tables."""
+    r0 = packed & ROW_MASK
+    r1 = (packed >> 16) & ROW_MASK
+    r2 = (packed >> 32) & ROW_MASK
+    r3 = packed >> 48
+
+    moved = rows[r0] | (rows[r1] << 16) | (rows[r2] << 32) | (rows[r3] << 48)
+    return (moved, scores[r0] + scores[r1] + scores[r2] + scores[r3])
+
+
+def move_left(packed: int) -> Tuple[int, int]:
+    """Move the pieces towards column 0, returns the new board, and the score."""
+    return _move_rows(packed, LEFT_ROWS, LEFT_SCORES)
+
+
+def move_right(packed: int) -> Tuple[int, int]:
+    """Move the pieces towards column 3, returns the new board, and the score."""
+    return _move_rows(packed, RIGHT_ROWS, RIGHT_SCORES)
+
+
+def move_up(packed: int) -> Tuple[int, int]:
+    """Move the pieces towards row 0, returns the new board, and the score."""
+    (moved, score) = _move_rows(transpose(packed), LEFT_ROWS, LEFT_SCORES)
+    return (transpose(moved), score)
+
+
+def move_down(packed: int) -> Tuple[int, int]:
+    """Move the pieces towards row 3, returns the new board, and the score."""
+    (moved, score) = _move_rows(transpose(packed), RIGHT_ROWS, RIGHT_SCORES)
+    return (transpose(moved), score)
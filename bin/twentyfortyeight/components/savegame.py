@@ -0,0 +1,178 @@
+"""
+Save game module
+
+Compact binary format of a saved 2048 game, atomic writes of the save
+file, and the autosaver writing it in the background.
+
+A save file starts with a fixed header, followed by one byte per tile,
+row after row, holding the exponent of the piece value (0 for a free
+tile), the free tiles in the order the board keeps them, as that order
+decides where the next piece spawns, and the state of the random number
+generator.
+"""
+import os
+import struct
+import tempfile
+import threading
+from typing import NamedTuple, Optional, Tuple
+
+MAGIC = b"2048"
+VERSION = 2
+
+# magic, version, board width, board height, score
+HEADER = struct.Struct("<4sBHHQ")
+# index of a free tile, row after row, in the order the board keeps them
+FREE_TILE = struct.Struct("<I")
+# state of the 64-bit generator spawning the pieces
+RNG_STATE = struct.Struct("<Q")
+
+
+class SavedGame(NamedTuple):
+    """Everything needed to resume a game"""
+
+    board_width: int
+    board_height: int
+    tiles: bytes
+    free_tiles: Tuple[int, ...]
+    score: int
+    rng_state: int
+
+
+def encode(saved_game: SavedGame) -> bytes:
+    """Encodes a saved game in the save file format."""
+    data = bytearray(
+        HEADER.pack(
+            MAGIC,
+            VERSION,
+            saved_game.board_width,
+            saved_game.board_height,
+            saved_game.score,
+        )
+    )
+    data += saved_game.tiles
+    data += struct.pack(
+        "<{}I".format(len(saved_game.free_tiles)), *saved_game.free_tiles
+    )
+    data += RNG_STATE.pack(saved_game.rng_state)
+
+    return bytes(data)
+
+
+def decode(data: bytes) -> SavedGame:
+    """Decodes a saved game, raises ValueError if the data is not a valid save."""
+    try:
+        (magic, version, board_width, board_height, score) = HEADER.unpack_from(data)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError("not a version {} 2048 save".format(VERSION))
+
+        offset = HEADER.size
+        tiles = data[offset : offset + board_width * board_height]
+        offset += board_width * board_height
+
+        free_tiles_cnt = tiles.count(0)
+        free_tiles = struct.unpack_from("<{}I".format(free_tiles_cnt), data, offset)
+        offset += free_tiles_cnt * FREE_TILE.size
+
+        (rng_state,) = RNG_STATE.unpack_from(data, offset)
+    except struct.error as error:
+        raise ValueError("truncated 2048 save") from error
+
+    if (
+        board_width == 0
+        or board_height == 0
+        or len(tiles) != board_width * board_height
+    ):
+        raise ValueError("bad board dimensions in 2048 save")
+
+    return SavedGame(
+        board_width,
+        board_height,
+        bytes(tiles),
+        free_tiles,
+        score,
+        rng_state,
+    )
+
+
+def write_atomically(path: str, data: bytes) -> None:
+    """
+    Write a file so it is either the old, or the new file, never a mix
+
+    The data goes to a temporary file in the same directory, which then
+    replaces the file.
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    (fd, temporary_path) = tempfile.mkstemp(
+        prefix=os.path.basename(path), suffix=".tmp", dir=directory
+    )
+
+    try:
+        with os.fdopen(fd, "wb") as temporary_file:
+            temporary_file.write(data)
+            temporary_file.flush()
+            os.fsync(temporary_file.fileno())
+        os.replace(temporary_path, path)
+    except BaseException:
+        os.unlink(temporary_path)
+        raise
+
+
+def read(path: str) -> Optional[bytes]:
+    """Read a save file, returns None if there is none."""
+    try:
+        with open(path, "rb") as save_file:
+            return save_file.read()
+    except FileNotFoundError:
+        return None
+
+
+class Autosaver:
+    """
+    Autosaver class
+
+    Writes the save file in a background thread, so the game never waits
+    for the disk. Saves handed over while a write is in progress are
+    merged, only the latest one is written after it.
+    """
+
+    def __init__(self, path: str):
+        self._path = path
+
+        self._pending_data = None
+        self._closed = False
+        self._condition = threading.Condition()
+
+        self._thread = threading.Thread(target=self._write_saves, daemon=True)
+        self._thread.start()
+
+    def save(self, data: bytes):
+        """Hand over the data to write."""
+        with self._condition:
+            self._pending_data = data
+            self._condition.notify()
+
+    def close(self):
+        """Write the data still pending, and stop the background thread."""
+        with self._condition:
+            self._closed = True
+            self._condition.notify()
+
+        self._thread.join()
+
+    def _write_saves(self) -> None:
+        while True:
+            with self._condition:
+                while self._pending_data is None and not self._closed:
+                    self._condition.wait()
+
+                data = self._pending_data
+                self._pending_data = None
+
+            if data is None:
+                return
+
+            try:
+                write_atomically(self._path, data)
+            except OSError:
+                # the game goes on without saves, the next one may succeed
+                pass
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# the games import their packages from bin, as when started from there
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(__file__)), "bin"))
@@ -0,0 +1,191 @@
+"""
+Equivalence, and round-trip, checks of the game engines
+
+The fast backends are compared with the plain ones they replace, and
+replays, and saves, with the games they were made from.
+"""
+import random
+from typing import Any, Callable, List
+
+import pytest
+
+from tetris import replay
+from tetris.ai import AutoPlayer
+from tetris.core import ACTIONS, Game
+from tetris.scheduler import FixedStepScheduler
+from twentyfortyeight.components import gamectrl, headless, movetbl, savegame
+
+DIRECTIONS = list(gamectrl.MovementDirections)
+TETRIS_ACTIONS = list(ACTIONS)
+
+
+class _NullController:
+    """Input, and output, controller that accepts every call and does nothing"""
+
+    def __getattr__(self, name: str) -> Callable[..., bool]:
+        return lambda *args: True
+
+
+def _new_controller(
+    board_width: int = 4, board_height: int = 4, seed: int = 0
+) -> gamectrl.GameController:
+    game_ctrl = gamectrl.GameController(
+        board_width, board_height, rng=gamectrl.SplitMixRandom(seed)
+    )
+    null_controller = _NullController()
+    game_ctrl.attach_output(null_controller)
+    game_ctrl.attach_input(null_controller)
+    game_ctrl.resume_game()
+    return game_ctrl
+
+
+def _random_board(rng: random.Random) -> List[List[int]]:
+    return [
+        [0 if rng.random() < 0.4 else 2 ** rng.randint(1, 14) for _ in range(4)]
+        for _ in range(4)
+    ]
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_tetris_grid_backends_play_alike(seed: int):
+    """Games on the two grid backends stay in the same state for the same actions."""
+    (bit_game, list_game) = [
+        Game(backend=backend, seed=seed) for backend in ("bitboard", "list")
+    ]
+    autoplayer = AutoPlayer(bit_game)
+    rng = random.Random(seed)
+
+    for turn in range(4000):
+        # good placements first, so rows get cleared, then random actions
+        # until the stack tops out
+        if turn < 2000:
+            action = autoplayer.next_action()
+        else:
+            action = rng.choice(TETRIS_ACTIONS)
+        if action is not None:
+            assert bit_game.apply_action(action) == list_game.apply_action(action)
+        if turn % 8 == 0:
+            assert bit_game.fall() == list_game.fall()
+
+        assert bit_game.observe() == list_game.observe()
+        assert sorted(bit_game.grid.occupied()) == sorted(list_game.grid.occupied())
+        if bit_game.game_over:
+            break
+
+    assert bit_game.lines > 0
+    assert bit_game.game_over
+
+
+def test_packed_2048_moves_match_line_moves():
+    """The packed move tables move, and score, 4x4 boards like the line by line move."""
+    rng = random.Random(1)
+
+    for _ in range(5000):
+        board = _random_board(rng)
+        direction = rng.choice(DIRECTIONS)
+
+        moved_by_lines = [list(board_row) for board_row in board]
+
+        def set_tile(row: int, col: int, value: Any):
+            moved_by_lines[row][col] = value
+
+        line_result = gamectrl.move_pieces_by_lines(
+            (4, 4),
+            direction,
+            lambda row, col: moved_by_lines[row][col],
+            set_tile,
+            0,
+        )
+
+        packed_board = movetbl.pack_board(board, 0)
+        (moved_board, score) = gamectrl.PACKED_MOVES[direction](packed_board)
+
+        assert line_result == (score, moved_board != packed_board)
+        assert movetbl.unpack_board(moved_board, 0) == moved_by_lines
+
+
+def test_packed_rows_never_overflow():
+    """Rows of the largest pieces a tile holds do not merge, nor get lost."""
+    for (row, moved_row) in enumerate(movetbl.LEFT_ROWS):
+        assert (moved_row == 0) == (row == 0)
+
+    largest_pair = (movetbl.TILE_MASK << movetbl.TILE_BITS) | movetbl.TILE_MASK
+    assert movetbl.LEFT_ROWS[largest_pair] == largest_pair
+    assert movetbl.LEFT_SCORES[largest_pair] == 0
+
+
+@pytest.mark.parametrize("backend", ["bitboard", "list"])
+def test_tetris_replay_round_trip(tmp_path: Any, backend: str):
+    """A saved replay re-simulates to the game it was recorded from."""
+    seed = 7
+    game = Game(backend=backend, seed=seed, generator="bag")
+    scheduler = FixedStepScheduler(game, clock=lambda: 0.0)
+    recorder = replay.ReplayRecorder(seed, "bag", scheduler.step)
+    autoplayer = AutoPlayer(game)
+
+    while scheduler.ticks < 20000:
+        action = autoplayer.next_action() if scheduler.ticks % 5 == 0 else None
+        if action is not None and game.apply_action(action):
+            recorder.record(scheduler.ticks, action)
+        if scheduler.tick():
+            break
+
+    path = str(tmp_path / "session.rpl")
+    recorder.save(path, scheduler.ticks)
+    replayed = replay.simulate(replay.load(path), backend)
+
+    assert game.lines > 0
+    assert replayed.observe() == game.observe()
+    assert replayed.lines == game.lines
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_2048_headless_play_replays_controller_games(seed: int):
+    """Replaying with headless.play ends on the board, and score, of the controller."""
+    rng = random.Random(seed)
+    (width, height) = (4, 4) if seed % 2 else (rng.randint(2, 6), rng.randint(2, 6))
+    game_ctrl = _new_controller(width, height, seed)
+
+    moves = [rng.choice(DIRECTIONS) for _ in range(rng.randint(0, 400))]
+    for direction in moves:
+        game_ctrl.move_pieces(direction)
+
+    (board, score) = headless.play(moves, seed, width, height)
+
+    assert board == game_ctrl.get_board_state()
+    assert score == game_ctrl.get_current_score()
+
+
+def test_savegame_encoding_round_trip():
+    """Decoding an encoded saved game gives the same saved game."""
+    saved_game = savegame.SavedGame(
+        board_width=3,
+        board_height=2,
+        tiles=bytes([0, 1, 0, 11, 15, 0]),
+        free_tiles=(5, 0, 2),
+        score=123456,
+        rng_state=2**64 - 1,
+    )
+
+    assert savegame.decode(savegame.encode(saved_game)) == saved_game
+
+
+@pytest.mark.parametrize("dimensions", [(4, 4), (5, 7)])
+def test_2048_saved_game_resumes_identically(dimensions: Any):
+    """A resumed game plays on exactly as the game that was saved."""
+    rng = random.Random(3)
+    game_ctrl = _new_controller(*dimensions, seed=11)
+    for _ in range(60):
+        game_ctrl.move_pieces(rng.choice(DIRECTIONS))
+
+    resumed_ctrl = _new_controller(seed=999)
+    resumed_ctrl.load_state(game_ctrl.save_state())
+
+    for _ in range(100):
+        direction = rng.choice(DIRECTIONS)
+        game_ctrl.move_pieces(direction)
+        resumed_ctrl.move_pieces(direction)
+
+    assert resumed_ctrl.get_board_state() == game_ctrl.get_board_state()
+    assert resumed_ctrl.get_current_score() == game_ctrl.get_current_score()
+    assert resumed_ctrl.save_state() == game_ctrl.save_state()